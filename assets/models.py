@@ -5,6 +5,7 @@ Equipment register / Asset management
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from users.tracking import TrackedFieldsMixin
 
 User = get_user_model()
 
@@ -17,11 +18,16 @@ class AssetStatus(models.TextChoices):
     MAINTENANCE = 'maintenance', 'Under Maintenance'
 
 
-class Asset(models.Model):
+class Asset(TrackedFieldsMixin, models.Model):
     """
     Asset/Equipment model - represents equipment in the maintenance system
     Supports hierarchical structure with parent-child relationships
     """
+    tracked_fields = (
+        'code', 'name', 'factory', 'workshop', 'line', 'station', 'status', 'parent', 'criticality', 'cost_center',
+        'asset_value',
+    )
+
     id = models.BigAutoField(primary_key=True)
     code = models.CharField(
         max_length=50,
@@ -206,7 +212,8 @@ class Asset(models.Model):
     )
     updated_at = models.DateTimeField(
         auto_now=True,
-        verbose_name='Updated At'
+        verbose_name='Updated At',
+        db_index=True
     )
 
     class Meta:
@@ -224,6 +231,34 @@ class Asset(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if {'factory', 'workshop'} & set(self.last_changes):
+            # Users of the old site drop the asset and its work orders; users of the new one pull them
+            from django.utils import timezone
+            from sync.models import SyncTombstone
+            from workorders.models import WorkOrder
+            work_orders = WorkOrder.objects.filter(equipment=self)
+            SyncTombstone.record('assets', [self.pk])
+            SyncTombstone.record('work_orders', list(work_orders.values_list('id', flat=True)))
+            work_orders.update(updated_at=timezone.now())
+
+    def delete(self, *args, **kwargs):
+        # Child assets go with their parent; offline clients drop them all
+        from django.db import transaction
+        from reports.engine import note_source_deletion
+        from sync.models import SyncTombstone
+        deleted, level = {self.pk}, [self.pk]
+        while level:
+            level = [pk for pk in Asset.objects.filter(parent_id__in=level).values_list('id', flat=True)
+                     if pk not in deleted]
+            deleted.update(level)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            SyncTombstone.record('assets', deleted)
+            note_source_deletion()
+        return result
+
     def get_full_location(self):
         """Get full location path"""
         parts = [p for p in [self.factory, self.workshop, self.line, self.station] if p]
@@ -2,6 +2,9 @@
 Serializers for Assets app
 """
 from rest_framework import serializers
+
+from users.scoping import scope_queryset
+
 from .models import Asset, AssetStatus
 
 
@@ -67,4 +70,6 @@ class AssetTreeSerializer(serializers.ModelSerializer):
     def get_children(self, obj):
         """Get child assets"""
         children = obj.children.filter(status=AssetStatus.ACTIVE)
-        return AssetTreeSerializer(children, many=True).data
+        if 'request' in self.context:
+            children = scope_queryset(children, self.context['request'].user)
+        return AssetTreeSerializer(children, many=True, context=self.context).data
@@ -15,6 +15,8 @@ from django.http import HttpResponse
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
+from users.scoping import SiteScopedMixin, scope_queryset
+
 from .models import Asset, AssetStatus
 from .serializers import AssetSerializer, AssetListSerializer, AssetTreeSerializer
 
@@ -38,7 +40,7 @@ class IsAdminOrReadOnly(BasePermission):
         return request.user.is_authenticated and request.user.role == 'admin'
 
 
-class AssetViewSet(viewsets.ModelViewSet):
+class AssetViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     """ViewSet for Asset model"""
     queryset = Asset.objects.select_related('parent', 'created_by').all()
     serializer_class = AssetSerializer
@@ -60,6 +62,11 @@ class AssetViewSet(viewsets.ModelViewSet):
         """Set created_by on create"""
         serializer.save(created_by=self.request.user)
 
+    def perform_update(self, serializer):
+        """Log the changed fields on update"""
+        from users.audit import log_changes
+        log_changes(self.request.user, serializer.save())
+
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Get assets overdue for maintenance"""
@@ -71,17 +78,37 @@ class AssetViewSet(viewsets.ModelViewSet):
     def tree(self, request):
         """Get asset hierarchy tree"""
         root_assets = self.get_queryset().filter(parent__isnull=True)
-        serializer = AssetTreeSerializer(root_assets, many=True)
+        serializer = AssetTreeSerializer(root_assets, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def children(self, request, pk=None):
         """Get child assets"""
         asset = self.get_object()
-        children = asset.children.all()
+        children = scope_queryset(asset.children.all(), request.user)
         serializer = AssetListSerializer(children, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def compatible_parts(self, request, pk=None):
+        """
+        Get spare parts compatible with this asset, with live stock
+
+        Query params:
+            in_stock: true to only list parts with stock on hand
+            alternatives: true to include each part's alternative parts
+        """
+        from spareparts.compatibility import compatible_parts, alternatives_for
+        from spareparts.serializers import CompatiblePartSerializer
+
+        asset = self.get_object()
+        parts = list(compatible_parts(asset, in_stock=request.query_params.get('in_stock') == 'true'))
+        context = {'request': request}
+        if request.query_params.get('alternatives') == 'true':
+            context['alternatives'] = alternatives_for([part.id for part in parts])
+        serializer = CompatiblePartSerializer(parts, many=True, context=context)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def download_template(self, request):
         """Download Excel template for asset import"""
@@ -7,6 +7,8 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'spareparts',
     'users',
     'reports',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'users.audit.AuditBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'cmms_project.urls'
@@ -115,7 +119,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -157,6 +161,16 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:8000",
 ]
 
+# Cache - shared Redis cache when CACHE_URL is set, per-process memory cache otherwise
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_URL'],
+    } if os.environ.get('CACHE_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -165,6 +179,49 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'spareparts-draft-reorders': {
+        'task': 'spareparts.tasks.draft_reorder_requests_task',
+        'schedule': crontab(hour=6, minute=0),
+    },
+    'spareparts-demand-forecasts': {
+        'task': 'spareparts.tasks.update_demand_forecasts_task',
+        'schedule': crontab(hour=5, minute=0, day_of_week=1),
+    },
+    'spareparts-stock-snapshots': {
+        'task': 'spareparts.tasks.build_stock_snapshots_task',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'spareparts-ledger-check': {
+        'task': 'spareparts.tasks.check_ledger_consistency_task',
+        'schedule': crontab(hour=1, minute=0, day_of_week=0),
+    },
+    'reports-dispatch-scheduled': {
+        'task': 'reports.tasks.dispatch_scheduled_reports_task',
+        'schedule': crontab(minute='*/15'),
+    },
+    'reports-daily-facts': {
+        'task': 'reports.tasks.refresh_facts_task',
+        'schedule': crontab(minute='5-59/15'),
+    },
+    'reports-daily-facts-rebuild': {
+        'task': 'reports.tasks.refresh_facts_task',
+        'schedule': crontab(hour=2, minute=0, day_of_week=0),
+        'kwargs': {'full': True},
+    },
+    'reports-evict-outputs': {
+        'task': 'reports.tasks.evict_report_outputs_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'users-archive-audit-logs': {
+        'task': 'users.tasks.archive_audit_logs_task',
+        'schedule': crontab(hour=3, minute=0, day_of_month=1),
+    },
+    'sync-purge-tombstones': {
+        'task': 'sync.tasks.purge_sync_tombstones_task',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
 
 # Logging
 LOGGING = {
@@ -208,4 +265,27 @@ CMMS_SETTINGS = {
     'PM_AUTO_GENERATION_ENABLED': True,
     'PM_OVERDUE_ALERT_DAYS': 7,
     'SPAREPART_LOW_STOCK_ALERT': True,
+    'SPAREPART_REORDER_WINDOW_DAYS': 90,
+    'SPAREPART_REORDER_REQUESTER': None,  # username; defaults to the first active admin
+    'SPAREPART_FORECAST_WINDOW_DAYS': 180,
+    'SPAREPART_DEFAULT_LEAD_TIME_DAYS': 14,
+    'SPAREPART_SERVICE_LEVEL_Z': 1.65,  # ~95% cycle service level
+    'INSPECTION_AUTO_CM_ENABLED': True,
+    'INSPECTION_DUE_HORIZON_DAYS': 3,
+    'INSPECTION_DUE_CACHE_SECONDS': 6 * 3600,
+    'SYNC_PAGE_SIZE': 500,  # rows per entity per pull
+    'SYNC_SETTLE_SECONDS': 5,  # rows newer than this are left for the next pull
+    'SYNC_TOMBSTONE_DAYS': 30,  # deletions kept for pulls; older change tokens need a full sync
+    'REPORT_RUN_HOUR': 6,  # local hour scheduled reports run on the first day of a period
+    'REPORT_OUTPUT_MAX_AGE_DAYS': 30,
+    'REPORT_OUTPUT_MAX_MB': 2048,  # outputs beyond this are evicted oldest first
+    'REPORT_RUN_STALE_MINUTES': 60,  # queued or running reports older than this are failed
+    'PM_COMPLIANCE_CACHE_SECONDS': 3600,
+    'COST_CUBE_CACHE_SECONDS': 3600,
+    'FIRST_TIME_FIX_DAYS': 7,  # a repeat corrective order within this window means the fix did not hold
+    'AUDIT_LOG_RETENTION_DAYS': 180,  # older whole months move to gzip NDJSON files in AUDIT_ARCHIVE_DIR
+    'AUDIT_ARCHIVE_DIR': BASE_DIR / 'archive' / 'audit',
+    'JWT_USER_CACHE_SECONDS': 60,  # how long a role or status change can take to reach other processes
+    'DATA_SCOPING_ENABLED': False,  # limit non-admin users to the factory/workshop sites named in their department
+    'AUDIT_LOG_ASYNC': False,  # hand audit batches to a Celery worker instead of writing them in the request
 }
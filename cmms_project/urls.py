@@ -33,6 +33,7 @@ urlpatterns = [
     path('api/inspections/', include('inspections.urls')),
     path('api/spareparts/', include('spareparts.urls')),
     path('api/reports/', include('reports.urls')),
+    path('api/sync/', include('sync.urls')),
 ]
 
 # Serve media files in development
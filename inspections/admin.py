@@ -2,14 +2,14 @@
 Django Admin configuration for Inspections app
 """
 from django.contrib import admin
-from .models import InspectionRecord, InspectionTemplate, InspectionRoute
+from .models import InspectionRecord, InspectionTemplate, InspectionRoute, InspectionMeasurement
 
 
 @admin.register(InspectionRecord)
 class InspectionRecordAdmin(admin.ModelAdmin):
     """Admin interface for InspectionRecord model"""
-    list_display = ['equipment', 'inspector', 'result', 'route', 'created_at']
-    list_filter = ['result', 'created_at']
+    list_display = ['equipment', 'inspector', 'result', 'route', 'template', 'created_at']
+    list_filter = ['result', 'template', 'created_at']
     search_fields = ['equipment__code', 'equipment__name', 'inspector__username', 'route']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
@@ -33,3 +33,13 @@ class InspectionRouteAdmin(admin.ModelAdmin):
     search_fields = ['code', 'name', 'description']
     ordering = ['code']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(InspectionMeasurement)
+class InspectionMeasurementAdmin(admin.ModelAdmin):
+    """Admin interface for InspectionMeasurement model"""
+    list_display = ['equipment', 'item_key', 'value', 'unit', 'ok', 'measured_at']
+    list_filter = ['ok', 'item_key']
+    search_fields = ['equipment__code', 'item_key']
+    ordering = ['-measured_at']
+    readonly_fields = ['record', 'equipment', 'item_key', 'value', 'unit', 'ok', 'measured_at']
@@ -0,0 +1,120 @@
+"""
+Inspection measurements for Inspections app
+Extracts numeric readings from inspection records and serves downsampled trends
+"""
+from django.db.models import Avg, Min, Max, Count
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth
+
+from .models import InspectionMeasurement, to_number
+
+BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def extract_measurements(record):
+    """
+    Build the measurement rows of a saved record
+
+    Only items with a numeric value and a name of at most 100 characters
+    are extracted.
+
+    Returns:
+        list: Unsaved InspectionMeasurement objects
+    """
+    rows = []
+    for item in record.items or []:
+        if not isinstance(item, dict):
+            continue
+        name = item.get('item')
+        value = to_number(item.get('value'))
+        if not name or value is None or len(str(name)) > 100:
+            continue
+        rows.append(InspectionMeasurement(
+            record_id=record.id,
+            equipment_id=record.equipment_id,
+            item_key=str(name),
+            value=value,
+            unit=str(item.get('unit') or '')[:20],
+            ok=bool(item.get('ok', True)),
+            measured_at=record.created_at,
+        ))
+    return rows
+
+
+def write_measurements(records, replace=False):
+    """
+    Write the measurements of saved records with one bulk insert
+
+    Args:
+        records: Saved InspectionRecord objects
+        replace: Delete existing measurements of the records first (for edits)
+
+    Returns:
+        int: Number of measurements written
+    """
+    if replace:
+        InspectionMeasurement.objects.filter(record_id__in=[record.id for record in records]).delete()
+    rows = [row for record in records for row in extract_measurements(record)]
+    InspectionMeasurement.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def auto_bucket(start, end):
+    """Pick a bucket that keeps a series to a few hundred points"""
+    days = (end - start).total_seconds() / 86400
+    if days <= 2:
+        return 'raw'
+    if days <= 14:
+        return 'hour'
+    if days <= 400:
+        return 'day'
+    return 'week'
+
+
+def trend(equipment_ids, item_key, start, end, bucket='auto'):
+    """
+    Get the readings of one item for several assets over a time range
+
+    Raw readings are returned as they are; other buckets aggregate average,
+    minimum, maximum and count per bucket in the database. Both are range
+    scans on the (equipment, item, time) index.
+
+    Args:
+        equipment_ids: List of asset IDs
+        item_key: Inspection item name
+        start: Aware datetime, inclusive
+        end: Aware datetime, exclusive
+        bucket: raw, hour, day, week, month or auto
+
+    Returns:
+        tuple: (bucket used, dict of asset ID -> list of points)
+    """
+    if bucket == 'auto':
+        bucket = auto_bucket(start, end)
+
+    measurements = InspectionMeasurement.objects.filter(
+        equipment_id__in=equipment_ids,
+        item_key=item_key,
+        measured_at__gte=start,
+        measured_at__lt=end,
+    )
+    series = {equipment_id: [] for equipment_id in equipment_ids}
+
+    if bucket == 'raw':
+        rows = measurements.order_by('equipment_id', 'measured_at').values_list(
+            'equipment_id', 'measured_at', 'value', 'ok'
+        )
+        for equipment_id, measured_at, value, ok in rows:
+            series[equipment_id].append({'t': measured_at, 'value': value, 'ok': ok})
+        return bucket, series
+
+    rows = measurements.annotate(t=BUCKETS[bucket]('measured_at')).values('equipment_id', 't').annotate(
+        avg=Avg('value'), min=Min('value'), max=Max('value'), count=Count('id')
+    ).order_by('equipment_id', 't')
+    for row in rows:
+        series[row.pop('equipment_id')].append(row)
+    return bucket, series
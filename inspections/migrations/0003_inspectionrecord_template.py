@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='template',
+            field=models.ForeignKey(blank=True, help_text='Template the items were recorded against', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='inspections.inspectiontemplate', verbose_name='Template'),
+        ),
+    ]
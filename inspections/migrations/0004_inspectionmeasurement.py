@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:43
+
+import django.db.models.deletion
+import math
+
+from django.db import migrations, models
+
+
+def backfill_measurements(apps, schema_editor):
+    InspectionRecord = apps.get_model('inspections', 'InspectionRecord')
+    InspectionMeasurement = apps.get_model('inspections', 'InspectionMeasurement')
+
+    rows = []
+    records = InspectionRecord.objects.values_list('id', 'equipment_id', 'items', 'created_at')
+    for record_id, equipment_id, items, created_at in records.iterator(chunk_size=2000):
+        for item in items or []:
+            if not isinstance(item, dict) or not item.get('item') or len(str(item['item'])) > 100:
+                continue
+            value = item.get('value')
+            if value is None or value == '' or isinstance(value, bool):
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(value):
+                continue
+            rows.append(InspectionMeasurement(
+                record_id=record_id, equipment_id=equipment_id, item_key=str(item['item']), value=value,
+                unit=str(item.get('unit') or '')[:20], ok=bool(item.get('ok', True)), measured_at=created_at,
+            ))
+        if len(rows) >= 5000:
+            InspectionMeasurement.objects.bulk_create(rows)
+            rows = []
+    InspectionMeasurement.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_initial'),
+        ('inspections', '0003_inspectionrecord_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionMeasurement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('item_key', models.CharField(help_text='Inspection item name', max_length=100, verbose_name='Item')),
+                ('value', models.FloatField(verbose_name='Value')),
+                ('unit', models.CharField(blank=True, default='', max_length=20, verbose_name='Unit')),
+                ('ok', models.BooleanField(default=True, verbose_name='OK')),
+                ('measured_at', models.DateTimeField(verbose_name='Measured At')),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='inspection_measurements', to='assets.asset', verbose_name='Equipment')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='inspections.inspectionrecord', verbose_name='Inspection Record')),
+            ],
+            options={
+                'verbose_name': 'Inspection Measurement',
+                'verbose_name_plural': 'Inspection Measurements',
+                'db_table': 'inspection_measurements',
+                'ordering': ['equipment', 'item_key', 'measured_at'],
+                'indexes': [models.Index(fields=['equipment', 'item_key', 'measured_at'], name='inspection__equipme_a4740e_idx'), models.Index(fields=['item_key', 'measured_at'], name='inspection__item_ke_3f2b7f_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_measurements, migrations.RunPython.noop),
+    ]
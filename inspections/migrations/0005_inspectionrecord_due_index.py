@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0004_inspectionmeasurement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['equipment', 'template', 'created_at'], name='inspection__equipme_70ea09_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:49
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    """Existing records were last written when they were created"""
+    apps.get_model('inspections', 'InspectionRecord').objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0005_inspectionrecord_due_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At'),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -2,13 +2,31 @@
 Inspection models for CMMS
 Equipment inspection and spot check records
 """
-from django.db import models
+import math
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from assets.models import Asset
 
 User = get_user_model()
 
 
+def to_number(value):
+    """Convert a reading or limit to a finite float, or None if it is not numeric"""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _has_limits(spec):
+    """Check whether a template item defines any numeric limit"""
+    return any(to_number(spec.get(key)) is not None for key in ('min', 'max', 'threshold'))
+
+
 class InspectionResult(models.TextChoices):
     """Inspection result choices"""
     PASS = 'pass', 'Pass'
@@ -35,6 +53,15 @@ class InspectionRecord(models.Model):
         verbose_name='Route',
         help_text='Inspection route name if part of a route'
     )
+    template = models.ForeignKey(
+        'InspectionTemplate',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='records',
+        verbose_name='Template',
+        help_text='Template the items were recorded against'
+    )
     # Inspection items - JSON array of inspection data
     # Format: [{"item": "Temperature", "value": "75", "unit": "C", "threshold": "80", "ok": true},
     #          {"item": "Vibration", "value": "5.2", "unit": "mm/s", "threshold": "5.0", "ok": false}]
@@ -73,6 +100,12 @@ class InspectionRecord(models.Model):
         verbose_name='Created At',
         db_index=True
     )
+    # When the row was last written; differs from created_at for records made offline
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Updated At',
+        db_index=True
+    )
 
     class Meta:
         db_table = 'inspection_records'
@@ -81,6 +114,7 @@ class InspectionRecord(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['equipment', 'created_at']),
+            models.Index(fields=['equipment', 'template', 'created_at']),
             models.Index(fields=['inspector', 'created_at']),
             models.Index(fields=['result', 'created_at']),
         ]
@@ -90,10 +124,33 @@ class InspectionRecord(models.Model):
 
     def save(self, *args, **kwargs):
         # Auto-calculate result based on items
-        if self.items:
-            has_fail = any(not item.get('ok', True) for item in self.items)
-            self.result = InspectionResult.FAIL if has_fail else InspectionResult.PASS
+        self.evaluate()
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        # Keep the extracted measurements and cached due lists in step with the items
+        from .measurements import write_measurements
+        from .schedule import note_inspections
+        write_measurements([self], replace=not adding)
+        transaction.on_commit(lambda: note_inspections([self]))
+
+    def delete(self, *args, **kwargs):
+        # Shared report runs over the old records must not be reused
+        from reports.engine import note_source_deletion
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            note_source_deletion()
+        return result
+
+    def evaluate(self):
+        """
+        Set each item's status and the overall result
+
+        Items recorded against a template are checked against its limits by
+        the rule engine; otherwise the client-supplied ok flags are used.
+        Called by save; bulk writers call rules.evaluate_records instead.
+        """
+        from .rules import evaluate_records
+        evaluate_records([self])
 
 
 class InspectionTemplate(models.Model):
@@ -157,6 +214,54 @@ class InspectionTemplate(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Frequency or activity may have changed; cached due lists are rebuilt on next read
+        from .schedule import invalidate_due_cache
+        transaction.on_commit(invalidate_due_cache)
+
+    def delete(self, *args, **kwargs):
+        # Offline clients drop the template on their next pull
+        from sync.models import SyncTombstone
+        template_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            SyncTombstone.record('templates', [template_id])
+        return result
+
+    @property
+    def item_specs(self):
+        """Template items keyed by item name"""
+        return {spec['item']: spec for spec in self.items_template or [] if spec.get('item')}
+
+    def validate_items(self, items):
+        """
+        Check submitted items against this template
+
+        Every template item must be present once, no other items are allowed,
+        and items with numeric limits need a numeric value.
+
+        Returns:
+            list: Error messages (empty if the items are valid)
+        """
+        specs = self.item_specs
+        errors = []
+        seen = set()
+        for item in items:
+            name = item.get('item') if isinstance(item, dict) else None
+            if name not in specs:
+                errors.append(f"Item '{name}' is not part of template {self.code}")
+                continue
+            if name in seen:
+                errors.append(f"Item '{name}' is recorded more than once")
+            seen.add(name)
+            if _has_limits(specs[name]) and to_number(item.get('value')) is None:
+                errors.append(f"Item '{name}' requires a numeric value")
+        missing = [name for name in specs if name not in seen]
+        if missing:
+            errors.append(f"Missing items: {', '.join(missing)}")
+        return errors
+
 
 class InspectionRoute(models.Model):
     """
@@ -218,3 +323,76 @@ class InspectionRoute(models.Model):
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding:
+            previous = InspectionRoute.objects.filter(pk=self.pk).values_list('inspector_id', flat=True).first()
+        super().save(*args, **kwargs)
+        # Inspectors that lose the route by reassignment drop it on their next pull
+        if not adding and previous != self.inspector_id:
+            from sync.models import SyncTombstone
+            SyncTombstone.record('routes', [self.pk])
+
+    def delete(self, *args, **kwargs):
+        # Offline clients drop the route on their next pull
+        from sync.models import SyncTombstone
+        route_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            SyncTombstone.record('routes', [route_id])
+        return result
+
+
+class InspectionMeasurement(models.Model):
+    """
+    Inspection Measurement - one numeric reading extracted from an inspection record
+    Narrow indexed copy of InspectionRecord.items used for trend queries
+    """
+    id = models.BigAutoField(primary_key=True)
+    record = models.ForeignKey(
+        InspectionRecord,
+        on_delete=models.CASCADE,
+        related_name='measurements',
+        verbose_name='Inspection Record'
+    )
+    equipment = models.ForeignKey(
+        Asset,
+        on_delete=models.PROTECT,
+        related_name='inspection_measurements',
+        verbose_name='Equipment'
+    )
+    item_key = models.CharField(
+        max_length=100,
+        verbose_name='Item',
+        help_text='Inspection item name'
+    )
+    value = models.FloatField(
+        verbose_name='Value'
+    )
+    unit = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        verbose_name='Unit'
+    )
+    ok = models.BooleanField(
+        default=True,
+        verbose_name='OK'
+    )
+    measured_at = models.DateTimeField(
+        verbose_name='Measured At'
+    )
+
+    class Meta:
+        db_table = 'inspection_measurements'
+        verbose_name = 'Inspection Measurement'
+        verbose_name_plural = 'Inspection Measurements'
+        ordering = ['equipment', 'item_key', 'measured_at']
+        indexes = [
+            models.Index(fields=['equipment', 'item_key', 'measured_at']),
+            models.Index(fields=['item_key', 'measured_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_id} - {self.item_key} = {self.value} @ {self.measured_at}"
@@ -0,0 +1,79 @@
+"""
+Route rounds for Inspections app
+Persists a whole inspection route round in one transaction
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import InspectionRecord
+from .rules import evaluate_records, create_corrective_work_orders
+from .measurements import write_measurements
+from .schedule import note_inspections
+
+
+def auto_cm_enabled():
+    """Check whether failed inspections raise CM work orders"""
+    return settings.CMMS_SETTINGS.get('INSPECTION_AUTO_CM_ENABLED', True)
+
+
+def submit_round(route, entries, inspector):
+    """
+    Record the readings of a route round
+
+    All entries are evaluated by the rule engine in memory, the records and
+    their measurements are written with bulk inserts, and failed equipment
+    gets a CM work order, all in one transaction.
+
+    Args:
+        route: InspectionRoute that was walked
+        entries: Validated dicts with equipment_id, template, items and notes
+        inspector: User who walked the route
+
+    Returns:
+        list: Created InspectionRecord objects
+    """
+    records = [
+        InspectionRecord(
+            equipment_id=entry['equipment_id'],
+            route=route.code,
+            template=entry['template'],
+            items=entry['items'],
+            inspector=inspector,
+            notes=entry['notes'],
+        )
+        for entry in entries
+    ]
+    return save_inspections(records, inspector)
+
+
+def save_inspections(records, inspector, recorded_at=None):
+    """
+    Evaluate and bulk-insert unsaved inspection records
+
+    Used for route rounds and for records pushed by offline clients.
+
+    Args:
+        records: Unsaved InspectionRecord objects
+        inspector: User raising CM work orders for failures
+        recorded_at: Optional list with, per record, when it was recorded
+            (None to stamp it with the time of the insert)
+
+    Returns:
+        list: Created InspectionRecord objects
+    """
+    evaluate_records(records)
+
+    with transaction.atomic():
+        records = InspectionRecord.objects.bulk_create(records, batch_size=500)
+        # created_at is set on insert; records made offline get their recording time back
+        backdated = []
+        for record, at in zip(records, recorded_at or []):
+            if at is not None:
+                record.created_at = at
+                backdated.append(record)
+        InspectionRecord.objects.bulk_update(backdated, ['created_at'], batch_size=500)
+        write_measurements(records)
+        if auto_cm_enabled():
+            create_corrective_work_orders(records, inspector)
+        transaction.on_commit(lambda: note_inspections(records))
+    return records
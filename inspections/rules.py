@@ -0,0 +1,215 @@
+"""
+Rule engine for Inspections app
+Compiles template limits once and evaluates inspection readings in bulk
+"""
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from .models import InspectionResult, to_number
+
+# Compiled templates keyed by (template ID, updated_at); editing a template changes its key
+_CACHE_SIZE = 256
+_compiled = OrderedDict()
+
+
+class CompiledTemplate:
+    """
+    Numeric limits of an inspection template laid out as arrays
+
+    Attributes:
+        names: Item names in template order
+        index: Item name -> column
+        low, high, threshold: Limits per column (NaN when not set)
+        limited: Columns that have at least one numeric limit
+        specs: Template items keyed by name
+    """
+
+    def __init__(self, items_template):
+        self.specs = {spec['item']: spec for spec in items_template or [] if spec.get('item')}
+        self.names = list(self.specs)
+        self.index = {name: column for column, name in enumerate(self.names)}
+        # Missing limits (None) become NaN, which never compares true
+        self.low = np.array([to_number(spec.get('min')) for spec in self.specs.values()], dtype=float)
+        self.high = np.array([to_number(spec.get('max')) for spec in self.specs.values()], dtype=float)
+        self.threshold = np.array([to_number(spec.get('threshold')) for spec in self.specs.values()], dtype=float)
+        self.limited = ~(np.isnan(self.low) & np.isnan(self.high) & np.isnan(self.threshold))
+
+    def evaluate(self, item_lists):
+        """
+        Evaluate the items of many records at once
+
+        Values are placed in a records x items matrix and compared with the
+        limits in a few array operations. A value outside min/max fails; a
+        value at or above the threshold (but within limits) is a warning.
+        Items without numeric limits use the submitted ok flag.
+
+        Args:
+            item_lists: List of item lists, one per record
+
+        Returns:
+            tuple: (evaluated item lists, list of overall results)
+        """
+        rows, columns = len(item_lists), len(self.names)
+        values = np.full((rows, columns), np.nan)
+        for row, items in enumerate(item_lists):
+            for item in items:
+                column = self.index.get(item.get('item'))
+                if column is not None:
+                    values[row, column] = to_number(item.get('value'))
+
+        with np.errstate(invalid='ignore'):
+            fail = (values < self.low) | (values > self.high)
+            warning = (values >= self.threshold) & ~fail
+
+        evaluated, results = [], []
+        for row, items in enumerate(item_lists):
+            record_items = []
+            failed = warned = False
+            for item in items:
+                item = dict(item)
+                column = self.index.get(item.get('item'))
+                if column is not None:
+                    spec = self.specs[self.names[column]]
+                    for key in ('unit', 'threshold', 'min', 'max'):
+                        if spec.get(key) not in (None, ''):
+                            item[key] = spec[key]
+                if column is not None and self.limited[column] and not np.isnan(values[row, column]):
+                    if fail[row, column]:
+                        item['status'] = InspectionResult.FAIL.value
+                    elif warning[row, column]:
+                        item['status'] = InspectionResult.WARNING.value
+                    else:
+                        item['status'] = InspectionResult.PASS.value
+                    item['ok'] = item['status'] != InspectionResult.FAIL
+                else:
+                    item['ok'] = bool(item.get('ok', True))
+                    item['status'] = InspectionResult.PASS.value if item['ok'] else InspectionResult.FAIL.value
+                failed = failed or item['status'] == InspectionResult.FAIL
+                warned = warned or item['status'] == InspectionResult.WARNING
+                record_items.append(item)
+            evaluated.append(record_items)
+            if failed:
+                results.append(InspectionResult.FAIL)
+            elif warned:
+                results.append(InspectionResult.WARNING)
+            else:
+                results.append(InspectionResult.PASS)
+        return evaluated, results
+
+
+def compile_template(template):
+    """Get the compiled limits of a template, compiling them on first use"""
+    key = (template.id, template.updated_at)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = CompiledTemplate(template.items_template)
+        _compiled[key] = compiled
+        if len(_compiled) > _CACHE_SIZE:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return compiled
+
+
+def evaluate_records(records):
+    """
+    Evaluate unsaved inspection records in place
+
+    Records are grouped by template so each template is evaluated with one
+    vectorised pass. Records without a template fall back to the
+    submitted ok flags.
+
+    Args:
+        records: InspectionRecord objects with items set
+    """
+    groups = defaultdict(list)
+    for record in records:
+        if record.items:
+            groups[record.template_id].append(record)
+
+    for template_id, group in groups.items():
+        if template_id is None:
+            for record in group:
+                has_fail = any(not item.get('ok', True) for item in record.items)
+                record.result = InspectionResult.FAIL if has_fail else InspectionResult.PASS
+            continue
+        compiled = compile_template(group[0].template)
+        evaluated, results = compiled.evaluate([record.items for record in group])
+        for record, items, result in zip(group, evaluated, results):
+            record.items = items
+            record.result = result
+
+
+def create_corrective_work_orders(records, requested_by):
+    """
+    Raise CM work orders for failed inspections, one per equipment
+
+    Equipment that already has an open CM work order raised by an
+    inspection is not given a second one; its failed records are linked to
+    the open work order instead. New work orders are created with one bulk
+    insert and the records are linked with one bulk update. Since the bulk
+    insert skips WorkOrder.save, the new work orders get their tracking
+    snapshot and audit entry here.
+
+    Args:
+        records: Saved InspectionRecord objects
+        requested_by: User recorded as requester of the work orders
+
+    Returns:
+        list: Newly created WorkOrder objects
+    """
+    from assets.models import Asset
+    from users import audit
+    from workorders.models import WorkOrder, WorkOrderType, WorkOrderStatus, Priority
+    from .models import InspectionRecord
+
+    failed = defaultdict(list)
+    for record in records:
+        if record.result == InspectionResult.FAIL and record.triggered_work_order_id is None:
+            failed[record.equipment_id].append(record)
+    if not failed:
+        return []
+
+    with transaction.atomic():
+        existing = dict(WorkOrder.objects.filter(
+            equipment_id__in=failed.keys(),
+            wo_type=WorkOrderType.CM,
+            status__in=[WorkOrderStatus.OPEN, WorkOrderStatus.ASSIGNED, WorkOrderStatus.IN_PROGRESS],
+            triggered_by_inspections__isnull=False,
+        ).order_by('created_at').values_list('equipment_id', 'id'))
+
+        new_equipment = [equipment_id for equipment_id in failed if equipment_id not in existing]
+        equipment_codes = dict(Asset.objects.filter(id__in=new_equipment).values_list('id', 'code'))
+        codes = WorkOrder.generate_codes(len(new_equipment))
+        work_orders = []
+        for equipment_id, wo_code in zip(new_equipment, codes):
+            group = failed[equipment_id]
+            failures = [
+                f"{item.get('item')}: {item.get('value')}{item.get('unit', '')}"
+                for record in group for item in record.items if not item.get('ok', True)
+            ]
+            work_orders.append(WorkOrder(
+                wo_code=wo_code,
+                equipment_id=equipment_id,
+                wo_type=WorkOrderType.CM,
+                status=WorkOrderStatus.OPEN,
+                summary=f"点检异常 - {equipment_codes[equipment_id]}",
+                description='\n'.join(failures),
+                priority=Priority.HIGH,
+                requested_by=requested_by,
+            ))
+        created = WorkOrder.objects.bulk_create(work_orders)
+        for work_order in created:
+            work_order._take_snapshot()
+            audit.record(requested_by, 'create', 'WorkOrder', work_order.id, str(work_order))
+        existing.update({work_order.equipment_id: work_order.id for work_order in created})
+
+        linked = []
+        for equipment_id, group in failed.items():
+            for record in group:
+                record.triggered_work_order_id = existing[equipment_id]
+                linked.append(record)
+        InspectionRecord.objects.bulk_update(linked, ['triggered_work_order'])
+    return created
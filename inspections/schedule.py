@@ -0,0 +1,199 @@
+"""
+Inspection scheduling for Inspections app
+Computes which route inspections are overdue or coming up
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from assets.models import Asset
+from .models import InspectionRecord, InspectionRoute, InspectionTemplate
+
+CACHE_PREFIX = 'inspections:due'
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _version():
+    """Get the cache generation; bumped when templates change"""
+    return cache.get_or_set(f'{CACHE_PREFIX}:version', 1, None)
+
+
+def invalidate_due_cache():
+    """Drop every cached due list (e.g. after a template frequency change)"""
+    try:
+        cache.incr(f'{CACHE_PREFIX}:version')
+    except ValueError:
+        cache.set(f'{CACHE_PREFIX}:version', 2, None)
+
+
+def _cache_key(route_id, route_updated_at, version):
+    return f'{CACHE_PREFIX}:{version}:{route_id}:{route_updated_at.timestamp()}'
+
+
+def build_route_entries(routes):
+    """
+    Compute the schedule entries of routes without the cache
+
+    The last inspection of every equipment/template pair on the routes is
+    found with one grouped query.
+
+    Args:
+        routes: InspectionRoute objects
+
+    Returns:
+        dict: route ID -> list of entries with equipment, template,
+            frequency, last inspection and due time
+    """
+    pairs = {
+        (item.get('equipment_id'), item.get('template_id'))
+        for route in routes for item in route.route_items or []
+    }
+    template_ids = {template_id for _, template_id in pairs}
+    equipment_ids = {equipment_id for equipment_id, _ in pairs}
+    templates = InspectionTemplate.objects.filter(
+        id__in=template_ids, is_active=True, frequency_days__isnull=False
+    ).in_bulk()
+    equipment = {
+        row[0]: row[1:]
+        for row in Asset.objects.filter(id__in=equipment_ids).values_list('id', 'code', 'name')
+    }
+
+    last_inspections = {
+        (row['equipment_id'], row['template_id']): row['last']
+        for row in InspectionRecord.objects.filter(
+            equipment_id__in=equipment_ids, template_id__in=templates.keys()
+        ).values('equipment_id', 'template_id').annotate(last=Max('created_at')).order_by()
+    }
+
+    entries = {}
+    for route in routes:
+        route_entries = []
+        for item in route.route_items or []:
+            template = templates.get(item.get('template_id'))
+            asset = equipment.get(item.get('equipment_id'))
+            if template is None or asset is None or not template.frequency_days:
+                continue
+            last = last_inspections.get((item['equipment_id'], template.id))
+            route_entries.append({
+                'route': route.id,
+                'route_code': route.code,
+                'route_name': route.name,
+                'sequence': item.get('sequence'),
+                'equipment': item['equipment_id'],
+                'equipment_code': asset[0],
+                'equipment_name': asset[1],
+                'template': template.id,
+                'template_code': template.code,
+                'frequency_days': template.frequency_days,
+                'last_inspected_at': last,
+                'due_at': last + timedelta(days=template.frequency_days) if last else None,
+            })
+        entries[route.id] = route_entries
+    return entries
+
+
+def route_entries(routes):
+    """
+    Get the schedule entries of routes, from the cache where possible
+
+    Only routes missing from the cache are computed, together in one pass.
+
+    Returns:
+        dict: route ID -> list of entries
+    """
+    version = _version()
+    keys = {route.id: _cache_key(route.id, route.updated_at, version) for route in routes}
+    cached = cache.get_many(keys.values())
+
+    entries = {}
+    missing = []
+    for route in routes:
+        if keys[route.id] in cached:
+            entries[route.id] = cached[keys[route.id]]
+        else:
+            missing.append(route)
+
+    if missing:
+        computed = build_route_entries(missing)
+        timeout = _setting('INSPECTION_DUE_CACHE_SECONDS', 6 * 3600)
+        cache.set_many({keys[route_id]: value for route_id, value in computed.items()}, timeout)
+        entries.update(computed)
+    return entries
+
+
+def due_list(routes, horizon_days=None, now=None):
+    """
+    Get overdue and upcoming inspections of routes
+
+    Entries never inspected are due immediately. Status is derived from
+    the current time on every call, so cached entries never go stale as
+    time passes.
+
+    Args:
+        routes: InspectionRoute objects
+        horizon_days: How far ahead to list upcoming inspections
+        now: Reference time (defaults to now)
+
+    Returns:
+        list: Entries with status 'overdue' or 'upcoming', most urgent first
+    """
+    now = now or timezone.now()
+    if horizon_days is None:
+        horizon_days = _setting('INSPECTION_DUE_HORIZON_DAYS', 3)
+    horizon = now + timedelta(days=horizon_days)
+
+    due = []
+    for entries in route_entries(routes).values():
+        for entry in entries:
+            due_at = entry['due_at']
+            if due_at is None or due_at <= now:
+                due.append({**entry, 'status': 'overdue'})
+            elif due_at <= horizon:
+                due.append({**entry, 'status': 'upcoming'})
+    due.sort(key=lambda entry: (entry['due_at'] is not None, entry['due_at'] or now, entry['route_code'],
+                                entry['sequence'] or 0))
+    return due
+
+
+def note_inspections(records):
+    """
+    Patch cached due lists with newly saved inspection records
+
+    Rather than rebuilding, each cached entry for the same equipment and
+    template moves its last inspection forward.
+
+    Args:
+        records: Saved InspectionRecord objects with a template
+    """
+    latest = {}
+    for record in records:
+        if record.template_id is None:
+            continue
+        key = (record.equipment_id, record.template_id)
+        if key not in latest or record.created_at > latest[key]:
+            latest[key] = record.created_at
+    if not latest:
+        return
+
+    version = _version()
+    keys = [
+        _cache_key(route_id, updated_at, version)
+        for route_id, updated_at in InspectionRoute.objects.filter(is_active=True).values_list('id', 'updated_at')
+    ]
+    cached = cache.get_many(keys)
+    changed = {}
+    for key, entries in cached.items():
+        for entry in entries:
+            last = latest.get((entry['equipment'], entry['template']))
+            if last and (entry['last_inspected_at'] is None or last > entry['last_inspected_at']):
+                entry['last_inspected_at'] = last
+                entry['due_at'] = last + timedelta(days=entry['frequency_days'])
+                changed[key] = entries
+    if changed:
+        cache.set_many(changed, _setting('INSPECTION_DUE_CACHE_SECONDS', 6 * 3600))
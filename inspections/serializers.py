@@ -0,0 +1,167 @@
+"""
+Serializers for Inspections app
+"""
+from rest_framework import serializers
+
+from assets.models import Asset
+from .models import InspectionRecord, InspectionTemplate, InspectionRoute
+
+
+class InspectionTemplateSerializer(serializers.ModelSerializer):
+    """Serializer for InspectionTemplate model"""
+
+    class Meta:
+        model = InspectionTemplate
+        fields = [
+            'id', 'code', 'name', 'description', 'items_template', 'equipment_type',
+            'frequency_days', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_items_template(self, value):
+        """Require a list of items with unique names"""
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError("Must be a non-empty list of items")
+        names = []
+        for spec in value:
+            if not isinstance(spec, dict) or not spec.get('item'):
+                raise serializers.ValidationError("Every item needs an 'item' name")
+            names.append(spec['item'])
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError("Item names must be unique")
+        return value
+
+
+class InspectionRouteSerializer(serializers.ModelSerializer):
+    """Serializer for InspectionRoute model"""
+    inspector_name = serializers.CharField(source='inspector.full_name', read_only=True)
+
+    class Meta:
+        model = InspectionRoute
+        fields = [
+            'id', 'code', 'name', 'description', 'route_items', 'estimated_duration_minutes',
+            'inspector', 'inspector_name', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_route_items(self, value):
+        """Require equipment and template IDs that exist"""
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Must be a list of route items")
+        for entry in value:
+            if not isinstance(entry, dict) or not isinstance(entry.get('equipment_id'), int) \
+                    or not isinstance(entry.get('template_id'), int):
+                raise serializers.ValidationError("Every route item needs integer equipment_id and template_id")
+
+        equipment_ids = {entry['equipment_id'] for entry in value}
+        template_ids = {entry['template_id'] for entry in value}
+        missing_assets = equipment_ids - set(Asset.objects.filter(id__in=equipment_ids).values_list('id', flat=True))
+        missing_templates = template_ids - set(
+            InspectionTemplate.objects.filter(id__in=template_ids).values_list('id', flat=True)
+        )
+        if missing_assets:
+            raise serializers.ValidationError(f"Equipment not found: {sorted(missing_assets)}")
+        if missing_templates:
+            raise serializers.ValidationError(f"Templates not found: {sorted(missing_templates)}")
+        return sorted(value, key=lambda entry: entry.get('sequence', 0))
+
+
+class InspectionRecordSerializer(serializers.ModelSerializer):
+    """Serializer for InspectionRecord model"""
+    equipment_code = serializers.CharField(source='equipment.code', read_only=True)
+    equipment_name = serializers.CharField(source='equipment.name', read_only=True)
+    template_code = serializers.CharField(source='template.code', read_only=True, allow_null=True)
+    inspector_name = serializers.CharField(source='inspector.full_name', read_only=True)
+    result_display = serializers.CharField(source='get_result_display', read_only=True)
+
+    class Meta:
+        model = InspectionRecord
+        fields = [
+            'id', 'equipment', 'equipment_code', 'equipment_name', 'route', 'template',
+            'template_code', 'items', 'inspector', 'inspector_name', 'result', 'result_display',
+            'triggered_work_order', 'notes', 'created_at'
+        ]
+        read_only_fields = ['id', 'inspector', 'result', 'triggered_work_order', 'created_at']
+
+    def validate(self, attrs):
+        """Validate items against the template, if one is given"""
+        items = attrs.get('items', getattr(self.instance, 'items', None))
+        if not isinstance(items, list) or not items:
+            raise serializers.ValidationError({"items": "Must be a non-empty list of items"})
+        template = attrs.get('template', getattr(self.instance, 'template', None))
+        if template is not None:
+            errors = template.validate_items(items)
+            if errors:
+                raise serializers.ValidationError({"items": errors})
+        return attrs
+
+
+class RouteEntrySerializer(serializers.Serializer):
+    """Serializer for the readings of one piece of equipment in a route round"""
+    equipment = serializers.IntegerField()
+    template = serializers.IntegerField(required=False)
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class RouteSubmissionSerializer(serializers.Serializer):
+    """
+    Serializer for a whole route round submitted at once
+
+    Expects the route in context. Entries are checked against the route's
+    equipment and their templates with one query per model; errors are
+    reported per entry.
+    """
+    entries = RouteEntrySerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_entries(self, entries):
+        """Resolve templates for all entries and validate their items"""
+        route = self.context['route']
+        route_templates = {}
+        for entry in route.route_items or []:
+            route_templates.setdefault(entry.get('equipment_id'), []).append(entry.get('template_id'))
+
+        template_ids = {entry['template'] for entry in entries if 'template' in entry}
+        template_ids.update(tid for tids in route_templates.values() for tid in tids)
+        templates = InspectionTemplate.objects.filter(id__in=template_ids, is_active=True).in_bulk()
+
+        errors = []
+        resolved = []
+        seen = set()
+        for entry in entries:
+            entry_errors = {}
+            allowed = route_templates.get(entry['equipment'], [])
+            template_id = entry.get('template')
+            if not allowed:
+                entry_errors['equipment'] = f"Equipment {entry['equipment']} is not on route {route.code}"
+            elif template_id is None:
+                if len(allowed) > 1:
+                    entry_errors['template'] = "Template is required for equipment with several templates"
+                else:
+                    template_id = allowed[0]
+            elif template_id not in allowed:
+                entry_errors['template'] = f"Template {template_id} is not assigned to this equipment on the route"
+
+            template = templates.get(template_id)
+            if not entry_errors:
+                if template is None:
+                    entry_errors['template'] = f"Template {template_id} not found or inactive"
+                elif (entry['equipment'], template_id) in seen:
+                    entry_errors['equipment'] = "Equipment and template submitted more than once"
+                else:
+                    item_errors = template.validate_items(entry['items'])
+                    if item_errors:
+                        entry_errors['items'] = item_errors
+            seen.add((entry['equipment'], template_id))
+
+            errors.append(entry_errors)
+            resolved.append({
+                'equipment_id': entry['equipment'],
+                'template': template,
+                'items': entry['items'],
+                'notes': entry.get('notes', ''),
+            })
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return resolved
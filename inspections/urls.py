@@ -1,8 +1,18 @@
 """
 URL configuration for Inspections app
 """
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import InspectionRecordViewSet, InspectionTemplateViewSet, InspectionRouteViewSet
+
+
+router = DefaultRouter()
+router.register(r'templates', InspectionTemplateViewSet, basename='inspectiontemplate')
+router.register(r'routes', InspectionRouteViewSet, basename='inspectionroute')
+# Records are served at the app root, where the frontend already expects them
+router.register(r'', InspectionRecordViewSet, basename='inspectionrecord')
 
 urlpatterns = [
-    # Inspection endpoints will be added here
+    path('', include(router.urls)),
 ]
@@ -1,3 +1,223 @@
-from django.shortcuts import render
+"""
+Views for Inspections app
+"""
+from datetime import datetime, time, timedelta
 
-# Create your views here.
+from rest_framework import viewsets, status, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, BasePermission
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from assets.models import Asset
+from users.scoping import SiteScopedMixin, scope_queryset
+
+from .models import InspectionRecord, InspectionTemplate, InspectionRoute
+from .serializers import (
+    InspectionRecordSerializer,
+    InspectionTemplateSerializer,
+    InspectionRouteSerializer,
+    RouteSubmissionSerializer
+)
+from .rounds import submit_round, auto_cm_enabled
+from .rules import create_corrective_work_orders
+from . import measurements
+from .schedule import due_list
+
+
+class IsAdminOrSupervisorOrReadOnly(BasePermission):
+    """
+    自定义权限：admin和supervisor可以修改，其他用户只读
+    """
+    def has_permission(self, request, view):
+        # 读取操作允许所有认证用户
+        if request.method in ['GET', 'HEAD', 'OPTIONS']:
+            return request.user.is_authenticated
+        # 创建/更新/删除只允许admin或supervisor
+        return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
+
+
+class CanRecordInspections(BasePermission):
+    """
+    自定义权限：所有认证用户可以查看和提交点检记录，只有admin和supervisor可以修改或删除
+    """
+    def has_permission(self, request, view):
+        if request.method in ['GET', 'HEAD', 'OPTIONS', 'POST']:
+            return request.user.is_authenticated
+        return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
+
+
+class InspectionRecordViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+    """ViewSet for InspectionRecord model"""
+    queryset = InspectionRecord.objects.select_related('equipment', 'template', 'inspector').all()
+    serializer_class = InspectionRecordSerializer
+    permission_classes = [CanRecordInspections]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['equipment', 'result', 'route', 'template', 'inspector']
+    search_fields = ['equipment__code', 'equipment__name', 'route', 'notes']
+    ordering_fields = ['created_at', 'result']
+    ordering = ['-created_at']
+
+    def perform_create(self, serializer):
+        """Set inspector on create and raise a CM work order if the inspection failed"""
+        # A failed record is only kept together with its corrective work order
+        with transaction.atomic():
+            record = serializer.save(inspector=self.request.user)
+            if auto_cm_enabled():
+                create_corrective_work_orders([record], self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        """
+        Get the readings of one inspection item over time for one or more assets
+
+        Query params:
+            equipment: Comma-separated asset IDs (at most 500)
+            item: Inspection item name, e.g. Vibration
+            start, end: Date or datetime range (defaults to the last 365 days)
+            bucket: raw, hour, day, week, month or auto (default)
+        """
+        item = request.query_params.get('item')
+        try:
+            equipment_ids = [int(value) for value in request.query_params.get('equipment', '').split(',') if value]
+        except ValueError:
+            equipment_ids = []
+        if not item or not equipment_ids or len(equipment_ids) > 500:
+            return Response(
+                {"error": "item and equipment (1-500 comma-separated asset IDs) are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bucket = request.query_params.get('bucket', 'auto')
+        if bucket not in ['auto', 'raw', *measurements.BUCKETS]:
+            return Response({"error": f"Unknown bucket '{bucket}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = self._parse_time(request.query_params.get('end')) or timezone.now()
+            start = self._parse_time(request.query_params.get('start')) or end - timedelta(days=365)
+        except ValueError:
+            return Response({"error": "start and end must be dates or datetimes"}, status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({"error": "start must be before end"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Assets outside the user's sites are dropped like unknown IDs
+        codes = dict(scope_queryset(Asset.objects.filter(id__in=equipment_ids), request.user)
+                     .values_list('id', 'code'))
+        bucket, series = measurements.trend(list(codes), item, start, end, bucket)
+        return Response({
+            "item": item,
+            "bucket": bucket,
+            "start": start,
+            "end": end,
+            "series": [
+                {'equipment': equipment_id, 'equipment_code': codes.get(equipment_id), 'points': points}
+                for equipment_id, points in series.items() if equipment_id in codes
+            ]
+        })
+
+    @staticmethod
+    def _parse_time(value):
+        """
+        Parse a date or datetime query parameter into an aware datetime
+
+        Raises:
+            ValueError: If the value is not a valid date or datetime
+        """
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Invalid date: {value}")
+            parsed = datetime.combine(day, time.min)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+
+class InspectionTemplateViewSet(viewsets.ModelViewSet):
+    """ViewSet for InspectionTemplate model"""
+    queryset = InspectionTemplate.objects.all()
+    serializer_class = InspectionTemplateSerializer
+    permission_classes = [IsAdminOrSupervisorOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['equipment_type', 'is_active']
+    search_fields = ['code', 'name', 'description']
+    ordering = ['code']
+
+
+class InspectionRouteViewSet(viewsets.ModelViewSet):
+    """ViewSet for InspectionRoute model"""
+    queryset = InspectionRoute.objects.select_related('inspector').all()
+    serializer_class = InspectionRouteSerializer
+    permission_classes = [IsAdminOrSupervisorOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['inspector', 'is_active']
+    search_fields = ['code', 'name', 'description']
+    ordering = ['code']
+
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """
+        Get overdue and upcoming inspections for the active routes
+
+        Query params:
+            route: Limit to one route ID
+            inspector: Limit to routes of an inspector ID
+            mine: true to limit to the current user's routes
+            horizon: Days ahead to include upcoming inspections
+            status: overdue or upcoming
+        """
+        routes = self.filter_queryset(self.get_queryset()).filter(is_active=True)
+        if request.query_params.get('route'):
+            try:
+                routes = routes.filter(id=int(request.query_params['route']))
+            except ValueError:
+                return Response({"error": "route must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('mine') == 'true':
+            routes = routes.filter(inspector=request.user)
+
+        try:
+            horizon = int(request.query_params['horizon']) if 'horizon' in request.query_params else None
+        except ValueError:
+            return Response({"error": "horizon must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = due_list(list(routes.select_related(None).only('id', 'code', 'name', 'route_items', 'updated_at')), horizon)
+        wanted = request.query_params.get('status')
+        if wanted:
+            entries = [entry for entry in entries if entry['status'] == wanted]
+        return Response({"generated_at": timezone.now(), "count": len(entries), "results": entries})
+
+    def get_queryset_for_records(self):
+        """Get inspection records with the relations the record serializer reads"""
+        return InspectionRecordViewSet.queryset.order_by('id')
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def submit(self, request, pk=None):
+        """
+        Submit a whole route round in one request
+
+        Every entry is validated against the route and its template before
+        anything is written; the round is stored completely or not at all.
+        """
+        route = self.get_object()
+        if not route.is_active:
+            return Response({"error": "Route is not active"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RouteSubmissionSerializer(data=request.data, context={'route': route})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        created = submit_round(route, serializer.validated_data['entries'], request.user)
+        records = self.get_queryset_for_records().filter(id__in=[record.id for record in created])
+        return Response({
+            "count": len(created),
+            "failed": sum(1 for record in created if record.result == 'fail'),
+            "warnings": sum(1 for record in created if record.result == 'warning'),
+            "work_orders": len({record.triggered_work_order_id for record in created} - {None}),
+            "records": InspectionRecordSerializer(records, many=True).data
+        }, status=status.HTTP_201_CREATED)
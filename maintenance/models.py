@@ -5,6 +5,7 @@ Preventive Maintenance (PM) planning and scheduling
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
+from users.tracking import TrackedFieldsMixin
 from assets.models import Asset
 
 User = get_user_model()
@@ -25,11 +26,16 @@ class FrequencyUnit(models.TextChoices):
     YEAR = 'year', 'Year(s)'
 
 
-class MaintenancePlan(models.Model):
+class MaintenancePlan(TrackedFieldsMixin, models.Model):
     """
     Maintenance Plan - defines schedules for preventive maintenance
     Can be time-based or counter-based (meter reading)
     """
+    tracked_fields = (
+        'equipment', 'title', 'trigger_type', 'frequency_value', 'frequency_unit', 'counter_threshold', 'priority',
+        'is_active', 'last_generated_date',
+    )
+
     id = models.BigAutoField(primary_key=True)
     code = models.CharField(
         max_length=50,
@@ -162,7 +168,8 @@ class MaintenancePlan(models.Model):
     )
     updated_at = models.DateTimeField(
         auto_now=True,
-        verbose_name='Updated At'
+        verbose_name='Updated At',
+        db_index=True
     )
 
     class Meta:
@@ -179,6 +186,49 @@ class MaintenancePlan(models.Model):
     def __str__(self):
         return f"{self.code} - {self.title} ({self.equipment.code})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Generation dates feed PM compliance
+        from django.db import transaction
+        from reports.compliance import invalidate_compliance_cache
+        transaction.on_commit(invalidate_compliance_cache)
+
+    def delete(self, *args, **kwargs):
+        # Shared report runs over the old plans must not be reused
+        from django.db import transaction
+        from reports.engine import note_source_deletion
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            note_source_deletion()
+        return result
+
+    def next_due_date(self):
+        """
+        Get the date the next work order of a time-based plan is due
+
+        Returns:
+            date: last_generated_date plus one frequency, or None if the plan
+                has never generated or is not time-based
+        """
+        if self.trigger_type != TriggerType.TIME or not self.last_generated_date:
+            return None
+
+        from datetime import timedelta
+        from dateutil.relativedelta import relativedelta
+
+        # Calculate next due date based on frequency
+        if self.frequency_unit == FrequencyUnit.DAY:
+            return self.last_generated_date + timedelta(days=self.frequency_value)
+        elif self.frequency_unit == FrequencyUnit.WEEK:
+            return self.last_generated_date + timedelta(weeks=self.frequency_value)
+        elif self.frequency_unit == FrequencyUnit.MONTH:
+            return self.last_generated_date + relativedelta(months=self.frequency_value)
+        elif self.frequency_unit == FrequencyUnit.QUARTER:
+            return self.last_generated_date + relativedelta(months=self.frequency_value * 3)
+        elif self.frequency_unit == FrequencyUnit.YEAR:
+            return self.last_generated_date + relativedelta(years=self.frequency_value)
+        return None
+
     def check_should_generate(self, current_date=None, current_counter=None):
         """
         Check if a work order should be generated based on the plan
@@ -201,21 +251,8 @@ class MaintenancePlan(models.Model):
             if not self.last_generated_date:
                 return True
 
-            from datetime import timedelta
-            from dateutil.relativedelta import relativedelta
-
-            # Calculate next due date based on frequency
-            if self.frequency_unit == FrequencyUnit.DAY:
-                next_due = self.last_generated_date + timedelta(days=self.frequency_value)
-            elif self.frequency_unit == FrequencyUnit.WEEK:
-                next_due = self.last_generated_date + timedelta(weeks=self.frequency_value)
-            elif self.frequency_unit == FrequencyUnit.MONTH:
-                next_due = self.last_generated_date + relativedelta(months=self.frequency_value)
-            elif self.frequency_unit == FrequencyUnit.QUARTER:
-                next_due = self.last_generated_date + relativedelta(months=self.frequency_value * 3)
-            elif self.frequency_unit == FrequencyUnit.YEAR:
-                next_due = self.last_generated_date + relativedelta(years=self.frequency_value)
-            else:
+            next_due = self.next_due_date()
+            if next_due is None:
                 return False
 
             return current_date >= next_due
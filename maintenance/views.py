@@ -9,6 +9,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from users.scoping import SiteScopedMixin
+
 from .models import MaintenancePlan, WorkOrderTemplate
 from .serializers import (
     MaintenancePlanSerializer,
@@ -31,7 +33,7 @@ class IsAdminOrSupervisorOrReadOnly(BasePermission):
         return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
 
 
-class MaintenancePlanViewSet(viewsets.ModelViewSet):
+class MaintenancePlanViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     """ViewSet for MaintenancePlan model"""
     queryset = MaintenancePlan.objects.select_related(
         'equipment', 'created_by'
@@ -54,6 +56,11 @@ class MaintenancePlanViewSet(viewsets.ModelViewSet):
         """Set created_by on create"""
         serializer.save(created_by=self.request.user)
 
+    def perform_update(self, serializer):
+        """Log the changed fields on update"""
+        from users.audit import log_changes
+        log_changes(self.request.user, serializer.save())
+
     @action(detail=True, methods=['post'])
     def generate_work_order(self, request, pk=None):
         """Generate a work order from this maintenance plan"""
@@ -2,7 +2,8 @@
 Django Admin configuration for Reports app
 """
 from django.contrib import admin
-from .models import ScheduledReport, ReportRun
+from .models import (ScheduledReport, ReportRun, ETLWatermark, WorkOrderDailyFact, PartUsageDailyFact,
+                     InspectionDailyFact)
 
 
 @admin.register(ScheduledReport)
@@ -18,7 +19,8 @@ class ScheduledReportAdmin(admin.ModelAdmin):
 @admin.register(ReportRun)
 class ReportRunAdmin(admin.ModelAdmin):
     """Admin interface for ReportRun model"""
-    list_display = ['report_type', 'status', 'output_format', 'requested_by', 'started_at', 'completed_at', 'created_at']
+    list_display = ['report_type', 'status', 'output_format', 'output_size', 'requested_by', 'started_at',
+                    'completed_at', 'created_at']
     list_filter = ['report_type', 'status', 'output_format', 'created_at']
     search_fields = ['report_type', 'requested_by__username', 'output_file']
     ordering = ['-created_at']
@@ -30,3 +32,58 @@ class ReportRunAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ETLWatermark)
+class ETLWatermarkAdmin(admin.ModelAdmin):
+    """Admin interface for ETLWatermark model"""
+    list_display = ['name', 'high_water', 'last_run_at', 'rows_written']
+    readonly_fields = ['name', 'high_water', 'last_run_at', 'rows_written']
+
+
+@admin.register(WorkOrderDailyFact)
+class WorkOrderDailyFactAdmin(admin.ModelAdmin):
+    """Admin interface for WorkOrderDailyFact model"""
+    list_display = ['equipment', 'day', 'wo_type', 'opened', 'completed', 'ended', 'downtime_minutes', 'total_cost']
+    list_filter = ['wo_type', 'day']
+    search_fields = ['equipment__code', 'equipment__name']
+    ordering = ['-day']
+    raw_id_fields = ['equipment']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PartUsageDailyFact)
+class PartUsageDailyFactAdmin(admin.ModelAdmin):
+    """Admin interface for PartUsageDailyFact model"""
+    list_display = ['part', 'equipment', 'day', 'in_quantity', 'out_quantity', 'out_cost']
+    list_filter = ['day']
+    search_fields = ['part__part_code', 'part__name', 'equipment__code']
+    ordering = ['-day']
+    raw_id_fields = ['part', 'equipment']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InspectionDailyFact)
+class InspectionDailyFactAdmin(admin.ModelAdmin):
+    """Admin interface for InspectionDailyFact model"""
+    list_display = ['equipment', 'template', 'day', 'inspections', 'passed', 'warnings', 'failed']
+    list_filter = ['day']
+    search_fields = ['equipment__code', 'equipment__name']
+    ordering = ['-day']
+    raw_id_fields = ['equipment', 'template']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
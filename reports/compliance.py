@@ -0,0 +1,246 @@
+"""
+PM compliance for Reports app
+Measures whether preventive maintenance was done on time, per plan, asset or location
+"""
+import hashlib
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateTimeField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+CACHE_PREFIX = 'reports:pm-compliance'
+
+# Level -> (work order fields identifying a group, matching plan fields, result names)
+LEVELS = {
+    'plan': (
+        ['maintenance_plan_id', 'maintenance_plan__code', 'maintenance_plan__title', 'equipment__code'],
+        ['id', 'code', 'title', 'equipment__code'],
+        ['plan', 'plan_code', 'plan_title', 'equipment_code'],
+    ),
+    'asset': (
+        ['equipment_id', 'equipment__code', 'equipment__name'],
+        ['equipment_id', 'equipment__code', 'equipment__name'],
+        ['equipment', 'equipment_code', 'equipment_name'],
+    ),
+    'line': (
+        ['equipment__factory', 'equipment__workshop', 'equipment__line'],
+        ['equipment__factory', 'equipment__workshop', 'equipment__line'],
+        ['factory', 'workshop', 'line'],
+    ),
+    'workshop': (
+        ['equipment__factory', 'equipment__workshop'],
+        ['equipment__factory', 'equipment__workshop'],
+        ['factory', 'workshop'],
+    ),
+    'factory': (['equipment__factory'], ['equipment__factory'], ['factory']),
+    'plant': ([], [], []),
+}
+
+COUNTS = ['scheduled', 'on_time', 'late', 'missed', 'pending', 'not_generated']
+
+# Plan frequency unit -> period of one frequency step
+PERIODS = {
+    'day': relativedelta(days=1),
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+    'quarter': relativedelta(months=3),
+    'year': relativedelta(years=1),
+}
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _version():
+    """Get the cache generation; bumped when PM work orders or plans change"""
+    return cache.get_or_set(f'{CACHE_PREFIX}:version', 1, None)
+
+
+def invalidate_compliance_cache():
+    """Drop every cached compliance result"""
+    try:
+        cache.incr(f'{CACHE_PREFIX}:version')
+    except ValueError:
+        cache.set(f'{CACHE_PREFIX}:version', 2, None)
+
+
+def _first_period(anchor, step, first, day):
+    """Get the smallest period k >= first with anchor + k * step on or after a day"""
+    span = max((anchor + step - anchor).days, 1)
+    k = max(first, (day - anchor).days // span)
+    while k > first and anchor + step * (k - 1) >= day:
+        k -= 1
+    while anchor + step * k < day:
+        k += 1
+    return k
+
+
+def _missed_generation(plans, start, end, cutoff):
+    """
+    Count the periods time-based plans never generated a work order for
+
+    Every due date after the last generation (or from the plan's creation
+    on, for a plan that never generated) that falls inside the period and
+    has already passed counts once. Due dates are counted arithmetically,
+    without walking the periods.
+
+    Args:
+        plans: Plan value dicts with frequency, last_generated_date,
+            created_at and group_key
+        start: Start of the period
+        end: End of the period (exclusive)
+        cutoff: Due dates before this have passed
+
+    Returns:
+        dict: group key -> missed generations
+    """
+    first_day = timezone.localtime(start).date()
+    # Last day whose midnight is before both the period end and the cutoff
+    last_day = timezone.localtime(min(end, cutoff) - timedelta(microseconds=1)).date()
+    missed = defaultdict(int)
+    if last_day < first_day:
+        return missed
+    for plan in plans:
+        unit = PERIODS.get(plan['frequency_unit'])
+        if unit is None or not plan['frequency_value']:
+            continue
+        step = unit * plan['frequency_value']
+        if plan['last_generated_date']:
+            anchor, first = plan['last_generated_date'], 1
+        else:
+            anchor, first = timezone.localtime(plan['created_at']).date(), 0
+        count = (_first_period(anchor, step, first, last_day + timedelta(days=1))
+                 - _first_period(anchor, step, first, first_day))
+        if count:
+            missed[plan['group_key']] += count
+    return missed
+
+
+def pm_compliance(start_date, end_date, level='plan', filters=None, sites=None, now=None):
+    """
+    Get PM compliance per group over a date window
+
+    Every PM work order generated from a plan is due on its planned end
+    (or planned start, or creation if neither is set) and has
+    PM_OVERDUE_ALERT_DAYS of grace. One grouped query classifies them:
+
+    - on_time: done by the deadline
+    - late: done after the deadline
+    - missed: canceled, or still not done past the deadline
+    - pending: not done, deadline not reached yet
+
+    Each period a time-based plan is overdue without a generated work
+    order, including plans that never generated one, counts as
+    not_generated and is missed as well.
+
+    Args:
+        start_date: First day of the window
+        end_date: Last day of the window (inclusive)
+        level: plan, asset, line, workshop, factory or plant
+        filters: Optional dict with factory, workshop, line or equipment (IDs)
+        sites: Optional sites to limit the equipment to (see users.scoping.user_sites)
+        now: Reference time (defaults to now)
+
+    Returns:
+        list: One dict per group with counts and rates (%)
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level: {level}")
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    filters = filters or {}
+    now = now or timezone.now()
+
+    key = hashlib.sha1(json.dumps(
+        [start_date.isoformat(), end_date.isoformat(), level, filters, sites], sort_keys=True, default=str
+    ).encode()).hexdigest()
+    cache_key = f'{CACHE_PREFIX}:{_version()}:{key}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = _compute(start_date, end_date, level, filters, sites, now)
+    cache.set(cache_key, result, _setting('PM_COMPLIANCE_CACHE_SECONDS', 3600))
+    return result
+
+
+def _compute(start_date, end_date, level, filters, sites, now):
+    from maintenance.models import MaintenancePlan, TriggerType
+    from users.scoping import sites_filter
+    from workorders.models import WorkOrder, WorkOrderStatus, WorkOrderType
+
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    grace = timedelta(days=_setting('PM_OVERDUE_ALERT_DAYS', 7))
+    cutoff = now - grace
+
+    work_orders = WorkOrder.objects.filter(wo_type=WorkOrderType.PM, maintenance_plan__isnull=False)
+    plans = MaintenancePlan.objects.filter(is_active=True, trigger_type=TriggerType.TIME)
+    for field in ['factory', 'workshop', 'line']:
+        if filters.get(field):
+            work_orders = work_orders.filter(**{f'equipment__{field}': filters[field]})
+            plans = plans.filter(**{f'equipment__{field}': filters[field]})
+    if filters.get('equipment'):
+        work_orders = work_orders.filter(equipment_id__in=filters['equipment'])
+        plans = plans.filter(equipment_id__in=filters['equipment'])
+    if sites is not None:
+        work_orders = work_orders.filter(sites_filter(sites, 'equipment__'))
+        plans = plans.filter(sites_filter(sites, 'equipment__'))
+
+    done = Q(done_at__isnull=False)
+    canceled = Q(status=WorkOrderStatus.CANCELED)
+    work_orders = work_orders.annotate(
+        due_at=Coalesce('planned_end', 'planned_start', 'created_at'),
+        done_at=Coalesce('actual_end', 'completed_at'),
+    ).annotate(
+        deadline=ExpressionWrapper(F('due_at') + Value(grace), output_field=DateTimeField()),
+    ).filter(due_at__gte=start, due_at__lt=end)
+
+    fields, plan_fields, names = LEVELS[level]
+    counts = {
+        'scheduled': Count('id'),
+        'on_time': Count('id', filter=done & Q(done_at__lte=F('deadline')) & ~canceled),
+        'late': Count('id', filter=done & Q(done_at__gt=F('deadline')) & ~canceled),
+        'missed': Count('id', filter=canceled | (~done & Q(due_at__lt=cutoff))),
+        'pending': Count('id', filter=~done & ~canceled & Q(due_at__gte=cutoff)),
+    }
+    if fields:
+        rows = list(work_orders.order_by().values(*fields).annotate(**counts))
+    else:
+        rows = [work_orders.aggregate(**counts)]
+
+    plan_list = list(plans.order_by().values(
+        'frequency_unit', 'frequency_value', 'last_generated_date', 'created_at',
+        **{f'g{index}': F(field) for index, field in enumerate(plan_fields)}
+    ))
+    for plan in plan_list:
+        plan['group_key'] = tuple(plan[f'g{index}'] for index in range(len(plan_fields)))
+    not_generated = _missed_generation(plan_list, start, end, cutoff)
+
+    groups = {tuple(row[field] for field in fields): row for row in rows}
+    for group_key, count in not_generated.items():
+        row = groups.setdefault(group_key, {
+            **dict(zip(fields, group_key)), **{name: 0 for name in counts}
+        })
+        row['not_generated'] = count
+
+    results = []
+    for group_key, row in groups.items():
+        entry = dict(zip(names, group_key))
+        entry.update({name: row.get(name) or 0 for name in COUNTS})
+        entry['scheduled'] += entry['not_generated']
+        entry['missed'] += entry['not_generated']
+        closed_out = entry['scheduled'] - entry['pending']
+        for name in ['on_time', 'late', 'missed']:
+            entry[f'{name}_rate'] = round(entry[name] * 100 / closed_out, 1) if closed_out else None
+        results.append(entry)
+    labels = [name for name in names if name not in ('plan', 'equipment')]
+    results.sort(key=lambda entry: [str(entry[name] or '') for name in labels])
+    return results
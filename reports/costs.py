@@ -0,0 +1,178 @@
+"""
+Cost cube for Reports app
+Slices maintenance cost by cost center, location, criticality, work order type and month
+"""
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ETLWatermark, WorkOrderDailyFact
+
+CACHE_PREFIX = 'reports:cost-cube'
+
+# Dimension -> fact field
+DIMENSIONS = {
+    'cost_center': 'equipment__cost_center',
+    'factory': 'equipment__factory',
+    'workshop': 'equipment__workshop',
+    'line': 'equipment__line',
+    'criticality': 'equipment__criticality',
+    'wo_type': 'wo_type',
+    'month': 'month',
+}
+
+MEASURES = ['work_orders', 'labor_hours', 'parts_cost', 'total_cost']
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _base(start_month, end_month):
+    """
+    Get completed work order cost per asset, month and work order type
+
+    This finest grain is aggregated from the daily facts once and cached;
+    every slice and drill-down is rolled up from it in memory. The cache
+    key carries the fact watermark, so an ETL run retires stale cubes.
+    """
+    mark = ETLWatermark.objects.filter(name='work_order_daily').values_list('high_water', flat=True).first()
+    cache_key = f'{CACHE_PREFIX}:{mark.isoformat() if mark else 0}:{start_month}:{end_month}'
+    frame = cache.get(cache_key)
+    if frame is not None:
+        return frame
+
+    next_month = (end_month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    facts = WorkOrderDailyFact.objects.filter(day__gte=start_month, day__lt=next_month, completed__gt=0)
+    fields = [field for field in DIMENSIONS.values() if field != 'month']
+    rows = facts.annotate(month=TruncMonth('day')).order_by().values('equipment_id', 'month', *fields).annotate(
+        # Aliased since measures share names with fact fields
+        m_work_orders=Sum('completed'),
+        m_labor_hours=Sum('labor_hours'),
+        m_parts_cost=Sum('parts_cost'),
+        m_total_cost=Sum('total_cost'),
+    )
+    frame = pd.DataFrame(
+        list(rows.iterator(chunk_size=2000)),
+        columns=['equipment_id', 'month', *fields, *[f'm_{name}' for name in MEASURES]],
+    ).rename(columns={
+        **{field: name for name, field in DIMENSIONS.items()}, **{f'm_{name}': name for name in MEASURES}
+    })
+    frame['month'] = frame['month'].map(lambda value: value.strftime('%Y-%m'))
+    frame[MEASURES] = frame[MEASURES].astype(float)
+    cache.set(cache_key, frame, _setting('COST_CUBE_CACHE_SECONDS', 3600))
+    return frame
+
+
+def _sliced(start_month, end_month, filters, sites=None):
+    frame = _base(start_month, end_month)
+    for name, value in (filters or {}).items():
+        if value:
+            frame = frame[frame[name] == value]
+    if sites is not None:
+        keep = pd.Series(False, index=frame.index)
+        for factory, workshop in sites:
+            site = frame['factory'] == factory
+            if workshop:
+                site &= frame['workshop'] == workshop
+            keep |= site
+        frame = frame[keep]
+    return frame
+
+
+def _records(frame):
+    frame = frame.round({name: 2 for name in MEASURES})
+    frame['work_orders'] = frame['work_orders'].astype(int)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def cost_cube(start_month, end_month, group_by=None, filters=None, sites=None):
+    """
+    Get maintenance cost grouped by any combination of dimensions
+
+    Args:
+        start_month: First month of the window (any date in it)
+        end_month: Last month of the window (inclusive, any date in it)
+        group_by: Dimension names (see DIMENSIONS); none gives the grand total
+        filters: Optional dict of dimension name -> value to drill into
+        sites: Optional sites to limit the equipment to (see users.scoping.user_sites)
+
+    Returns:
+        list: One dict per group with work_orders, labor_hours, parts_cost and total_cost
+    """
+    group_by = list(group_by or [])
+    unknown = set(group_by) | set(filters or {})
+    unknown -= set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+    if start_month > end_month:
+        raise ValueError("start_month must not be after end_month")
+
+    frame = _sliced(start_month.replace(day=1), end_month.replace(day=1), filters, sites)
+    if group_by:
+        frame = frame.fillna({name: '' for name in group_by}).groupby(group_by, as_index=False)[MEASURES].sum()
+        frame = frame.sort_values(group_by)
+    else:
+        frame = pd.DataFrame([frame[MEASURES].sum()], columns=MEASURES)
+    return _records(frame)
+
+
+def cost_tree(start_month, end_month, filters=None, sites=None):
+    """
+    Get maintenance cost per asset, rolled up through the asset tree
+
+    Each asset gets its own cost and the total of its whole subtree. Own
+    costs are pushed up one generation per step for all assets at once,
+    so the work grows with the tree depth rather than the asset count.
+
+    Args:
+        start_month: First month of the window (any date in it)
+        end_month: Last month of the window (inclusive, any date in it)
+        filters: Optional dict of dimension name -> value
+        sites: Optional sites to limit the equipment to (see users.scoping.user_sites)
+
+    Returns:
+        list: One dict per asset with cost, ordered by asset code
+    """
+    from assets.models import Asset
+    from users.scoping import sites_filter
+
+    unknown = set(filters or {}) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+    if start_month > end_month:
+        raise ValueError("start_month must not be after end_month")
+
+    frame = _sliced(start_month.replace(day=1), end_month.replace(day=1), filters, sites)
+    own = frame.groupby('equipment_id')[MEASURES].sum()
+    assets = Asset.objects.order_by('code')
+    if sites is not None:
+        assets = assets.filter(sites_filter(sites))
+    assets = pd.DataFrame(
+        list(assets.values('id', 'code', 'name', 'parent_id')),
+        columns=['id', 'code', 'name', 'parent_id'],
+    ).set_index('id')
+    assets['parent_id'] = assets['parent_id'].astype('Int64')
+    own = own.reindex(assets.index, fill_value=0.0)
+
+    parents = assets['parent_id']
+    subtree = own.copy()
+    ancestor = parents.dropna().astype('int64')
+    # Bounded by the asset count in case a bad edit made a cycle
+    for _ in range(len(assets)):
+        if ancestor.empty:
+            break
+        subtree = subtree.add(own.loc[ancestor.index].groupby(ancestor.to_numpy()).sum(), fill_value=0.0)
+        ancestor = ancestor.map(parents).dropna().astype('int64')
+
+    frame = assets.join(own).join(subtree.add_prefix('subtree_')).reset_index()
+    frame = frame[frame['subtree_work_orders'] > 0]
+    frame = frame.round({f'subtree_{name}': 2 for name in MEASURES})
+    frame['subtree_work_orders'] = frame['subtree_work_orders'].astype(int)
+    frame = frame.rename(columns={'id': 'equipment', 'parent_id': 'parent'})
+    return _records(frame)
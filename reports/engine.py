@@ -0,0 +1,542 @@
+"""
+Report engine for Reports app
+Runs scheduled and ad-hoc reports as aggregate queries and streams the output to MEDIA_ROOT
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from openpyxl import Workbook
+
+from .models import ETLWatermark, ReportRun, ScheduledReport
+
+logger = logging.getLogger('cmms')
+
+OUTPUT_FORMATS = ['csv', 'xlsx']
+CHUNK_SIZE = 2000
+
+# Report type -> (column headers, function(start, end, parameters) yielding rows, reads fact tables)
+REPORTS = {}
+
+# Source tables of the reports: (model, field stamped on every insert or update)
+DATA_SOURCES = [
+    ('workorders.WorkOrder', 'updated_at'),
+    ('spareparts.SparePart', 'updated_at'),
+    ('spareparts.PartTransaction', 'created_at'),
+    ('inspections.InspectionRecord', 'updated_at'),
+    ('maintenance.MaintenancePlan', 'updated_at'),
+    ('assets.Asset', 'updated_at'),
+]
+
+# Watermark stamped by every delete from a source table
+DELETION_MARK = 'report_source_deletions'
+
+
+def report(report_type, headers, facts=False):
+    """Register a report function for a report type; facts marks reports reading the daily fact tables"""
+    def register(func):
+        REPORTS[report_type] = (headers, func, facts)
+        return func
+    return register
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _day_start(day):
+    """Local midnight at the start of a date, as an aware datetime"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _equipment_filter(queryset, parameters, field='equipment'):
+    """Limit a queryset to the equipment IDs and sites in the report parameters, if any"""
+    from users.scoping import sites_filter
+    equipment = parameters.get('equipment')
+    if equipment:
+        queryset = queryset.filter(**{f'{field}__in': equipment})
+    if parameters.get('sites') is not None:
+        queryset = queryset.filter(sites_filter(parameters['sites'], f'{field}__'))
+    return queryset
+
+
+def report_period(frequency, at=None):
+    """
+    Get the last complete period before a time
+
+    Args:
+        frequency: daily, weekly, monthly or quarterly
+        at: Reference time (defaults to now)
+
+    Returns:
+        tuple: (first date, last date) of the period, both inclusive
+    """
+    today = timezone.localtime(at or timezone.now()).date()
+    if frequency == 'daily':
+        end = today
+        start = end - timedelta(days=1)
+    elif frequency == 'weekly':
+        end = today - timedelta(days=today.weekday())
+        start = end - timedelta(days=7)
+    elif frequency == 'monthly':
+        end = today.replace(day=1)
+        start = (end - timedelta(days=1)).replace(day=1)
+    elif frequency == 'quarterly':
+        end = date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+        previous = end - timedelta(days=1)
+        start = date(previous.year, (previous.month - 1) // 3 * 3 + 1, 1)
+    else:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    return start, end - timedelta(days=1)
+
+
+def next_run_at(frequency, after=None):
+    """
+    Get when a scheduled report is next due
+
+    Reports run at REPORT_RUN_HOUR local time on the first day of the next
+    period, once the previous period is complete.
+    """
+    today = timezone.localtime(after or timezone.now()).date()
+    if frequency == 'daily':
+        day = today + timedelta(days=1)
+    elif frequency == 'weekly':
+        day = today + timedelta(days=7 - today.weekday())
+    elif frequency == 'monthly':
+        day = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    elif frequency == 'quarterly':
+        month = (today.month - 1) // 3 * 3 + 4
+        day = date(today.year + (month > 12), (month - 1) % 12 + 1, 1)
+    else:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    return timezone.make_aware(datetime.combine(day, time(_setting('REPORT_RUN_HOUR', 6))))
+
+
+def _fact_days(start, end):
+    """Fact day range (inclusive) of a report's [start, end) time range"""
+    return {'day__gte': timezone.localdate(start), 'day__lte': timezone.localdate(end - timedelta(days=1))}
+
+
+def _resolve_dates(parameters):
+    """Get the report date range, defaulting to the last 30 days"""
+    end = parse_date(parameters.get('end_date') or '') or timezone.localdate()
+    start = parse_date(parameters.get('start_date') or '') or end - timedelta(days=29)
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+    return _day_start(start), _day_start(end + timedelta(days=1))
+
+
+@report('workorder_summary', ['工单类型', '新建工单', '完成工单', '停机分钟', '工时', '总成本'], facts=True)
+def workorder_summary(start, end, parameters):
+    from .models import WorkOrderDailyFact
+    facts = _equipment_filter(WorkOrderDailyFact.objects.filter(**_fact_days(start, end)), parameters)
+    return facts.order_by('wo_type').values_list('wo_type').annotate(
+        opened_count=Sum('opened'),
+        completed_count=Sum('completed'),
+        downtime=Sum('downtime_minutes'),
+        labor=Sum('labor_hours'),
+        cost=Sum('total_cost'),
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+@report('downtime_analysis', ['设备编码', '设备名称', '停机次数', '停机分钟', '平均停机分钟'], facts=True)
+def downtime_analysis(start, end, parameters):
+    from .models import WorkOrderDailyFact
+    facts = _equipment_filter(WorkOrderDailyFact.objects.filter(**_fact_days(start, end)), parameters)
+    rows = facts.order_by().values_list('equipment__code', 'equipment__name').annotate(
+        events=Sum('downtime_events'),
+        downtime=Sum('downtime_minutes'),
+    ).filter(events__gt=0).order_by('-downtime')
+    for code, name, events, downtime in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield code, name, events, downtime, round(downtime / events, 1)
+
+
+@report('spareparts_usage', ['备件编码', '备件名称', '单位', '出库数量', '出库金额', '出库次数'], facts=True)
+def spareparts_usage(start, end, parameters):
+    from .models import PartUsageDailyFact
+    facts = _equipment_filter(PartUsageDailyFact.objects.filter(**_fact_days(start, end)), parameters)
+    if parameters.get('parts'):
+        facts = facts.filter(part_id__in=parameters['parts'])
+    return facts.order_by().values_list('part__part_code', 'part__name', 'part__unit').annotate(
+        quantity=Sum('out_quantity'),
+        cost=Sum('out_cost'),
+        count=Sum('out_count'),
+    ).filter(count__gt=0).order_by('-cost').iterator(chunk_size=CHUNK_SIZE)
+
+
+@report('maintenance_compliance', ['计划编码', '计划名称', '设备编码', '应完成', '按时完成', '延期完成', '未完成',
+                                    '未生成', '进行中', '按时率%'])
+def maintenance_compliance(start, end, parameters):
+    from .compliance import pm_compliance
+    rows = pm_compliance(
+        timezone.localdate(start), timezone.localdate(end - timedelta(days=1)), 'plan',
+        {'equipment': parameters.get('equipment')}, parameters.get('sites')
+    )
+    for row in rows:
+        yield (row['plan_code'], row['plan_title'], row['equipment_code'], row['scheduled'], row['on_time'],
+               row['late'], row['missed'], row['not_generated'], row['pending'], row['on_time_rate'])
+
+
+@report('cost_analysis', ['设备编码', '设备名称', '工单类型', '工单数', '工时', '备件成本', '总成本'], facts=True)
+def cost_analysis(start, end, parameters):
+    from .models import WorkOrderDailyFact
+    facts = _equipment_filter(WorkOrderDailyFact.objects.filter(completed__gt=0, **_fact_days(start, end)), parameters)
+    return facts.order_by().values_list('equipment__code', 'equipment__name', 'wo_type').annotate(
+        count=Sum('completed'),
+        labor=Sum('labor_hours'),
+        parts=Sum('parts_cost'),
+        total=Sum('total_cost'),
+    ).order_by('equipment__code', 'wo_type').iterator(chunk_size=CHUNK_SIZE)
+
+
+@report('technician_performance', ['用户名', '姓名', '完成工单', '响应中位数(小时)', '维修中位数(小时)', '工时',
+                                     '一次修复率%'])
+def technician_performance(start, end, parameters):
+    from .technicians import technician_performance as performance
+    rows = performance(
+        timezone.localdate(start), timezone.localdate(end - timedelta(days=1)),
+        {'equipment': parameters.get('equipment')}, parameters.get('sites')
+    )
+    for row in rows:
+        yield (row['username'], row['full_name'], row['completed'], row['median_response_hours'],
+               row['median_repair_hours'], row['labor_hours'], row['first_time_fix_rate'])
+
+
+@report('equipment_availability', ['设备编码', '设备名称', '停机分钟', '可用率%', '故障次数', 'MTBF(小时)', 'MTTR(小时)'],
+        facts=True)
+def equipment_availability(start, end, parameters):
+    from .kpi import compute_kpis
+    rows = compute_kpis(
+        timezone.localdate(start), timezone.localdate(end - timedelta(days=1)), 'asset',
+        {'equipment': parameters.get('equipment')}, parameters.get('sites')
+    )
+    for row in rows:
+        yield (row['code'], row['name'], row['downtime_minutes'] + row['planned_downtime_minutes'],
+               row['availability'], row['failures'], row['mtbf_hours'], row['mttr_hours'])
+
+
+def _cell(value):
+    """Make a value storable in a spreadsheet cell"""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).replace(tzinfo=None) if timezone.is_aware(value) else value
+    return value
+
+
+def write_csv(path, headers, rows):
+    """Write rows to a CSV file one at a time; returns the row count"""
+    count = 0
+    # utf-8-sig so Excel shows the Chinese headers correctly
+    with open(path, 'w', newline='', encoding='utf-8-sig') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx(path, headers, rows, title):
+    """Write rows to an Excel file in write-only (streaming) mode; returns the row count"""
+    count = 0
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def output_path(run):
+    """Get the output file of a run, relative to MEDIA_ROOT"""
+    created = timezone.localtime(run.created_at)
+    return os.path.join('reports', created.strftime('%Y'), created.strftime('%m'),
+                        f'{run.report_type}-{run.id}.{run.output_format}')
+
+
+def execute_run(run):
+    """
+    Generate the output file of a report run
+
+    Args:
+        run: ReportRun with report_type, parameters and output_format
+
+    Returns:
+        int: Number of rows written
+    """
+    if run.report_type not in REPORTS:
+        raise ValueError(f"Unknown report type: {run.report_type}")
+    if run.output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {run.output_format}")
+
+    headers, func, uses_facts = REPORTS[run.report_type]
+    if uses_facts:
+        # Fold in changes since the last ETL run so the output is current
+        from .facts import refresh_facts
+        refresh_facts()
+    start, end = _resolve_dates(run.parameters)
+    relative = output_path(run)
+    path = os.path.join(settings.MEDIA_ROOT, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write next to the target and rename, so readers never see a partial file
+    partial = f'{path}.partial'
+    rows = func(start, end, run.parameters)
+    if run.output_format == 'csv':
+        count = write_csv(partial, headers, rows)
+    else:
+        count = write_xlsx(partial, headers, rows, run.report_type)
+    os.replace(partial, path)
+    run.output_file = relative
+    run.output_size = os.path.getsize(path)
+    return count
+
+
+def run_report(run_id):
+    """
+    Execute a pending report run
+
+    The run is claimed with a conditional update, so a run picked up twice
+    (e.g. a retried task) is only executed once.
+
+    Args:
+        run_id: ReportRun ID
+
+    Returns:
+        ReportRun: The finished run, or None if it was not pending
+    """
+    claimed = ReportRun.objects.filter(pk=run_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    run = ReportRun.objects.get(pk=run_id)
+    try:
+        count = execute_run(run)
+    except Exception as e:
+        logger.exception('Report run %s (%s) failed', run.id, run.report_type)
+        run.status = 'failed'
+        run.error_message = str(e)
+    else:
+        logger.info('Report run %s (%s) wrote %s rows to %s', run.id, run.report_type, count, run.output_file)
+        run.status = 'completed'
+        run.error_message = None
+    run.completed_at = timezone.now()
+    run.save(update_fields=['status', 'output_file', 'output_size', 'error_message', 'completed_at'])
+    return run
+
+
+def _run_parameters(parameters):
+    """Report parameters with the resolved date range filled in"""
+    start, end = _resolve_dates(parameters)
+    return {
+        **parameters,
+        'start_date': start.date().isoformat(),
+        'end_date': (end - timedelta(days=1)).date().isoformat(),
+    }
+
+
+def create_run(report_type, parameters, output_format, requested_by=None, scheduled_report=None, fingerprint=None):
+    """Create a pending report run with its date range filled in"""
+    return ReportRun.objects.create(
+        scheduled_report=scheduled_report,
+        report_type=report_type,
+        parameters=_run_parameters(parameters),
+        output_format=output_format,
+        requested_by=requested_by,
+        fingerprint=fingerprint,
+        status='pending',
+    )
+
+
+def note_source_deletion():
+    """Stamp a delete from a report source table; called by the source models' delete"""
+    ETLWatermark.objects.update_or_create(name=DELETION_MARK, defaults={'high_water': timezone.now()})
+
+
+def data_version():
+    """
+    Get a token that changes whenever report source data changes
+
+    Built from the latest change stamp of each source table, read off its
+    updated_at index, and the deletion watermark; deletes do not move the
+    stamps, so the source models stamp the watermark instead. Bulk
+    queryset deletes bypass it.
+
+    Returns:
+        list: [model, latest stamp] per source table, then the last deletion
+    """
+    version = []
+    for label, field in DATA_SOURCES:
+        latest = apps.get_model(label).objects.aggregate(latest=Max(field))['latest']
+        version.append([label, latest.isoformat() if latest else None])
+    deleted = ETLWatermark.objects.filter(name=DELETION_MARK).values_list('high_water', flat=True).first()
+    version.append([DELETION_MARK, deleted.isoformat() if deleted else None])
+    return version
+
+
+def expire_stale_runs(runs, now=None):
+    """
+    Fail pending or running runs that stopped making progress
+
+    A run queued or started more than REPORT_RUN_STALE_MINUTES ago (e.g.
+    its worker died) would otherwise hold its fingerprint forever, and
+    every identical request would join it.
+
+    Args:
+        runs: ReportRun queryset to check
+        now: Reference time (defaults to now)
+
+    Returns:
+        int: Number of runs failed
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=_setting('REPORT_RUN_STALE_MINUTES', 60))
+    return runs.filter(
+        Q(status='pending', created_at__lt=cutoff) | Q(status='running', started_at__lt=cutoff)
+    ).update(status='failed', error_message='Timed out', completed_at=now)
+
+
+def report_fingerprint(report_type, parameters, output_format, version):
+    """
+    Get the canonical fingerprint of a report request
+
+    Parameters are serialized with sorted keys and sorted ID lists, so
+    requests that differ only in ordering share a fingerprint.
+    """
+    canonical = {
+        key: sorted(value) if key in ('equipment', 'parts') and isinstance(value, list) else value
+        for key, value in parameters.items()
+    }
+    payload = json.dumps([report_type, canonical, output_format, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def request_run(report_type, parameters, output_format, requested_by=None):
+    """
+    Get a run for an ad-hoc report request, sharing work between identical requests
+
+    A completed run of the same report, parameters and format over the
+    same data is reused as is. An identical run still pending or running
+    is joined instead of queueing a second one, unless it has gone stale;
+    a partial unique constraint settles requests that race to create it.
+
+    Args:
+        report_type: Report type
+        parameters: Report parameters
+        output_format: csv or xlsx
+        requested_by: Requesting user
+
+    Returns:
+        tuple: (ReportRun, whether a new run was created and needs queueing)
+    """
+    if report_type not in REPORTS:
+        raise ValueError(f"Unknown report type: {report_type}")
+    fingerprint = report_fingerprint(report_type, _run_parameters(parameters), output_format, data_version())
+    expire_stale_runs(ReportRun.objects.filter(fingerprint=fingerprint))
+    shared = ReportRun.objects.filter(fingerprint=fingerprint, status__in=['pending', 'running', 'completed'])
+    for run in shared.order_by('-created_at')[:1]:
+        if run.status != 'completed' or os.path.exists(os.path.join(settings.MEDIA_ROOT, run.output_file or '')):
+            return run, False
+
+    try:
+        with transaction.atomic():
+            return create_run(report_type, parameters, output_format, requested_by, fingerprint=fingerprint), True
+    except IntegrityError:
+        run = shared.order_by('-created_at').first()
+        if run is None:
+            raise
+        return run, False
+
+
+def evict_report_outputs(now=None):
+    """
+    Delete old report output files, then the oldest ones beyond the size budget
+
+    Outputs older than REPORT_OUTPUT_MAX_AGE_DAYS go first; if the rest
+    still exceeds REPORT_OUTPUT_MAX_MB, the least recently completed are
+    removed until it fits. Their runs are marked expired.
+
+    Args:
+        now: Reference time (defaults to now)
+
+    Returns:
+        int: Number of outputs evicted
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=_setting('REPORT_OUTPUT_MAX_AGE_DAYS', 30))
+    budget = _setting('REPORT_OUTPUT_MAX_MB', 2048) * 1024 * 1024
+
+    kept = ReportRun.objects.filter(status='completed', output_file__isnull=False)
+    evict = list(kept.filter(completed_at__lt=cutoff).values_list('id', 'output_file'))
+    # Newest first: keep runs while they fit in the budget
+    total = 0
+    for run_id, output_file, size in kept.filter(completed_at__gte=cutoff).order_by(
+        '-completed_at'
+    ).values_list('id', 'output_file', 'output_size').iterator(chunk_size=CHUNK_SIZE):
+        total += size or 0
+        if total > budget:
+            evict.append((run_id, output_file))
+
+    for run_id, output_file in evict:
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, output_file))
+        except FileNotFoundError:
+            pass
+    for start in range(0, len(evict), CHUNK_SIZE):
+        ids = [run_id for run_id, _ in evict[start:start + CHUNK_SIZE]]
+        ReportRun.objects.filter(id__in=ids).update(status='expired', output_file=None)
+    if evict:
+        logger.info('Evicted %s report outputs', len(evict))
+    return len(evict)
+
+
+def schedule_due_reports(now=None):
+    """
+    Create runs for active scheduled reports that are due
+
+    Each due report gets one run covering its last complete period, and
+    its next run time moves forward. Reports locked by a concurrent
+    dispatcher are skipped.
+
+    Args:
+        now: Reference time (defaults to now)
+
+    Returns:
+        list: Created ReportRun objects
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = list(ScheduledReport.objects.select_for_update(skip_locked=True).filter(
+            Q(next_run_at__isnull=True) | Q(next_run_at__lte=now), status='active'
+        ))
+        runs = []
+        for scheduled in due:
+            start, end = report_period(scheduled.frequency, now)
+            runs.append(ReportRun(
+                scheduled_report=scheduled,
+                report_type=scheduled.report_type,
+                parameters={
+                    **scheduled.parameters,
+                    'start_date': start.isoformat(),
+                    'end_date': end.isoformat(),
+                },
+                output_format=scheduled.parameters.get('format', 'xlsx'),
+                status='pending',
+            ))
+            scheduled.last_run_at = now
+            scheduled.next_run_at = next_run_at(scheduled.frequency, now)
+        ReportRun.objects.bulk_create(runs)
+        ScheduledReport.objects.bulk_update(due, ['last_run_at', 'next_run_at'])
+    return runs
@@ -0,0 +1,222 @@
+"""
+Daily fact ETL for Reports app
+Incrementally rolls work orders, the parts ledger and inspections up into daily fact tables
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ETLWatermark, WorkOrderDailyFact, PartUsageDailyFact, InspectionDailyFact
+
+logger = logging.getLogger('cmms')
+
+# Changes committed late by a slow transaction may carry a timestamp just
+# before the previous watermark; re-reading this overlap picks them up, and
+# rebuilding whole days keeps the re-read harmless
+ETL_OVERLAP = timedelta(minutes=5)
+
+MONEY = DecimalField(max_digits=16, decimal_places=2)
+
+
+def _rebuild(fact_model, keys, sources, days=None):
+    """
+    Replace the fact rows of some days (or all days) with fresh aggregates
+
+    Each source aggregates one date role of a table (e.g. work orders by
+    the day they were created, or by the day they were completed). Its
+    grouped rows are merged on the fact key, so one fact row carries the
+    measures of every role.
+
+    Args:
+        fact_model: Fact model to write
+        keys: Fact key fields besides day (e.g. ['equipment_id', 'wo_type'])
+        sources: List of (queryset, date field, source key fields, aggregates)
+        days: Local dates to rebuild (None rebuilds everything)
+
+    Returns:
+        int: Fact rows written
+    """
+    if days is not None and not days:
+        return 0
+
+    facts = defaultdict(dict)
+    for queryset, date_field, source_keys, aggregates in sources:
+        queryset = queryset.filter(**{f'{date_field}__isnull': False})
+        if days is not None:
+            queryset = queryset.filter(**{f'{date_field}__date__in': days})
+        # Aliased so measures may share names with source fields (e.g. labor_hours)
+        rows = queryset.annotate(fact_day=TruncDate(date_field)).order_by().values(
+            'fact_day', *source_keys
+        ).annotate(**{f'm_{name}': aggregate for name, aggregate in aggregates.items()})
+        for row in rows.iterator(chunk_size=2000):
+            key = (row['fact_day'], *(row[field] for field in source_keys))
+            facts[key].update({name: row[f'm_{name}'] for name in aggregates})
+
+    new_facts = []
+    for key, measures in facts.items():
+        fact = fact_model(day=key[0], **dict(zip(keys, key[1:])))
+        for name, value in measures.items():
+            if isinstance(value, timedelta):
+                value = value.total_seconds() / 60  # durations are stored in minutes
+            setattr(fact, name, value if value is not None else 0)
+        new_facts.append(fact)
+
+    existing = fact_model.objects.all()
+    if days is not None:
+        existing = existing.filter(day__in=days)
+    existing.delete()
+    fact_model.objects.bulk_create(new_facts, batch_size=1000)
+    return len(new_facts)
+
+
+def _work_order_sources():
+    from workorders.models import WorkOrder, WorkOrderStatus
+
+    work_orders = WorkOrder.objects.all()
+    keys = ['equipment_id', 'wo_type']
+    timed = Q(actual_start__isnull=False, actual_start__lte=F('actual_end'))
+    return [
+        (work_orders, 'created_at', keys, {'opened': Count('id')}),
+        (work_orders, 'completed_at', keys, {
+            'completed': Count('id'),
+            'labor_hours': Coalesce(Sum('labor_hours'), Decimal('0'), output_field=MONEY),
+            'parts_cost': Coalesce(Sum('parts_cost'), Decimal('0'), output_field=MONEY),
+            'total_cost': Coalesce(Sum('total_cost'), Decimal('0'), output_field=MONEY),
+        }),
+        (work_orders.exclude(status=WorkOrderStatus.CANCELED), 'actual_end', keys, {
+            'ended': Count('id'),
+            'downtime_events': Count('id', filter=Q(downtime_minutes__gt=0)),
+            'downtime_minutes': Coalesce(Sum('downtime_minutes'), 0),
+            'repairs': Count('id', filter=timed),
+            'repair_minutes': Sum(
+                ExpressionWrapper(F('actual_end') - F('actual_start'), output_field=DurationField()), filter=timed
+            ),
+        }),
+    ]
+
+
+def _part_usage_sources():
+    from spareparts.models import PartTransaction, TransactionType
+
+    cost = ExpressionWrapper(F('quantity') * Coalesce('unit_cost', Decimal('0')), output_field=MONEY)
+    stock_in = Q(transaction_type=TransactionType.IN)
+    stock_out = Q(transaction_type=TransactionType.OUT)
+    return [
+        (PartTransaction.objects.annotate(equipment_id=F('related_work_order__equipment_id')), 'created_at',
+         ['part_id', 'equipment_id'], {
+             'in_count': Count('id', filter=stock_in),
+             'in_quantity': Sum('quantity', filter=stock_in),
+             'in_cost': Sum(cost, filter=stock_in),
+             'out_count': Count('id', filter=stock_out),
+             'out_quantity': Sum('quantity', filter=stock_out),
+             'out_cost': Sum(cost, filter=stock_out),
+         }),
+    ]
+
+
+def _inspection_sources():
+    from inspections.models import InspectionRecord, InspectionResult
+
+    return [
+        (InspectionRecord.objects.all(), 'created_at', ['equipment_id', 'template_id'], {
+            'inspections': Count('id'),
+            'passed': Count('id', filter=Q(result=InspectionResult.PASS)),
+            'warnings': Count('id', filter=Q(result=InspectionResult.WARNING)),
+            'failed': Count('id', filter=Q(result=InspectionResult.FAIL)),
+            'corrective_orders': Count('id', filter=Q(triggered_work_order__isnull=False)),
+        }),
+    ]
+
+
+def _changed_days(queryset, stamp_field, since, until, date_fields):
+    """Local dates touched by rows whose stamp_field falls in (since, until]"""
+    changed = queryset.filter(**{f'{stamp_field}__gt': since, f'{stamp_field}__lte': until})
+    days = set()
+    for field in date_fields:
+        for value in changed.filter(**{f'{field}__isnull': False}).values_list(field, flat=True).distinct():
+            days.add(timezone.localdate(value))
+    return days
+
+
+def _work_order_changes(high_water, now):
+    from workorders.models import WorkOrder
+    return _changed_days(WorkOrder.objects.all(), 'updated_at', high_water, now,
+                         ['created_at', 'completed_at', 'actual_end'])
+
+
+def _part_usage_changes(high_water, now):
+    # The ledger is append-only, so only new rows need reading
+    from spareparts.models import PartTransaction
+    return _changed_days(PartTransaction.objects.all(), 'created_at', high_water, now, ['created_at'])
+
+
+def _inspection_changes(high_water, now):
+    # Records pushed by offline clients are written long after their created_at
+    from inspections.models import InspectionRecord
+    return _changed_days(InspectionRecord.objects.all(), 'updated_at', high_water, now, ['created_at'])
+
+
+# Watermark name -> (fact model, fact key fields, sources, changed days since a watermark)
+FACT_TABLES = {
+    'work_order_daily': (WorkOrderDailyFact, ['equipment_id', 'wo_type'], _work_order_sources, _work_order_changes),
+    'part_usage_daily': (PartUsageDailyFact, ['part_id', 'equipment_id'], _part_usage_sources, _part_usage_changes),
+    'inspection_daily': (InspectionDailyFact, ['equipment_id', 'template_id'], _inspection_sources,
+                         _inspection_changes),
+}
+
+
+def refresh_fact_table(name, full=False, now=None):
+    """
+    Bring one fact table up to date from its watermark
+
+    Only the days touched by source rows changed since the watermark are
+    rebuilt. The watermark row is locked for the run so concurrent
+    refreshes queue rather than interleave.
+
+    Args:
+        name: Fact table name (a key of FACT_TABLES)
+        full: Rebuild every day instead of the changed ones
+        now: Reference time (defaults to now)
+
+    Returns:
+        int: Fact rows written
+    """
+    fact_model, keys, sources, changes = FACT_TABLES[name]
+    now = now or timezone.now()
+    ETLWatermark.objects.get_or_create(name=name)
+    with transaction.atomic():
+        mark = ETLWatermark.objects.select_for_update().get(name=name)
+        if full or mark.high_water is None:
+            days = None
+        else:
+            days = changes(mark.high_water - ETL_OVERLAP, now)
+        written = _rebuild(fact_model, keys, sources(), days)
+        mark.high_water = now
+        mark.last_run_at = timezone.now()
+        mark.rows_written = written
+        mark.save()
+    return written
+
+
+def refresh_facts(full=False, now=None):
+    """
+    Bring every fact table up to date
+
+    A full rebuild also clears facts left behind by deleted source rows or
+    by work orders whose dates moved to another day.
+
+    Returns:
+        dict: Fact table name -> rows written
+    """
+    return {name: refresh_fact_table(name, full, now) for name in FACT_TABLES}
+
+
+def refresh_work_order_facts(full=False, now=None):
+    """Bring the work order facts up to date"""
+    return refresh_fact_table('work_order_daily', full, now)
@@ -0,0 +1,118 @@
+"""
+Reliability KPIs for Reports app
+Computes MTBF, MTTR and availability from the daily work order facts
+"""
+import numpy as np
+import pandas as pd
+from django.db.models import Count, Q, Sum
+
+from workorders.models import WorkOrderType
+from .models import WorkOrderDailyFact
+
+# Level -> asset fields identifying a group
+LEVELS = {
+    'asset': ['id', 'code', 'name', 'factory', 'workshop', 'line'],
+    'line': ['factory', 'workshop', 'line'],
+    'workshop': ['factory', 'workshop'],
+    'factory': ['factory'],
+    'plant': [],
+}
+
+CORRECTIVE = Q(wo_type=WorkOrderType.CM)
+
+# KPI total -> aggregate over facts; failures and repairs count corrective work only
+FACT_TOTALS = {
+    'work_orders': Sum('ended'),
+    'failures': Sum('ended', filter=CORRECTIVE),
+    'downtime_minutes': Sum('downtime_minutes', filter=CORRECTIVE),
+    'planned_downtime_minutes': Sum('downtime_minutes', filter=~CORRECTIVE),
+    'repairs': Sum('repairs', filter=CORRECTIVE),
+    'repair_minutes': Sum('repair_minutes', filter=CORRECTIVE),
+}
+
+
+def _grouped(queryset, fields, **aggregates):
+    """Aggregate a queryset per group as a DataFrame (one row when there are no group fields)"""
+    if fields:
+        rows = list(queryset.order_by().values(*fields).annotate(**aggregates))
+    else:
+        rows = [queryset.aggregate(**aggregates)]
+    return pd.DataFrame(rows, columns=[*fields, *aggregates])
+
+
+def compute_kpis(start_date, end_date, level='asset', filters=None, sites=None):
+    """
+    Compute reliability KPIs per group of equipment over a date window
+
+    Totals come from two grouped queries over daily facts and assets; the
+    ratios are then derived for all groups at once with array arithmetic.
+    Scheduled time is every in-service asset running around the clock.
+
+    - availability: share of scheduled time not lost to downtime (%)
+    - MTBF: operating time per corrective work order (hours)
+    - MTTR: mean actual repair duration of corrective work orders (hours)
+
+    Args:
+        start_date: First day of the window
+        end_date: Last day of the window (inclusive)
+        level: asset, line, workshop, factory or plant
+        filters: Optional dict with factory, workshop, line or equipment (IDs)
+        sites: Optional sites to limit the equipment to (see users.scoping.user_sites)
+
+    Returns:
+        list: One dict per group with totals and KPIs
+    """
+    from assets.models import Asset, AssetStatus
+    from users.scoping import sites_filter
+
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level: {level}")
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    filters = filters or {}
+
+    assets = Asset.objects.exclude(status=AssetStatus.RETIRED)
+    for field in ['factory', 'workshop', 'line']:
+        if filters.get(field):
+            assets = assets.filter(**{field: filters[field]})
+    if filters.get('equipment'):
+        assets = assets.filter(id__in=filters['equipment'])
+    if sites is not None:
+        assets = assets.filter(sites_filter(sites))
+
+    fields = LEVELS[level]
+    if level == 'asset':
+        groups = pd.DataFrame(list(assets.order_by('code').values(*fields)), columns=fields)
+        groups['assets'] = 1
+        fact_fields, keys = ['equipment_id'], ['id']
+    else:
+        groups = _grouped(assets, fields, assets=Count('id'))
+        fact_fields, keys = [f'equipment__{field}' for field in fields], fields
+
+    facts = WorkOrderDailyFact.objects.filter(day__gte=start_date, day__lte=end_date, equipment__in=assets)
+    # Aggregates are aliased since totals share names with fact fields
+    totals = _grouped(facts, fact_fields, **{f't_{name}': total for name, total in FACT_TOTALS.items()})
+    totals = totals.rename(columns={
+        **dict(zip(fact_fields, keys)), **{f't_{name}': name for name in FACT_TOTALS}
+    })
+    if keys:
+        frame = groups.merge(totals, how='left', on=keys)
+    else:
+        frame = pd.concat([groups, totals], axis=1)
+    frame[list(FACT_TOTALS)] = frame[list(FACT_TOTALS)].astype(float).fillna(0)
+
+    window_minutes = ((end_date - start_date).days + 1) * 24 * 60
+    scheduled = frame['assets'].to_numpy(dtype=float) * window_minutes
+    failures = frame['failures'].to_numpy()
+    repairs = frame['repairs'].to_numpy()
+    operating = np.clip(scheduled - frame['downtime_minutes'] - frame['planned_downtime_minutes'], 0, None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['availability'] = np.where(scheduled > 0, operating / scheduled * 100, np.nan)
+        frame['mtbf_hours'] = np.where(failures > 0, operating / failures / 60, np.nan)
+        frame['mttr_hours'] = np.where(repairs > 0, frame['repair_minutes'] / repairs / 60, np.nan)
+
+    frame = frame.round({'availability': 2, 'mtbf_hours': 2, 'mttr_hours': 2, 'repair_minutes': 1})
+    counts = ['assets', 'work_orders', 'failures', 'downtime_minutes', 'planned_downtime_minutes', 'repairs']
+    frame[counts] = frame[counts].astype(int)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
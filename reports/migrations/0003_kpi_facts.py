@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_initial'),
+        ('reports', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ETLWatermark',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Name')),
+                ('high_water', models.DateTimeField(blank=True, help_text='Source rows updated up to this time are included', null=True, verbose_name='High Water')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Last Run At')),
+                ('rows_written', models.PositiveIntegerField(default=0, help_text='Fact rows written by the last run', verbose_name='Rows Written')),
+            ],
+            options={
+                'verbose_name': 'ETL Watermark',
+                'verbose_name_plural': 'ETL Watermarks',
+                'db_table': 'etl_watermarks',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkOrderDailyFact',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField(verbose_name='Day')),
+                ('work_orders', models.PositiveIntegerField(default=0, verbose_name='Work Orders')),
+                ('failures', models.PositiveIntegerField(default=0, help_text='Corrective work orders ended on the day', verbose_name='Failures')),
+                ('downtime_minutes', models.PositiveIntegerField(default=0, verbose_name='Failure Downtime (minutes)')),
+                ('planned_downtime_minutes', models.PositiveIntegerField(default=0, help_text='Downtime of preventive and other non-corrective work', verbose_name='Planned Downtime (minutes)')),
+                ('repairs', models.PositiveIntegerField(default=0, help_text='Corrective work orders with both actual start and end', verbose_name='Timed Repairs')),
+                ('repair_minutes', models.FloatField(default=0, verbose_name='Repair Time (minutes)')),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_order_daily_facts', to='assets.asset', verbose_name='Equipment')),
+            ],
+            options={
+                'verbose_name': 'Work Order Daily Fact',
+                'verbose_name_plural': 'Work Order Daily Facts',
+                'db_table': 'work_order_daily_facts',
+                'ordering': ['-day', 'equipment'],
+                'indexes': [models.Index(fields=['day'], name='work_order__day_c14392_idx')],
+                'constraints': [models.UniqueConstraint(fields=('equipment', 'day'), name='uniq_work_order_fact_equipment_day')],
+            },
+        ),
+    ]
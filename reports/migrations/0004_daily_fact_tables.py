@@ -0,0 +1,176 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_work_order_facts(apps, schema_editor):
+    """Drop facts in the old layout; the next ETL run rebuilds them in full"""
+    apps.get_model('reports', 'WorkOrderDailyFact').objects.all().delete()
+    apps.get_model('reports', 'ETLWatermark').objects.filter(name='work_order_daily').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_initial'),
+        ('inspections', '0005_inspectionrecord_due_index'),
+        ('reports', '0003_kpi_facts'),
+        ('spareparts', '0006_part_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_work_order_facts, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='InspectionDailyFact',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField(verbose_name='Day')),
+                ('inspections', models.PositiveIntegerField(default=0, verbose_name='Inspections')),
+                ('passed', models.PositiveIntegerField(default=0, verbose_name='Passed')),
+                ('warnings', models.PositiveIntegerField(default=0, verbose_name='Warnings')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Failed')),
+                ('corrective_orders', models.PositiveIntegerField(default=0, help_text='Inspections linked to a corrective work order', verbose_name='Corrective Orders')),
+            ],
+            options={
+                'verbose_name': 'Inspection Daily Fact',
+                'verbose_name_plural': 'Inspection Daily Facts',
+                'db_table': 'inspection_daily_facts',
+                'ordering': ['-day', 'equipment'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PartUsageDailyFact',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField(verbose_name='Day')),
+                ('in_count', models.PositiveIntegerField(default=0, verbose_name='Stock In Transactions')),
+                ('in_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Stock In Quantity')),
+                ('in_cost', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Stock In Cost')),
+                ('out_count', models.PositiveIntegerField(default=0, verbose_name='Stock Out Transactions')),
+                ('out_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Stock Out Quantity')),
+                ('out_cost', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Stock Out Cost')),
+            ],
+            options={
+                'verbose_name': 'Part Usage Daily Fact',
+                'verbose_name_plural': 'Part Usage Daily Facts',
+                'db_table': 'part_usage_daily_facts',
+                'ordering': ['-day', 'part'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='workorderdailyfact',
+            name='uniq_work_order_fact_equipment_day',
+        ),
+        migrations.RemoveIndex(
+            model_name='workorderdailyfact',
+            name='work_order__day_c14392_idx',
+        ),
+        migrations.RemoveField(
+            model_name='workorderdailyfact',
+            name='failures',
+        ),
+        migrations.RemoveField(
+            model_name='workorderdailyfact',
+            name='planned_downtime_minutes',
+        ),
+        migrations.RemoveField(
+            model_name='workorderdailyfact',
+            name='work_orders',
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='completed',
+            field=models.PositiveIntegerField(default=0, verbose_name='Completed'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='downtime_events',
+            field=models.PositiveIntegerField(default=0, verbose_name='Downtime Events'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='ended',
+            field=models.PositiveIntegerField(default=0, help_text='Work orders whose work ended on the day (failures, for corrective work)', verbose_name='Ended'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='labor_hours',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Labor Hours'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='opened',
+            field=models.PositiveIntegerField(default=0, verbose_name='Opened'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='parts_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Parts Cost'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Cost'),
+        ),
+        migrations.AddField(
+            model_name='workorderdailyfact',
+            name='wo_type',
+            field=models.CharField(default='CM', max_length=20, verbose_name='Work Order Type'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='workorderdailyfact',
+            name='downtime_minutes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Downtime (minutes)'),
+        ),
+        migrations.AlterField(
+            model_name='workorderdailyfact',
+            name='repairs',
+            field=models.PositiveIntegerField(default=0, help_text='Work orders with both actual start and end', verbose_name='Timed Repairs'),
+        ),
+        migrations.AddIndex(
+            model_name='workorderdailyfact',
+            index=models.Index(fields=['day', 'wo_type'], name='work_order__day_7b7054_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='workorderdailyfact',
+            constraint=models.UniqueConstraint(fields=('equipment', 'day', 'wo_type'), name='uniq_work_order_fact'),
+        ),
+        migrations.AddField(
+            model_name='inspectiondailyfact',
+            name='equipment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inspection_daily_facts', to='assets.asset', verbose_name='Equipment'),
+        ),
+        migrations.AddField(
+            model_name='inspectiondailyfact',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_facts', to='inspections.inspectiontemplate', verbose_name='Template'),
+        ),
+        migrations.AddField(
+            model_name='partusagedailyfact',
+            name='equipment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='part_usage_daily_facts', to='assets.asset', verbose_name='Equipment'),
+        ),
+        migrations.AddField(
+            model_name='partusagedailyfact',
+            name='part',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_daily_facts', to='spareparts.sparepart', verbose_name='Spare Part'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectiondailyfact',
+            index=models.Index(fields=['day'], name='inspection__day_33651d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectiondailyfact',
+            index=models.Index(fields=['equipment', 'day'], name='inspection__equipme_489837_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partusagedailyfact',
+            index=models.Index(fields=['day', 'part'], name='part_usage__day_5424fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partusagedailyfact',
+            index=models.Index(fields=['equipment', 'day'], name='part_usage__equipme_ffb06e_idx'),
+        ),
+    ]
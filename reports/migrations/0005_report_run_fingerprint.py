@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_daily_fact_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportrun',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='reportrun',
+            name='output_size',
+            field=models.BigIntegerField(blank=True, help_text='Output file size in bytes', null=True, verbose_name='Output Size'),
+        ),
+        migrations.AlterField(
+            model_name='reportrun',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AddIndex(
+            model_name='reportrun',
+            index=models.Index(fields=['fingerprint', 'status'], name='report_runs_fingerp_6956d2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reportrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('fingerprint',), name='uniq_active_report_fingerprint'),
+        ),
+    ]
@@ -120,6 +120,7 @@ class ReportRun(models.Model):
         ('running', 'Running'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('expired', 'Expired'),
     ]
 
     id = models.BigAutoField(primary_key=True)
@@ -164,6 +165,19 @@ class ReportRun(models.Model):
         blank=True,
         verbose_name='Output Format'
     )
+    output_size = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Output Size',
+        help_text='Output file size in bytes'
+    )
+    # Identical requests (same report, parameters, format and data) share one run
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        verbose_name='Fingerprint'
+    )
     # Error info
     error_message = models.TextField(
         blank=True,
@@ -202,6 +216,15 @@ class ReportRun(models.Model):
         indexes = [
             models.Index(fields=['report_type', 'created_at']),
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['fingerprint', 'status']),
+        ]
+        constraints = [
+            # At most one queued or running job per fingerprint
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='uniq_active_report_fingerprint'
+            ),
         ]
 
     def __str__(self):
@@ -213,3 +236,256 @@ class ReportRun(models.Model):
         if self.started_at and self.completed_at:
             return (self.completed_at - self.started_at).total_seconds()
         return 0
+
+
+class ETLWatermark(models.Model):
+    """
+    ETL Watermark - how far an incremental rollup has read its source
+    Rows changed after high_water have not been folded into the facts yet
+    """
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Name'
+    )
+    high_water = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='High Water',
+        help_text='Source rows updated up to this time are included'
+    )
+    last_run_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Last Run At'
+    )
+    rows_written = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Rows Written',
+        help_text='Fact rows written by the last run'
+    )
+
+    class Meta:
+        db_table = 'etl_watermarks'
+        verbose_name = 'ETL Watermark'
+        verbose_name_plural = 'ETL Watermarks'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water}"
+
+
+class WorkOrderDailyFact(models.Model):
+    """
+    Work Order Daily Fact - maintenance totals per equipment, work order type and day
+    Each measure is counted on the local day of its own event: opened on
+    created_at, completed/labor/cost on completed_at, and downtime/repair
+    time on actual_end. Location dimensions come through the equipment.
+    """
+    id = models.BigAutoField(primary_key=True)
+    equipment = models.ForeignKey(
+        'assets.Asset',
+        on_delete=models.CASCADE,
+        related_name='work_order_daily_facts',
+        verbose_name='Equipment'
+    )
+    day = models.DateField(
+        verbose_name='Day'
+    )
+    wo_type = models.CharField(
+        max_length=20,
+        verbose_name='Work Order Type'
+    )
+    opened = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Opened'
+    )
+    completed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Completed'
+    )
+    ended = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ended',
+        help_text='Work orders whose work ended on the day (failures, for corrective work)'
+    )
+    downtime_events = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Downtime Events'
+    )
+    downtime_minutes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Downtime (minutes)'
+    )
+    repairs = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Timed Repairs',
+        help_text='Work orders with both actual start and end'
+    )
+    repair_minutes = models.FloatField(
+        default=0,
+        verbose_name='Repair Time (minutes)'
+    )
+    labor_hours = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Labor Hours'
+    )
+    parts_cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Parts Cost'
+    )
+    total_cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Total Cost'
+    )
+
+    class Meta:
+        db_table = 'work_order_daily_facts'
+        verbose_name = 'Work Order Daily Fact'
+        verbose_name_plural = 'Work Order Daily Facts'
+        ordering = ['-day', 'equipment']
+        indexes = [
+            models.Index(fields=['day', 'wo_type']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['equipment', 'day', 'wo_type'], name='uniq_work_order_fact'),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_id} - {self.day} - {self.wo_type}"
+
+
+class PartUsageDailyFact(models.Model):
+    """
+    Part Usage Daily Fact - stock movements per part, equipment and day
+    Rolled up from the transaction ledger; equipment is that of the work
+    order a movement was issued to, if any
+    """
+    id = models.BigAutoField(primary_key=True)
+    part = models.ForeignKey(
+        'spareparts.SparePart',
+        on_delete=models.CASCADE,
+        related_name='usage_daily_facts',
+        verbose_name='Spare Part'
+    )
+    equipment = models.ForeignKey(
+        'assets.Asset',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='part_usage_daily_facts',
+        verbose_name='Equipment'
+    )
+    day = models.DateField(
+        verbose_name='Day'
+    )
+    in_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Stock In Transactions'
+    )
+    in_quantity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Stock In Quantity'
+    )
+    in_cost = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name='Stock In Cost'
+    )
+    out_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Stock Out Transactions'
+    )
+    out_quantity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Stock Out Quantity'
+    )
+    out_cost = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name='Stock Out Cost'
+    )
+
+    class Meta:
+        db_table = 'part_usage_daily_facts'
+        verbose_name = 'Part Usage Daily Fact'
+        verbose_name_plural = 'Part Usage Daily Facts'
+        ordering = ['-day', 'part']
+        indexes = [
+            models.Index(fields=['day', 'part']),
+            models.Index(fields=['equipment', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id} - {self.day}"
+
+
+class InspectionDailyFact(models.Model):
+    """
+    Inspection Daily Fact - inspection results per equipment, template and day
+    """
+    id = models.BigAutoField(primary_key=True)
+    equipment = models.ForeignKey(
+        'assets.Asset',
+        on_delete=models.CASCADE,
+        related_name='inspection_daily_facts',
+        verbose_name='Equipment'
+    )
+    template = models.ForeignKey(
+        'inspections.InspectionTemplate',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_facts',
+        verbose_name='Template'
+    )
+    day = models.DateField(
+        verbose_name='Day'
+    )
+    inspections = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Inspections'
+    )
+    passed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Passed'
+    )
+    warnings = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Warnings'
+    )
+    failed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Failed'
+    )
+    corrective_orders = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Corrective Orders',
+        help_text='Inspections linked to a corrective work order'
+    )
+
+    class Meta:
+        db_table = 'inspection_daily_facts'
+        verbose_name = 'Inspection Daily Fact'
+        verbose_name_plural = 'Inspection Daily Facts'
+        ordering = ['-day', 'equipment']
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['equipment', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_id} - {self.day}"
@@ -0,0 +1,63 @@
+"""
+Serializers for Reports app
+"""
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+from .engine import OUTPUT_FORMATS
+from .models import ScheduledReport, ReportRun
+
+
+def validate_report_parameters(value):
+    """Check the parameters understood by the report engine"""
+    if not isinstance(value, dict):
+        raise serializers.ValidationError("Must be an object")
+    for key in ['start_date', 'end_date']:
+        if value.get(key) and parse_date(str(value[key])) is None:
+            raise serializers.ValidationError({key: "Must be a date in YYYY-MM-DD format"})
+    for key in ['equipment', 'parts']:
+        if key in value and (not isinstance(value[key], list) or not all(isinstance(i, int) for i in value[key])):
+            raise serializers.ValidationError({key: "Must be a list of IDs"})
+    if value.get('format', 'xlsx') not in OUTPUT_FORMATS:
+        raise serializers.ValidationError({"format": f"Must be one of {OUTPUT_FORMATS}"})
+    return value
+
+
+class ScheduledReportSerializer(serializers.ModelSerializer):
+    """Serializer for ScheduledReport model"""
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+
+    class Meta:
+        model = ScheduledReport
+        fields = [
+            'id', 'name', 'report_type', 'description', 'frequency', 'parameters', 'recipients',
+            'status', 'last_run_at', 'next_run_at', 'created_by', 'created_by_name', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'last_run_at', 'created_by', 'created_at', 'updated_at']
+
+    def validate_parameters(self, value):
+        return validate_report_parameters(value)
+
+
+class ReportRunSerializer(serializers.ModelSerializer):
+    """Serializer for ReportRun model; creating one requests an ad-hoc report"""
+    scheduled_report_name = serializers.CharField(source='scheduled_report.name', read_only=True, allow_null=True)
+    requested_by_name = serializers.CharField(source='requested_by.full_name', read_only=True, allow_null=True)
+    output_format = serializers.ChoiceField(choices=OUTPUT_FORMATS, default='xlsx')
+    report_type = serializers.ChoiceField(choices=ScheduledReport.REPORT_TYPE_CHOICES)
+    duration_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ReportRun
+        fields = [
+            'id', 'scheduled_report', 'scheduled_report_name', 'report_type', 'parameters', 'status',
+            'output_file', 'output_format', 'output_size', 'error_message', 'requested_by', 'requested_by_name',
+            'started_at', 'completed_at', 'duration_seconds', 'created_at'
+        ]
+        read_only_fields = [
+            'id', 'scheduled_report', 'status', 'output_file', 'output_size', 'error_message', 'requested_by',
+            'started_at', 'completed_at', 'created_at'
+        ]
+
+    def validate_parameters(self, value):
+        return validate_report_parameters(value)
@@ -0,0 +1,43 @@
+"""
+Celery tasks for Reports app
+"""
+import logging
+
+from celery import shared_task
+
+from .engine import evict_report_outputs, run_report, schedule_due_reports
+from .facts import refresh_facts
+
+logger = logging.getLogger('cmms')
+
+
+@shared_task
+def run_report_task(run_id):
+    """Generate the output of one report run"""
+    run = run_report(run_id)
+    return run.status if run else None
+
+
+@shared_task
+def dispatch_scheduled_reports_task():
+    """Create runs for due scheduled reports and queue them"""
+    runs = schedule_due_reports()
+    for run in runs:
+        run_report_task.delay(run.id)
+    if runs:
+        logger.info('Queued %s scheduled report runs', len(runs))
+    return len(runs)
+
+
+@shared_task
+def refresh_facts_task(full=False):
+    """Fold changed work orders, ledger rows and inspections into the daily fact tables"""
+    written = refresh_facts(full=full)
+    logger.info('Refreshed daily fact tables (full=%s): %s', full, written)
+    return written
+
+
+@shared_task
+def evict_report_outputs_task():
+    """Delete report outputs past their age or beyond the size budget"""
+    return evict_report_outputs()
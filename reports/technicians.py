@@ -0,0 +1,126 @@
+"""
+Technician performance for Reports app
+Per-assignee throughput, response and repair times and first-time-fix rate
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import DateTimeField, Exists, ExpressionWrapper, OuterRef, Value
+from django.utils import timezone
+
+COLUMNS = ['assignee', 'username', 'full_name', 'wo_type', 'assigned_at', 'actual_start', 'actual_end',
+           'labor_hours', 'reworked']
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _extract(start, end, filters, sites):
+    """
+    Stream completed work orders of the window, one tuple per work order
+
+    A corrective work order counts as reworked when another corrective
+    work order was raised on the same equipment within
+    FIRST_TIME_FIX_DAYS of its completion; this is checked in SQL.
+    """
+    from users.scoping import sites_filter
+    from workorders.models import WorkOrder, WorkOrderStatus, WorkOrderType
+
+    window = timedelta(days=_setting('FIRST_TIME_FIX_DAYS', 7))
+    repeat = WorkOrder.objects.filter(
+        equipment=OuterRef('equipment'),
+        wo_type=WorkOrderType.CM,
+        created_at__gt=OuterRef('completed_at'),
+        created_at__lte=ExpressionWrapper(OuterRef('completed_at') + Value(window), output_field=DateTimeField()),
+    ).exclude(pk=OuterRef('pk')).exclude(status=WorkOrderStatus.CANCELED)
+
+    queryset = WorkOrder.objects.filter(
+        completed_at__gte=start, completed_at__lt=end, assignee__isnull=False,
+        status__in=[WorkOrderStatus.COMPLETED, WorkOrderStatus.CLOSED],
+    )
+    for field in ['factory', 'workshop', 'line']:
+        if filters.get(field):
+            queryset = queryset.filter(**{f'equipment__{field}': filters[field]})
+    if filters.get('equipment'):
+        queryset = queryset.filter(equipment_id__in=filters['equipment'])
+    if sites is not None:
+        queryset = queryset.filter(sites_filter(sites, 'equipment__'))
+
+    return queryset.annotate(reworked=Exists(repeat)).order_by().values_list(
+        'assignee_id', 'assignee__username', 'assignee__full_name', 'wo_type', 'assigned_at', 'actual_start',
+        'actual_end', 'labor_hours', 'reworked'
+    ).iterator(chunk_size=2000)
+
+
+def technician_performance(start_date, end_date, filters=None, sites=None):
+    """
+    Get performance per assignee over a date window
+
+    Completed work orders are streamed into one DataFrame and aggregated
+    per assignee in a single group-by; durations that are missing or
+    negative (bad clock data) are left out of the medians.
+
+    - completed: work orders completed in the window
+    - median_response_hours: assignment to start of work
+    - median_repair_hours: start to end of work
+    - labor_hours: booked labor
+    - first_time_fix_rate: corrective work orders not followed by another
+      corrective work order on the same equipment within FIRST_TIME_FIX_DAYS (%)
+
+    Args:
+        start_date: First day of the window
+        end_date: Last day of the window (inclusive)
+        filters: Optional dict with factory, workshop, line or equipment (IDs)
+        sites: Optional sites to limit the equipment to (see users.scoping.user_sites)
+
+    Returns:
+        list: One dict per assignee, most completed first
+    """
+    from workorders.models import WorkOrderType
+
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+
+    frame = pd.DataFrame.from_records(_extract(start, end, filters or {}, sites), columns=COLUMNS)
+    if frame.empty:
+        return []
+
+    for field in ['assigned_at', 'actual_start', 'actual_end']:
+        frame[field] = pd.to_datetime(frame[field], utc=True)
+    response = (frame['actual_start'] - frame['assigned_at']).dt.total_seconds() / 3600
+    repair = (frame['actual_end'] - frame['actual_start']).dt.total_seconds() / 3600
+    corrective = frame['wo_type'] == WorkOrderType.CM
+    frame = frame.assign(
+        response_hours=response.where(response >= 0),
+        repair_hours=repair.where(repair >= 0),
+        labor_hours=frame['labor_hours'].astype(float),
+        corrective=corrective,
+        fixed=corrective & ~frame['reworked'].astype(bool),
+    )
+
+    result = frame.groupby(['assignee', 'username', 'full_name'], dropna=False).agg(
+        completed=('assignee', 'size'),
+        median_response_hours=('response_hours', 'median'),
+        median_repair_hours=('repair_hours', 'median'),
+        labor_hours=('labor_hours', 'sum'),
+        corrective=('corrective', 'sum'),
+        first_time_fixed=('fixed', 'sum'),
+    ).reset_index()
+    corrective = result['corrective'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['first_time_fix_rate'] = np.where(
+            corrective > 0, result['first_time_fixed'] / corrective * 100, np.nan
+        )
+
+    result = result.sort_values(['completed', 'username'], ascending=[False, True]).round({
+        'median_response_hours': 2, 'median_repair_hours': 2, 'labor_hours': 2, 'first_time_fix_rate': 1
+    })
+    counts = ['assignee', 'completed', 'corrective', 'first_time_fixed']
+    result[counts] = result[counts].astype(int)
+    result = result.astype(object).where(result.notna(), None)
+    return result.to_dict('records')
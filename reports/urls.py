@@ -1,8 +1,21 @@
 """
 URL configuration for Reports app
 """
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import (ScheduledReportViewSet, ReportRunViewSet, KPIViewSet, PMComplianceViewSet,
+                    TechnicianPerformanceViewSet, CostCubeViewSet)
+
+
+router = DefaultRouter()
+router.register(r'scheduled', ScheduledReportViewSet, basename='scheduledreport')
+router.register(r'runs', ReportRunViewSet, basename='reportrun')
+router.register(r'kpi', KPIViewSet, basename='kpi')
+router.register(r'pm-compliance', PMComplianceViewSet, basename='pm-compliance')
+router.register(r'technicians', TechnicianPerformanceViewSet, basename='technician-performance')
+router.register(r'cost-cube', CostCubeViewSet, basename='cost-cube')
 
 urlpatterns = [
-    # Report endpoints will be added here
+    path('', include(router.urls)),
 ]
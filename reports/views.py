@@ -1,3 +1,283 @@
-from django.shortcuts import render
+"""
+Views for Reports app
+"""
+import os
+from datetime import timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets, mixins, status, filters
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated, BasePermission
+from rest_framework.response import Response
+
+from users.scoping import user_sites
+
+from .compliance import pm_compliance, LEVELS as COMPLIANCE_LEVELS
+from .costs import cost_cube, cost_tree, DIMENSIONS
+from .engine import create_run, request_run
+from .kpi import compute_kpis, LEVELS
+from .models import ScheduledReport, ReportRun
+from .serializers import ScheduledReportSerializer, ReportRunSerializer
+from .technicians import technician_performance
+
+
+class IsAdminOrSupervisorOrReadOnly(BasePermission):
+    """
+    自定义权限：admin和supervisor可以修改，其他用户只读
+    """
+    def has_permission(self, request, view):
+        # 读取操作允许所有认证用户
+        if request.method in ['GET', 'HEAD', 'OPTIONS']:
+            return request.user.is_authenticated
+        # 创建/更新/删除只允许admin或supervisor
+        return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
+
+
+def _scoped_parameters(parameters, user):
+    """Report parameters limited to the user's sites, when the user is limited to some"""
+    parameters = {**parameters}
+    parameters.pop('sites', None)
+    sites = user_sites(user)
+    if sites is not None:
+        parameters['sites'] = [list(site) for site in sites]
+    return parameters
+
+
+def enqueue_run(run):
+    """Queue a report run once the transaction creating it commits"""
+    from .tasks import run_report_task
+    transaction.on_commit(lambda: run_report_task.delay(run.id))
+
+
+class ScheduledReportViewSet(viewsets.ModelViewSet):
+    """ViewSet for ScheduledReport model"""
+    queryset = ScheduledReport.objects.select_related('created_by')
+    serializer_class = ScheduledReportSerializer
+    permission_classes = [IsAdminOrSupervisorOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['report_type', 'frequency', 'status']
+    search_fields = ['name', 'description']
+    ordering_fields = ['name', 'next_run_at', 'last_run_at']
+    ordering = ['name']
+
+    def perform_create(self, serializer):
+        """Set created_by on create"""
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def run(self, request, pk=None):
+        """Run a scheduled report now, for its parameters or a date range in the body"""
+        scheduled = self.get_object()
+        parameters = _scoped_parameters(scheduled.parameters, request.user)
+        for key in ['start_date', 'end_date']:
+            if request.data.get(key):
+                parameters[key] = request.data[key]
+        try:
+            report_run = create_run(
+                scheduled.report_type, parameters, parameters.get('format', 'xlsx'),
+                requested_by=request.user, scheduled_report=scheduled
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue_run(report_run)
+        return Response(ReportRunSerializer(report_run).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportRunViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for ReportRun model
+
+    POST requests an ad-hoc report; the run is generated in the background
+    and its file fetched from the download action once completed. An
+    identical request joins the run already queued or completed.
+
+    A user limited to some sites gets reports over those sites only, and
+    sees only the runs made for exactly the same sites.
+    """
+    queryset = ReportRun.objects.select_related('scheduled_report', 'requested_by')
+    serializer_class = ReportRunSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['report_type', 'status', 'scheduled_report', 'output_format']
+    ordering_fields = ['created_at', 'completed_at']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sites = user_sites(self.request.user)
+        if sites is not None:
+            queryset = queryset.filter(parameters__sites=[list(site) for site in sites])
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """Request an ad-hoc report"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            report_run, created = request_run(
+                serializer.validated_data['report_type'],
+                _scoped_parameters(serializer.validated_data.get('parameters', {}), request.user),
+                serializer.validated_data['output_format'],
+                requested_by=request.user,
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if created:
+            enqueue_run(report_run)
+        # An identical completed run is served as is
+        code = status.HTTP_200_OK if report_run.status == 'completed' else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(report_run).data, status=code)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the output file of a completed run"""
+        report_run = self.get_object()
+        if report_run.status != 'completed' or not report_run.output_file:
+            return Response(
+                {"error": f"Report is not ready (status: {report_run.status})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        path = os.path.join(settings.MEDIA_ROOT, report_run.output_file)
+        if not os.path.exists(path):
+            return Response({"error": "Report file no longer exists"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
+def _window_params(params, levels=None, default_level=None):
+    """
+    Parse the date window, level and equipment filters of an analytics query
+
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    end = parse_date(params.get('end', '')) or timezone.localdate()
+    start = parse_date(params.get('start', '')) or end - timedelta(days=29)
+    level = params.get('level', default_level)
+    if levels is not None and level not in levels:
+        raise ValueError(f"level must be one of {list(levels)}")
+    if start > end:
+        raise ValueError("start must not be after end")
+
+    filters = {field: params.get(field) for field in ['factory', 'workshop', 'line']}
+    try:
+        filters['equipment'] = [int(i) for i in params['equipment'].split(',')] if params.get('equipment') else None
+    except ValueError:
+        raise ValueError("equipment must be comma-separated IDs")
+    return start, end, level, filters
+
+
+class KPIViewSet(viewsets.ViewSet):
+    """
+    Reliability KPIs (MTBF, MTTR, availability) from the daily work order facts
+
+    Query parameters: start, end (YYYY-MM-DD, default the last 30 days),
+    level (asset, line, workshop, factory or plant), factory, workshop,
+    line and equipment (comma-separated IDs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Get KPIs per group of equipment"""
+        try:
+            start, end, level, filters = _window_params(request.query_params, LEVELS, 'asset')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'start': start,
+            'end': end,
+            'level': level,
+            'results': compute_kpis(start, end, level, filters, user_sites(request.user)),
+        })
+
+
+class PMComplianceViewSet(viewsets.ViewSet):
+    """
+    PM compliance (on time, late, missed) of generated preventive work orders
+
+    Query parameters: start, end (YYYY-MM-DD, default the last 30 days),
+    level (plan, asset, line, workshop, factory or plant), factory,
+    workshop, line and equipment (comma-separated IDs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Get PM compliance per group"""
+        try:
+            start, end, level, filters = _window_params(request.query_params, COMPLIANCE_LEVELS, 'plan')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'start': start,
+            'end': end,
+            'level': level,
+            'results': pm_compliance(start, end, level, filters, user_sites(request.user)),
+        })
+
+
+class TechnicianPerformanceViewSet(viewsets.GenericViewSet):
+    """
+    Per-assignee performance of completed work orders, paginated
+
+    Query parameters: start, end (YYYY-MM-DD, default the last 30 days),
+    factory, workshop, line and equipment (comma-separated IDs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Get performance per technician"""
+        try:
+            start, end, _, filters = _window_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(technician_performance(start, end, filters, user_sites(request.user)))
+        return self.get_paginated_response(page)
+
+
+class CostCubeViewSet(viewsets.ViewSet):
+    """
+    Maintenance cost sliced by dimension, or rolled up through the asset tree
+
+    Query parameters: start, end (YYYY-MM, default the last 12 months),
+    group_by (comma-separated dimensions: cost_center, factory, workshop,
+    line, criticality, wo_type, month), any dimension as a filter value,
+    and rollup=tree for per-asset subtree totals.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Get cost per group"""
+        params = request.query_params
+        try:
+            end = parse_date(f"{params['end']}-01") if params.get('end') else timezone.localdate().replace(day=1)
+            start = parse_date(f"{params['start']}-01") if params.get('start') else None
+        except ValueError:
+            end = start = None
+        if end is None or (params.get('start') and start is None):
+            return Response({"error": "start and end must be YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        start = start or (end - timedelta(days=330)).replace(day=1)
+        group_by = [name for name in params.get('group_by', '').split(',') if name]
+        filters = {name: params[name] for name in DIMENSIONS if params.get(name)}
+
+        try:
+            if params.get('rollup') == 'tree':
+                results = cost_tree(start, end, filters, user_sites(request.user))
+            else:
+                results = cost_cube(start, end, group_by, filters, user_sites(request.user))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'start': start.strftime('%Y-%m'),
+            'end': end.strftime('%Y-%m'),
+            'group_by': group_by,
+            'filters': filters,
+            'results': results,
+        })
@@ -2,7 +2,30 @@
 Django Admin configuration for Spare Parts app
 """
 from django.contrib import admin
-from .models import SparePart, PartTransaction, PurchaseRequest
+from .models import (SparePart, PartTransaction, PurchaseRequest, PartDemandForecast, PartStockSnapshot,
+                     PartCompatibility, PartAlternative)
+
+
+class PartCompatibilityInline(admin.TabularInline):
+    """Read-only view of the compatibility index (edit compatible_equipment instead)"""
+    model = PartCompatibility
+    extra = 0
+    can_delete = False
+    readonly_fields = ['equipment_code']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class PartAlternativeInline(admin.TabularInline):
+    """Read-only view of the alternative part index (edit alternative_parts instead)"""
+    model = PartAlternative
+    extra = 0
+    can_delete = False
+    readonly_fields = ['alternative_code']
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(SparePart)
@@ -13,6 +36,7 @@ class SparePartAdmin(admin.ModelAdmin):
     search_fields = ['part_code', 'name', 'description', 'spec', 'manufacturer', 'supplier']
     ordering = ['part_code']
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [PartCompatibilityInline, PartAlternativeInline]
 
     fieldsets = (
         ('Basic Information', {
@@ -61,6 +85,12 @@ class PartTransactionAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     readonly_fields = ['stock_before', 'stock_after', 'created_at']
 
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(PurchaseRequest)
 class PurchaseRequestAdmin(admin.ModelAdmin):
@@ -70,3 +100,24 @@ class PurchaseRequestAdmin(admin.ModelAdmin):
     search_fields = ['pr_code', 'part__part_code', 'part__name', 'requested_by__username']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(PartDemandForecast)
+class PartDemandForecastAdmin(admin.ModelAdmin):
+    """Admin interface for PartDemandForecast model"""
+    list_display = ['part', 'daily_demand', 'lead_time_days', 'proposed_safety_stock', 'proposed_reorder_point', 'computed_at']
+    search_fields = ['part__part_code', 'part__name']
+    ordering = ['part']
+    readonly_fields = ['part', 'window_days', 'daily_demand', 'daily_demand_std', 'lead_time_days',
+                       'lead_time_demand', 'proposed_safety_stock', 'proposed_reorder_point', 'computed_at']
+
+
+@admin.register(PartStockSnapshot)
+class PartStockSnapshotAdmin(admin.ModelAdmin):
+    """Admin interface for PartStockSnapshot model"""
+    list_display = ['part', 'period', 'snapshot_date', 'closing_stock', 'in_quantity', 'out_quantity', 'adjust_quantity']
+    list_filter = ['period', 'snapshot_date']
+    search_fields = ['part__part_code', 'part__name']
+    ordering = ['-snapshot_date', 'part']
+    readonly_fields = ['part', 'period', 'snapshot_date', 'closing_stock', 'in_quantity', 'out_quantity',
+                       'adjust_quantity', 'transaction_count', 'created_at']
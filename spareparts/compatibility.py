@@ -0,0 +1,53 @@
+"""
+Equipment compatibility lookups for Spare Parts app
+Answers "which parts fit this asset" from the indexed relation tables
+"""
+from collections import defaultdict
+
+from .models import SparePart, PartAlternative
+
+
+def compatible_parts(asset, in_stock=False):
+    """
+    Get active parts compatible with an asset, with live stock metrics
+
+    A part matches when its compatible equipment list contains the asset's
+    code or its external equipment ID.
+
+    Args:
+        asset: Asset to look up
+        in_stock: Only return parts with stock on hand
+
+    Returns:
+        QuerySet: SparePart rows annotated with stock metrics
+    """
+    parts = SparePart.objects.compatible_with([asset.code, asset.equipment_id]).filter(
+        lifecycle_status='active'
+    ).with_stock_metrics()
+    if in_stock:
+        parts = parts.filter(current_stock__gt=0)
+    return parts.order_by('part_code')
+
+
+def alternatives_for(part_ids):
+    """
+    Get the alternative parts of several parts with one joined query
+
+    Returns:
+        dict: part ID -> list of dicts with id, part_code, name and current_stock
+    """
+    codes = PartAlternative.objects.filter(part_id__in=part_ids).values_list('part_id', 'alternative_code')
+    by_code = defaultdict(list)
+    for part_id, code in codes:
+        by_code[code].append(part_id)
+    if not by_code:
+        return {}
+
+    result = defaultdict(list)
+    rows = SparePart.objects.filter(part_code__in=by_code.keys()).with_stock_metrics().values(
+        'id', 'part_code', 'name', 'current_stock', 'stock_level'
+    )
+    for row in rows:
+        for part_id in by_code[row['part_code']]:
+            result[part_id].append(row)
+    return dict(result)
@@ -0,0 +1,98 @@
+"""
+Costing engine for Spare Parts app
+Weighted moving average cost maintained from receipt transactions
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Sum, Count, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import SparePart, PartTransaction, TransactionType
+
+COST_QUANTUM = Decimal('0.01')
+
+
+def moving_average_cost(stock_before, average_cost, quantity, unit_cost):
+    """
+    Calculate the weighted moving average cost after a receipt
+
+    Args:
+        stock_before: Stock on hand before the receipt
+        average_cost: Current average cost (None if never costed)
+        quantity: Quantity received
+        unit_cost: Unit cost of the receipt (None if unknown)
+
+    Returns:
+        Decimal: New average cost, rounded to the stored precision
+    """
+    if unit_cost is None:
+        return average_cost
+    if average_cost is None or stock_before <= 0:
+        new_cost = Decimal(unit_cost)
+    else:
+        new_cost = (stock_before * average_cost + quantity * unit_cost) / (stock_before + quantity)
+    return new_cost.quantize(COST_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def recalculate_average_costs(part_ids=None, chunk_size=2000):
+    """
+    Rebuild average_cost for spare parts by replaying the transaction ledger
+
+    The ledger is streamed once in (part, time) order and only the running
+    average of the current part is held in memory. Uses the same rounding as
+    the incremental update so both paths agree. Parts without a costed
+    receipt (e.g. only receipts from before unit_cost was recorded) keep
+    their current average cost.
+
+    Args:
+        part_ids: Optional iterable of part IDs to limit the recalculation
+        chunk_size: Number of ledger rows fetched per database round-trip
+
+    Returns:
+        int: Number of spare parts updated
+    """
+    ledger = PartTransaction.objects.all()
+    if part_ids is not None:
+        ledger = ledger.filter(part_id__in=list(part_ids))
+    rows = ledger.order_by('part_id', 'created_at', 'id').values_list(
+        'part_id', 'transaction_type', 'quantity', 'stock_before', 'unit_cost'
+    ).iterator(chunk_size=chunk_size)
+
+    updates = []
+    current_part = None
+    average_cost = None
+    for part_id, transaction_type, quantity, stock_before, unit_cost in rows:
+        if part_id != current_part:
+            if average_cost is not None:
+                updates.append(SparePart(id=current_part, average_cost=average_cost))
+            current_part = part_id
+            average_cost = None
+        if transaction_type == TransactionType.IN:
+            average_cost = moving_average_cost(stock_before, average_cost, quantity, unit_cost)
+    if average_cost is not None:
+        updates.append(SparePart(id=current_part, average_cost=average_cost))
+
+    SparePart.objects.bulk_update(updates, ['average_cost'], batch_size=500)
+    return len(updates)
+
+
+def inventory_valuation(queryset=None):
+    """
+    Calculate inventory valuation totals with a single aggregate query
+
+    Parts are valued at average cost, falling back to unit cost.
+
+    Args:
+        queryset: Optional SparePart queryset to value (defaults to all parts)
+
+    Returns:
+        dict: part_count, total_quantity and total_value
+    """
+    if queryset is None:
+        queryset = SparePart.objects.all()
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return queryset.with_stock_metrics().aggregate(
+        part_count=Count('id'),
+        total_quantity=Coalesce(Sum('current_stock'), Value(Decimal('0')), output_field=money),
+        total_value=Coalesce(Sum('inventory_value'), Value(Decimal('0')), output_field=money),
+    )
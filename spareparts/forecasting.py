@@ -0,0 +1,173 @@
+"""
+Demand forecasting for Spare Parts app
+Derives consumption rates, safety stock and reorder points from the transaction ledger
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Subquery, OuterRef
+from django.utils import timezone
+
+from .models import SparePart, PartTransaction, PartDemandForecast, TransactionType
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def load_daily_consumption(part_ids, since, until, chunk_size=5000):
+    """
+    Build a day x part matrix of consumed quantities
+
+    Out-movements are streamed from the ledger in chunks and summed per
+    local calendar day. Days without consumption are filled with zero.
+
+    Returns:
+        DataFrame: Index of days, one column per part ID
+    """
+    rows = PartTransaction.objects.filter(
+        transaction_type=TransactionType.OUT,
+        created_at__gte=since,
+        created_at__lt=until,
+    ).order_by().values_list('part_id', 'created_at', 'quantity').iterator(chunk_size=chunk_size)
+
+    part_col, time_col, qty_col = [], [], []
+    for part_id, created_at, quantity in rows:
+        part_col.append(part_id)
+        time_col.append(created_at)
+        qty_col.append(float(quantity))
+
+    tz = timezone.get_current_timezone()
+    days = pd.date_range(
+        timezone.localtime(since, tz).date(),
+        timezone.localtime(until, tz).date(),
+        freq='D'
+    )
+    if not part_col:
+        return pd.DataFrame(0.0, index=days, columns=list(part_ids))
+
+    frame = pd.DataFrame({'part_id': part_col, 'quantity': qty_col})
+    frame['day'] = pd.to_datetime(time_col, utc=True).tz_convert(tz).tz_localize(None).normalize()
+    daily = frame.groupby(['day', 'part_id'])['quantity'].sum().unstack('part_id')
+    return daily.reindex(index=days, columns=list(part_ids)).fillna(0.0)
+
+
+def compute_demand_statistics(daily, lead_times, z):
+    """
+    Compute demand statistics for every part in a vectorised way
+
+    Lead-time demand and its variability are measured directly from rolling
+    sums over each part's lead time, so autocorrelated or lumpy demand is
+    captured. Parts sharing a lead time are processed as one block. When the
+    history is shorter than twice the lead time, the daily statistics are
+    scaled instead.
+
+    Args:
+        daily: Day x part consumption matrix
+        lead_times: Series of lead time days indexed by part ID
+        z: Service level factor
+
+    Returns:
+        DataFrame: One row per part with daily_demand, daily_demand_std,
+            lead_time_demand, safety_stock and reorder_point
+    """
+    stats = pd.DataFrame(index=daily.columns)
+    stats['daily_demand'] = daily.mean()
+    stats['daily_demand_std'] = daily.std(ddof=0)
+    stats['lead_time_days'] = lead_times.reindex(daily.columns).astype(int)
+    stats['lead_time_demand'] = 0.0
+    lead_time_std = pd.Series(0.0, index=daily.columns)
+
+    for lead_time, block in stats.groupby('lead_time_days').groups.items():
+        columns = list(block)
+        if lead_time * 2 <= len(daily):
+            sums = daily[columns].rolling(lead_time).sum().iloc[lead_time - 1:]
+            stats.loc[columns, 'lead_time_demand'] = sums.mean()
+            lead_time_std[columns] = sums.std(ddof=0)
+        else:
+            stats.loc[columns, 'lead_time_demand'] = stats.loc[columns, 'daily_demand'] * lead_time
+            lead_time_std[columns] = stats.loc[columns, 'daily_demand_std'] * np.sqrt(lead_time)
+
+    stats['safety_stock'] = z * lead_time_std.fillna(0.0)
+    stats['reorder_point'] = stats['lead_time_demand'] + stats['safety_stock']
+    return stats.fillna(0.0)
+
+
+def update_demand_forecasts(as_of=None):
+    """
+    Recompute and persist demand forecasts for all active spare parts
+
+    Args:
+        as_of: End of the consumption window (defaults to now)
+
+    Returns:
+        int: Number of forecasts written
+    """
+    as_of = as_of or timezone.now()
+    window_days = _setting('SPAREPART_FORECAST_WINDOW_DAYS', 180)
+    default_lead_time = _setting('SPAREPART_DEFAULT_LEAD_TIME_DAYS', 14)
+    z = _setting('SPAREPART_SERVICE_LEVEL_Z', 1.65)
+
+    parts = dict(
+        SparePart.objects.filter(lifecycle_status='active').values_list('id', 'lead_time_days')
+    )
+    if not parts:
+        return 0
+
+    lead_times = pd.Series(
+        {part_id: max(lead_time or default_lead_time, 1) for part_id, lead_time in parts.items()}
+    )
+    daily = load_daily_consumption(parts.keys(), as_of - timedelta(days=window_days), as_of)
+    stats = compute_demand_statistics(daily, lead_times, z)
+
+    def money(value, places='0.01'):
+        return Decimal(str(value)).quantize(Decimal(places))
+
+    forecasts = [
+        PartDemandForecast(
+            part_id=part_id,
+            window_days=window_days,
+            daily_demand=money(row.daily_demand, '0.0001'),
+            daily_demand_std=money(row.daily_demand_std, '0.0001'),
+            lead_time_days=int(row.lead_time_days),
+            lead_time_demand=money(row.lead_time_demand),
+            proposed_safety_stock=money(row.safety_stock),
+            proposed_reorder_point=money(row.reorder_point),
+            computed_at=as_of,
+        )
+        for part_id, row in stats.iterrows()
+    ]
+    PartDemandForecast.objects.bulk_create(
+        forecasts,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['part'],
+        update_fields=['window_days', 'daily_demand', 'daily_demand_std', 'lead_time_days',
+                       'lead_time_demand', 'proposed_safety_stock', 'proposed_reorder_point',
+                       'computed_at'],
+    )
+    return len(forecasts)
+
+
+def apply_forecasts(part_ids=None):
+    """
+    Copy proposed safety stock and reorder points onto the spare parts
+
+    Args:
+        part_ids: Optional list of part IDs (defaults to every forecast part)
+
+    Returns:
+        int: Number of parts updated
+    """
+    forecast = PartDemandForecast.objects.filter(part=OuterRef('pk'))
+    parts = SparePart.objects.filter(demand_forecast__isnull=False)
+    if part_ids is not None:
+        parts = parts.filter(id__in=part_ids)
+    return parts.update(
+        safety_stock=Subquery(forecast.values('proposed_safety_stock')[:1]),
+        min_stock=Subquery(forecast.values('proposed_reorder_point')[:1]),
+        updated_at=timezone.now(),
+    )
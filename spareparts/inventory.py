@@ -0,0 +1,106 @@
+"""
+Inventory movement service for Spare Parts app
+Applies stock movements to spare parts and records them in the transaction ledger
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SparePart, PartTransaction, TransactionType
+from .costing import moving_average_cost
+
+
+class StockMovementError(Exception):
+    """Raised when a batch of stock movements cannot be applied"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f"line {e['line']}: {e['error']}" for e in errors))
+
+
+def apply_movements(lines, operator):
+    """
+    Apply a batch of stock movements in a single database transaction
+
+    Parts are locked in primary key order before any stock is changed, so
+    concurrent batches touching overlapping parts queue up instead of
+    deadlocking. Lines are applied in input order, so several lines for the
+    same part see each other's effect.
+
+    Args:
+        lines: List of dicts with keys part_id, transaction_type, quantity and
+               optionally unit_cost, reference, related_work_order_id, remark.
+               For adjustments, quantity is the counted stock level.
+               Receipts update the part's moving average cost; receipts
+               without unit_cost are costed at the part's unit cost.
+        operator: User performing the movements
+
+    Returns:
+        list: Created PartTransaction objects in input order
+
+    Raises:
+        StockMovementError: If any line references a missing part or would
+            drive stock negative. Nothing is written in that case.
+    """
+    part_ids = sorted({line['part_id'] for line in lines})
+
+    with transaction.atomic():
+        parts = {
+            part.id: part
+            for part in SparePart.objects.select_for_update().filter(id__in=part_ids).order_by('id')
+        }
+
+        errors = []
+        pending = []
+        for index, line in enumerate(lines):
+            part = parts.get(line['part_id'])
+            if part is None:
+                errors.append({'line': index, 'error': f"Part {line['part_id']} not found"})
+                continue
+
+            quantity = line['quantity']
+            stock_before = part.current_stock
+            transaction_type = line['transaction_type']
+            unit_cost = None
+
+            if transaction_type == TransactionType.IN:
+                stock_after = stock_before + quantity
+                unit_cost = line.get('unit_cost')
+                if unit_cost is None:
+                    unit_cost = part.unit_cost
+                part.average_cost = moving_average_cost(stock_before, part.average_cost, quantity, unit_cost)
+            elif transaction_type == TransactionType.OUT:
+                if quantity > stock_before:
+                    errors.append({
+                        'line': index,
+                        'error': f"Insufficient stock for {part.part_code}: {stock_before} available, {quantity} requested"
+                    })
+                    continue
+                stock_after = stock_before - quantity
+            else:
+                stock_after = quantity
+
+            part.current_stock = stock_after
+            pending.append(PartTransaction(
+                part=part,
+                transaction_type=transaction_type,
+                quantity=quantity,
+                unit_cost=unit_cost,
+                stock_before=stock_before,
+                stock_after=stock_after,
+                related_work_order_id=line.get('related_work_order_id'),
+                reference=line.get('reference') or '',
+                remark=line.get('remark') or '',
+                operator=operator,
+            ))
+
+        if errors:
+            raise StockMovementError(errors)
+
+        created = PartTransaction.objects.bulk_create(pending)
+
+        now = timezone.now()
+        for part in parts.values():
+            part.updated_at = now
+        SparePart.objects.bulk_update(parts.values(), ['current_stock', 'average_cost', 'updated_at'])
+
+    return created
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parttransaction',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Receipt unit cost used for moving average costing', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Unit Cost'),
+        ),
+    ]
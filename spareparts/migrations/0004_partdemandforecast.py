@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0003_parttransaction_unit_cost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartDemandForecast',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('window_days', models.PositiveIntegerField(help_text='Length of consumption history used', verbose_name='Window (Days)')),
+                ('daily_demand', models.DecimalField(decimal_places=4, default=0, help_text='Average quantity consumed per day', max_digits=12, verbose_name='Daily Demand')),
+                ('daily_demand_std', models.DecimalField(decimal_places=4, default=0, max_digits=12, verbose_name='Daily Demand Std Dev')),
+                ('lead_time_days', models.PositiveIntegerField(help_text='Lead time the proposal was computed for', verbose_name='Lead Time (Days)')),
+                ('lead_time_demand', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Lead Time Demand')),
+                ('proposed_safety_stock', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Proposed Safety Stock')),
+                ('proposed_reorder_point', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Proposed Reorder Point')),
+                ('computed_at', models.DateTimeField(verbose_name='Computed At')),
+                ('part', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecast', to='spareparts.sparepart', verbose_name='Part')),
+            ],
+            options={
+                'verbose_name': 'Part Demand Forecast',
+                'verbose_name_plural': 'Part Demand Forecasts',
+                'db_table': 'part_demand_forecasts',
+                'ordering': ['part'],
+            },
+        ),
+    ]
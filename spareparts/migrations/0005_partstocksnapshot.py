@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0004_partdemandforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartStockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('daily', 'Daily'), ('monthly', 'Monthly')], max_length=10, verbose_name='Period')),
+                ('snapshot_date', models.DateField(help_text='Last day of the period; stock is as of the end of this day', verbose_name='Snapshot Date')),
+                ('closing_stock', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Closing Stock')),
+                ('in_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='In Quantity')),
+                ('out_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Out Quantity')),
+                ('adjust_quantity', models.DecimalField(decimal_places=2, default=0, help_text='Net stock change from adjustments', max_digits=12, verbose_name='Adjustment Quantity')),
+                ('transaction_count', models.PositiveIntegerField(default=0, verbose_name='Transaction Count')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Created At')),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='spareparts.sparepart', verbose_name='Part')),
+            ],
+            options={
+                'verbose_name': 'Part Stock Snapshot',
+                'verbose_name_plural': 'Part Stock Snapshots',
+                'db_table': 'part_stock_snapshots',
+                'ordering': ['part', '-snapshot_date'],
+                'indexes': [models.Index(fields=['period', 'snapshot_date'], name='part_stock__period_cad4cb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('part', 'period', 'snapshot_date'), name='uniq_part_snapshot_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _codes(values):
+    if not isinstance(values, (list, tuple)):
+        return []
+    codes = []
+    for value in values:
+        code = str(value).strip() if value is not None else ''
+        if code and len(code) <= 50 and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def backfill_relation_indexes(apps, schema_editor):
+    SparePart = apps.get_model('spareparts', 'SparePart')
+    PartCompatibility = apps.get_model('spareparts', 'PartCompatibility')
+    PartAlternative = apps.get_model('spareparts', 'PartAlternative')
+
+    compatibility, alternatives = [], []
+    parts = SparePart.objects.values_list('id', 'compatible_equipment', 'alternative_parts').iterator(chunk_size=2000)
+    for part_id, equipment, alternative in parts:
+        compatibility.extend(PartCompatibility(part_id=part_id, equipment_code=code) for code in _codes(equipment))
+        alternatives.extend(PartAlternative(part_id=part_id, alternative_code=code) for code in _codes(alternative))
+    PartCompatibility.objects.bulk_create(compatibility, batch_size=1000)
+    PartAlternative.objects.bulk_create(alternatives, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0005_partstocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartAlternative',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('alternative_code', models.CharField(db_index=True, max_length=50, verbose_name='Alternative Part Code')),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alternatives', to='spareparts.sparepart', verbose_name='Part')),
+            ],
+            options={
+                'verbose_name': 'Part Alternative',
+                'verbose_name_plural': 'Part Alternatives',
+                'db_table': 'part_alternatives',
+                'ordering': ['part', 'alternative_code'],
+                'constraints': [models.UniqueConstraint(fields=('part', 'alternative_code'), name='uniq_part_alternative_code')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PartCompatibility',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('equipment_code', models.CharField(db_index=True, max_length=50, verbose_name='Equipment Code')),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compatibility', to='spareparts.sparepart', verbose_name='Part')),
+            ],
+            options={
+                'verbose_name': 'Part Compatibility',
+                'verbose_name_plural': 'Part Compatibility',
+                'db_table': 'part_compatibility',
+                'ordering': ['part', 'equipment_code'],
+                'constraints': [models.UniqueConstraint(fields=('part', 'equipment_code'), name='uniq_part_equipment_code')],
+            },
+        ),
+        migrations.RunPython(backfill_relation_indexes, migrations.RunPython.noop),
+    ]
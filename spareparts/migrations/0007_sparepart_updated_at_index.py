@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0006_part_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sparepart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At'),
+        ),
+    ]
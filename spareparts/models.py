@@ -2,13 +2,33 @@
 Spare Parts models for CMMS
 Inventory management and tracking
 """
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Q, Value, Case, When, Count, Sum, Exists, OuterRef
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
+from users.tracking import TrackedFieldsMixin
 
 User = get_user_model()
 
 
+def normalize_codes(values):
+    """
+    Clean a JSON list of codes into a de-duplicated list of non-empty strings
+
+    Codes longer than 50 characters cannot match an asset or part code and are dropped.
+    """
+    if not isinstance(values, (list, tuple)):
+        return []
+    codes = []
+    for value in values:
+        code = str(value).strip() if value is not None else ''
+        if code and len(code) <= 50 and code not in codes:
+            codes.append(code)
+    return codes
+
+
 class TransactionType(models.TextChoices):
     """Transaction types for inventory movements"""
     IN = 'in', 'Stock In'
@@ -16,11 +36,77 @@ class TransactionType(models.TextChoices):
     ADJUST = 'adjust', 'Adjustment'
 
 
-class SparePart(models.Model):
+class SparePartQuerySet(models.QuerySet):
+    """QuerySet exposing stock status and valuation as SQL expressions"""
+
+    def with_stock_metrics(self):
+        """
+        Annotate stock metrics so they can be filtered, sorted and aggregated
+
+        Adds valuation_cost, inventory_value, stock_level ('critical',
+        'warning' or 'ok') and below_min_stock.
+        """
+        if 'inventory_value' in self.query.annotations:
+            return self
+        valuation_cost = Coalesce('average_cost', 'unit_cost', Value(Decimal('0')))
+        return self.annotate(
+            valuation_cost=valuation_cost,
+            inventory_value=models.ExpressionWrapper(
+                F('current_stock') * valuation_cost,
+                output_field=models.DecimalField(max_digits=14, decimal_places=2)
+            ),
+            stock_level=Case(
+                When(current_stock__lte=F('min_stock'), then=Value('critical')),
+                When(current_stock__lte=F('safety_stock'), then=Value('warning')),
+                default=Value('ok'),
+                output_field=models.CharField()
+            ),
+            below_min_stock=Case(
+                When(current_stock__lte=F('min_stock'), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField()
+            ),
+        )
+
+    def compatible_with(self, equipment_codes):
+        """Filter parts listed as compatible with any of the given equipment codes"""
+        return self.filter(Exists(PartCompatibility.objects.filter(
+            part=OuterRef('pk'),
+            equipment_code__in=[code for code in equipment_codes if code]
+        )))
+
+    def stock_overview(self, group_by='category'):
+        """
+        Aggregate stock counts and value per group in one grouped query
+
+        Args:
+            group_by: Field to group by (e.g. category, location)
+
+        Returns:
+            QuerySet: One dict per group with part_count, total_quantity,
+                total_value, critical_count and warning_count
+        """
+        critical = Q(current_stock__lte=F('min_stock'))
+        warning = Q(current_stock__gt=F('min_stock'), current_stock__lte=F('safety_stock'))
+        return self.with_stock_metrics().order_by().values(group_by).annotate(
+            part_count=Count('id'),
+            total_quantity=Sum('current_stock'),
+            total_value=Sum('inventory_value'),
+            critical_count=Count('id', filter=critical),
+            warning_count=Count('id', filter=warning),
+        ).order_by(group_by)
+
+
+class SparePart(TrackedFieldsMixin, models.Model):
     """
     Spare Part - inventory item for maintenance
     Tracks stock levels, locations, and reordering information
     """
+    tracked_fields = (
+        'name', 'spec', 'category', 'unit', 'supplier', 'safety_stock', 'min_stock', 'max_stock', 'reorder_quantity',
+        'location', 'unit_cost', 'lead_time_days', 'lifecycle_status',
+    )
+
     id = models.BigAutoField(primary_key=True)
     part_code = models.CharField(
         max_length=50,
@@ -194,9 +280,12 @@ class SparePart(models.Model):
     )
     updated_at = models.DateTimeField(
         auto_now=True,
-        verbose_name='Updated At'
+        verbose_name='Updated At',
+        db_index=True
     )
 
+    objects = SparePartQuerySet.as_manager()
+
     class Meta:
         db_table = 'spare_parts'
         verbose_name = 'Spare Part'
@@ -211,9 +300,40 @@ class SparePart(models.Model):
     def __str__(self):
         return f"{self.part_code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        """Save the part and keep the compatibility indexes in step with the JSON lists"""
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'compatible_equipment', 'alternative_parts'} & set(update_fields):
+            self.sync_relation_indexes()
+
+    def delete(self, *args, **kwargs):
+        # Shared report runs over the old stock must not be reused
+        from django.db import transaction
+        from reports.engine import note_source_deletion
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            note_source_deletion()
+        return result
+
+    def sync_relation_indexes(self):
+        """Rewrite the PartCompatibility and PartAlternative rows of this part"""
+        for model, field, codes in [
+            (PartCompatibility, 'equipment_code', normalize_codes(self.compatible_equipment)),
+            (PartAlternative, 'alternative_code', normalize_codes(self.alternative_parts)),
+        ]:
+            rows = model.objects.filter(part=self)
+            rows.exclude(**{f'{field}__in': codes}).delete()
+            existing = set(rows.values_list(field, flat=True))
+            model.objects.bulk_create([
+                model(part=self, **{field: code}) for code in codes if code not in existing
+            ])
+
     @property
     def is_below_min_stock(self):
         """Check if stock is below minimum level"""
+        if hasattr(self, 'below_min_stock'):
+            return self.below_min_stock
         return self.current_stock <= self.min_stock
 
     @property
@@ -224,6 +344,8 @@ class SparePart(models.Model):
     @property
     def stock_status(self):
         """Get stock status indicator"""
+        if hasattr(self, 'stock_level'):
+            return self.stock_level
         if self.current_stock <= self.min_stock:
             return 'critical'
         elif self.current_stock <= self.safety_stock:
@@ -234,17 +356,97 @@ class SparePart(models.Model):
     @property
     def total_value(self):
         """Calculate total inventory value"""
-        if self.average_cost:
+        if hasattr(self, 'inventory_value'):
+            return self.inventory_value
+        # Same fallback as the valuation_cost annotation: a zero average cost is a cost
+        if self.average_cost is not None:
             return self.current_stock * self.average_cost
-        elif self.unit_cost:
+        elif self.unit_cost is not None:
             return self.current_stock * self.unit_cost
         return 0
 
 
+class PartCompatibility(models.Model):
+    """
+    Part Compatibility - indexed form of SparePart.compatible_equipment
+    One row per part and equipment code, maintained when the part is saved
+    """
+    id = models.BigAutoField(primary_key=True)
+    part = models.ForeignKey(
+        SparePart,
+        on_delete=models.CASCADE,
+        related_name='compatibility',
+        verbose_name='Part'
+    )
+    equipment_code = models.CharField(
+        max_length=50,
+        db_index=True,
+        verbose_name='Equipment Code'
+    )
+
+    class Meta:
+        db_table = 'part_compatibility'
+        verbose_name = 'Part Compatibility'
+        verbose_name_plural = 'Part Compatibility'
+        ordering = ['part', 'equipment_code']
+        constraints = [
+            models.UniqueConstraint(fields=['part', 'equipment_code'], name='uniq_part_equipment_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id} -> {self.equipment_code}"
+
+
+class PartAlternative(models.Model):
+    """
+    Part Alternative - indexed form of SparePart.alternative_parts
+    One row per part and alternative part code, maintained when the part is saved
+    """
+    id = models.BigAutoField(primary_key=True)
+    part = models.ForeignKey(
+        SparePart,
+        on_delete=models.CASCADE,
+        related_name='alternatives',
+        verbose_name='Part'
+    )
+    alternative_code = models.CharField(
+        max_length=50,
+        db_index=True,
+        verbose_name='Alternative Part Code'
+    )
+
+    class Meta:
+        db_table = 'part_alternatives'
+        verbose_name = 'Part Alternative'
+        verbose_name_plural = 'Part Alternatives'
+        ordering = ['part', 'alternative_code']
+        constraints = [
+            models.UniqueConstraint(fields=['part', 'alternative_code'], name='uniq_part_alternative_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id} -> {self.alternative_code}"
+
+
+class LedgerImmutableError(Exception):
+    """Raised when an existing part transaction would be changed or removed"""
+
+
+class PartTransactionQuerySet(models.QuerySet):
+    """QuerySet that refuses bulk changes to the append-only ledger"""
+
+    def update(self, **kwargs):
+        raise LedgerImmutableError('Part transactions are append-only; post an adjustment instead')
+
+    def delete(self):
+        raise LedgerImmutableError('Part transactions are append-only; post an adjustment instead')
+
+
 class PartTransaction(models.Model):
     """
     Part Transaction - tracks all inventory movements
-    Records stock in, stock out, and adjustments
+    Records stock in, stock out, and adjustments. The ledger is append-only:
+    corrections are posted as new adjustment rows.
     """
     id = models.BigAutoField(primary_key=True)
     part = models.ForeignKey(
@@ -264,6 +466,15 @@ class PartTransaction(models.Model):
         verbose_name='Quantity',
         help_text='Positive value. Direction determined by transaction type.'
     )
+    unit_cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Unit Cost',
+        help_text='Receipt unit cost used for moving average costing'
+    )
     # Stock snapshot
     stock_before = models.DecimalField(
         max_digits=10,
@@ -310,6 +521,8 @@ class PartTransaction(models.Model):
         db_index=True
     )
 
+    objects = PartTransactionQuerySet.as_manager()
+
     class Meta:
         db_table = 'part_transactions'
         verbose_name = 'Part Transaction'
@@ -324,6 +537,162 @@ class PartTransaction(models.Model):
     def __str__(self):
         return f"{self.part.part_code} - {self.get_transaction_type_display()} - {self.quantity} - {self.created_at}"
 
+    def save(self, *args, **kwargs):
+        """Only allow inserting new ledger rows"""
+        if not self._state.adding:
+            raise LedgerImmutableError('Part transactions are append-only; post an adjustment instead')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise LedgerImmutableError('Part transactions are append-only; post an adjustment instead')
+
+
+class SnapshotPeriod(models.TextChoices):
+    """Granularity of stock snapshots"""
+    DAILY = 'daily', 'Daily'
+    MONTHLY = 'monthly', 'Monthly'
+
+
+class PartStockSnapshot(models.Model):
+    """
+    Part Stock Snapshot - closing stock and movements of a part for one period
+    Written by the snapshot job so historical stock and period movement
+    reports do not have to replay the whole ledger
+    """
+    id = models.BigAutoField(primary_key=True)
+    part = models.ForeignKey(
+        SparePart,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots',
+        verbose_name='Part'
+    )
+    period = models.CharField(
+        max_length=10,
+        choices=SnapshotPeriod.choices,
+        verbose_name='Period'
+    )
+    snapshot_date = models.DateField(
+        verbose_name='Snapshot Date',
+        help_text='Last day of the period; stock is as of the end of this day'
+    )
+    closing_stock = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name='Closing Stock'
+    )
+    in_quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='In Quantity'
+    )
+    out_quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Out Quantity'
+    )
+    adjust_quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Adjustment Quantity',
+        help_text='Net stock change from adjustments'
+    )
+    transaction_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Transaction Count'
+    )
+    created_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Created At'
+    )
+
+    class Meta:
+        db_table = 'part_stock_snapshots'
+        verbose_name = 'Part Stock Snapshot'
+        verbose_name_plural = 'Part Stock Snapshots'
+        ordering = ['part', '-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(fields=['part', 'period', 'snapshot_date'], name='uniq_part_snapshot_period'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'snapshot_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.part.part_code} - {self.period} {self.snapshot_date} - {self.closing_stock}"
+
+    @property
+    def opening_stock(self):
+        """Stock at the start of the period"""
+        return self.closing_stock - self.in_quantity + self.out_quantity - self.adjust_quantity
+
+
+class PartDemandForecast(models.Model):
+    """
+    Part Demand Forecast - consumption statistics computed from the transaction ledger
+    Holds proposed safety stock and reorder point for the stock screens
+    """
+    id = models.BigAutoField(primary_key=True)
+    part = models.OneToOneField(
+        SparePart,
+        on_delete=models.CASCADE,
+        related_name='demand_forecast',
+        verbose_name='Part'
+    )
+    window_days = models.PositiveIntegerField(
+        verbose_name='Window (Days)',
+        help_text='Length of consumption history used'
+    )
+    daily_demand = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=0,
+        verbose_name='Daily Demand',
+        help_text='Average quantity consumed per day'
+    )
+    daily_demand_std = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=0,
+        verbose_name='Daily Demand Std Dev'
+    )
+    lead_time_days = models.PositiveIntegerField(
+        verbose_name='Lead Time (Days)',
+        help_text='Lead time the proposal was computed for'
+    )
+    lead_time_demand = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Lead Time Demand'
+    )
+    proposed_safety_stock = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Proposed Safety Stock'
+    )
+    proposed_reorder_point = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Proposed Reorder Point'
+    )
+    computed_at = models.DateTimeField(
+        verbose_name='Computed At'
+    )
+
+    class Meta:
+        db_table = 'part_demand_forecasts'
+        verbose_name = 'Part Demand Forecast'
+        verbose_name_plural = 'Part Demand Forecasts'
+        ordering = ['part']
+
+    def __str__(self):
+        return f"{self.part.part_code} - ROP {self.proposed_reorder_point}"
+
 
 class PurchaseRequest(models.Model):
     """
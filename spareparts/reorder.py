@@ -0,0 +1,179 @@
+"""
+Reorder-point engine for Spare Parts app
+Drafts purchase requests for parts that have fallen to their reorder point
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_CEILING
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Value, Exists, OuterRef, Subquery, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SparePart, PartTransaction, PurchaseRequest, TransactionType
+
+# Purchase request statuses that still cover a part's shortfall
+OPEN_REQUEST_STATUSES = ['draft', 'pending', 'approved', 'ordered']
+
+# Attempts at drafting when a concurrent run takes the same PR codes
+DRAFT_ATTEMPTS = 3
+
+
+def _window_days():
+    return settings.CMMS_SETTINGS.get('SPAREPART_REORDER_WINDOW_DAYS', 90)
+
+
+def reorder_candidates(as_of=None):
+    """
+    Get active parts at or below their reorder point with no open purchase request
+
+    Recent consumption is computed in the same query as a correlated subquery.
+
+    Args:
+        as_of: Reference time for the consumption window (defaults to now)
+
+    Returns:
+        QuerySet: SparePart rows annotated with consumed_quantity
+    """
+    as_of = as_of or timezone.now()
+    since = as_of - timedelta(days=_window_days())
+
+    open_requests = PurchaseRequest.objects.filter(
+        part=OuterRef('pk'),
+        status__in=OPEN_REQUEST_STATUSES
+    )
+    consumption = PartTransaction.objects.filter(
+        part=OuterRef('pk'),
+        transaction_type=TransactionType.OUT,
+        created_at__gte=since,
+        created_at__lt=as_of
+    ).order_by().values('part').annotate(total=Sum('quantity')).values('total')
+
+    return SparePart.objects.filter(
+        lifecycle_status='active',
+        min_stock__gt=0,
+        current_stock__lte=F('min_stock'),
+    ).annotate(
+        has_open_request=Exists(open_requests),
+        consumed_quantity=Coalesce(
+            Subquery(consumption, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    ).filter(has_open_request=False).order_by('part_code')
+
+
+def reorder_quantity(part, daily_rate):
+    """
+    Calculate the quantity to order for a part
+
+    Orders enough to bring stock back up to max stock (or min stock when no
+    max is set) after covering expected consumption during the lead time,
+    and never less than the part's reorder quantity.
+
+    Args:
+        part: SparePart to reorder
+        daily_rate: Average daily consumption
+
+    Returns:
+        Decimal: Whole-unit quantity to order (0 if nothing is needed)
+    """
+    lead_time_demand = daily_rate * (part.lead_time_days or 0)
+    target = part.max_stock or part.min_stock
+    quantity = max(target - part.current_stock + lead_time_demand, part.reorder_quantity or Decimal('0'))
+    if quantity <= 0:
+        return Decimal('0')
+    return quantity.to_integral_value(rounding=ROUND_CEILING)
+
+
+def reorder_urgency(part, daily_rate):
+    """Get purchase request urgency from how close the part is to running out"""
+    if part.current_stock <= 0:
+        return 'critical'
+    if part.current_stock <= daily_rate * (part.lead_time_days or 0) or part.current_stock <= part.safety_stock:
+        return 'high'
+    return 'medium'
+
+
+def plan_reorders(as_of=None):
+    """
+    Calculate purchase request lines for all parts needing a reorder
+
+    Returns:
+        list: Dicts with part, quantity, urgency and daily_rate
+    """
+    window = Decimal(_window_days())
+    plans = []
+    for part in reorder_candidates(as_of):
+        daily_rate = part.consumed_quantity / window
+        quantity = reorder_quantity(part, daily_rate)
+        if quantity <= 0:
+            continue
+        plans.append({
+            'part': part,
+            'quantity': quantity,
+            'urgency': reorder_urgency(part, daily_rate),
+            'daily_rate': daily_rate.quantize(Decimal('0.01')),
+        })
+    return plans
+
+
+def _next_sequence(prefix):
+    """Get the PR code sequence number following the highest one with a prefix"""
+    last = PurchaseRequest.objects.filter(pr_code__startswith=prefix).order_by('-pr_code').first()
+    if last:
+        try:
+            return int(last.pr_code.split('-')[-1]) + 1
+        except (ValueError, IndexError):
+            pass
+    return 1
+
+
+def draft_reorder_requests(requested_by, as_of=None):
+    """
+    Bulk-create draft purchase requests for every part needing a reorder
+
+    Codes continue from the highest code of the day. If a concurrent run
+    takes the same codes, the unique PR code rejects the insert and the
+    drafts are planned again, which also drops the parts that run covered.
+
+    Args:
+        requested_by: User recorded as requester on the drafts
+        as_of: Reference time (defaults to now)
+
+    Returns:
+        list: Created PurchaseRequest objects
+    """
+    as_of = as_of or timezone.now()
+    today = timezone.localdate(as_of)
+    prefix = f"PR-{today.strftime('%Y%m%d')}-"
+
+    for attempt in range(DRAFT_ATTEMPTS):
+        plans = plan_reorders(as_of)
+        if not plans:
+            return []
+
+        seq = _next_sequence(prefix)
+        requests = []
+        for offset, plan in enumerate(plans):
+            part = plan['part']
+            requests.append(PurchaseRequest(
+                pr_code=f"{prefix}{seq + offset:03d}",
+                part=part,
+                quantity=plan['quantity'],
+                urgency=plan['urgency'],
+                status='draft',
+                reason=(
+                    f"自动补货: 当前库存 {part.current_stock} ≤ 再订货点 {part.min_stock}, "
+                    f"日均消耗 {plan['daily_rate']}, 交期 {part.lead_time_days or 0} 天"
+                ),
+                requested_by=requested_by,
+                expected_delivery_date=today + timedelta(days=part.lead_time_days or 0),
+            ))
+        try:
+            with transaction.atomic():
+                return PurchaseRequest.objects.bulk_create(requests)
+        except IntegrityError:
+            if attempt == DRAFT_ATTEMPTS - 1:
+                raise
@@ -1,8 +1,10 @@
 """
 Serializers for Spare Parts app
 """
+from decimal import Decimal
 from rest_framework import serializers
-from .models import SparePart, PartTransaction
+from django.db import models
+from .models import SparePart, PartTransaction, PurchaseRequest, TransactionType
 
 
 class SparePartSerializer(serializers.ModelSerializer):
@@ -10,6 +12,12 @@ class SparePartSerializer(serializers.ModelSerializer):
     is_below_min_stock = serializers.BooleanField(read_only=True)
     stock_status = serializers.CharField(read_only=True)
     total_value = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    daily_demand = serializers.DecimalField(source='demand_forecast.daily_demand', max_digits=12,
+                                            decimal_places=4, read_only=True, allow_null=True)
+    proposed_safety_stock = serializers.DecimalField(source='demand_forecast.proposed_safety_stock', max_digits=10,
+                                                     decimal_places=2, read_only=True, allow_null=True)
+    proposed_reorder_point = serializers.DecimalField(source='demand_forecast.proposed_reorder_point', max_digits=10,
+                                                      decimal_places=2, read_only=True, allow_null=True)
     
     class Meta:
         model = SparePart
@@ -18,20 +26,144 @@ class SparePartSerializer(serializers.ModelSerializer):
                   'unit_cost', 'average_cost', 'supplier', 'supplier_part_code', 'location',
                   'reorder_quantity', 'lead_time_days', 'lifecycle_status',
                   'notes', 'created_at', 'updated_at', 'is_below_min_stock', 
-                  'stock_status', 'total_value']
+                  'stock_status', 'total_value', 'daily_demand', 'proposed_safety_stock',
+                  'proposed_reorder_point', 'compatible_equipment', 'alternative_parts']
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at', 
                            'is_below_min_stock', 'stock_status', 'total_value']
 
+    def _validate_codes(self, value):
+        if not isinstance(value, list) or not all(isinstance(code, str) and len(code) <= 50 for code in value):
+            raise serializers.ValidationError("Must be a list of codes of at most 50 characters")
+        return value
+
+    def validate_compatible_equipment(self, value):
+        return self._validate_codes(value)
+
+    def validate_alternative_parts(self, value):
+        return self._validate_codes(value)
+
+
+class CompatiblePartSerializer(serializers.ModelSerializer):
+    """Compact serializer for parts offered on the work order form"""
+    stock_status = serializers.CharField(read_only=True)
+    alternatives = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SparePart
+        fields = ['id', 'part_code', 'name', 'spec', 'unit', 'location', 'shelf',
+                  'current_stock', 'min_stock', 'stock_status', 'average_cost', 'unit_cost',
+                  'alternatives']
+
+    def get_alternatives(self, obj):
+        """Alternative parts looked up by the view, if requested"""
+        return self.context.get('alternatives', {}).get(obj.id, [])
+
 
 class PartTransactionSerializer(serializers.ModelSerializer):
     """Serializer for PartTransaction model"""
     part_code = serializers.CharField(source='part.part_code', read_only=True)
     part_name = serializers.CharField(source='part.name', read_only=True)
-    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
-    
+    operator_name = serializers.CharField(source='operator.full_name', read_only=True)
+
     class Meta:
         model = PartTransaction
         fields = ['id', 'part', 'part_code', 'part_name',
-                  'transaction_type', 'quantity', 'unit_cost', 'total_cost',
-                  'reference', 'notes', 'created_by', 'created_by_name', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+                  'transaction_type', 'quantity', 'unit_cost', 'stock_before', 'stock_after',
+                  'related_work_order', 'reference', 'remark',
+                  'operator', 'operator_name', 'created_at']
+        read_only_fields = ['id', 'stock_before', 'stock_after', 'operator', 'created_at']
+
+
+class PurchaseRequestSerializer(serializers.ModelSerializer):
+    """Serializer for PurchaseRequest model"""
+    part_code = serializers.CharField(source='part.part_code', read_only=True)
+    part_name = serializers.CharField(source='part.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = PurchaseRequest
+        fields = ['id', 'pr_code', 'part', 'part_code', 'part_name', 'quantity', 'urgency',
+                  'status', 'status_display', 'reason', 'requested_by', 'approved_by',
+                  'approved_at', 'expected_delivery_date', 'actual_delivery_date',
+                  'notes', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'requested_by', 'approved_by', 'approved_at', 'created_at', 'updated_at']
+
+
+class StockMovementLineSerializer(serializers.Serializer):
+    """Serializer for a single stock movement line"""
+    part = serializers.IntegerField(required=False)
+    part_code = serializers.CharField(required=False, max_length=50)
+    transaction_type = serializers.ChoiceField(choices=TransactionType.choices)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    unit_cost = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'),
+                                         required=False, allow_null=True)
+    reference = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    related_work_order = serializers.IntegerField(required=False, allow_null=True)
+    remark = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        """Require a part reference and a positive quantity for in/out movements"""
+        if attrs.get('part') is None and not attrs.get('part_code'):
+            raise serializers.ValidationError({"part": "Either part or part_code is required"})
+        if attrs['transaction_type'] != TransactionType.ADJUST and attrs['quantity'] <= 0:
+            raise serializers.ValidationError({"quantity": "Quantity must be greater than 0"})
+        return attrs
+
+
+class PartIdsSerializer(serializers.Serializer):
+    """Serializer for the optional part IDs a bulk action is limited to"""
+    part_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_null=True)
+
+
+class StockMovementBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of stock movements applied together"""
+    lines = StockMovementLineSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_lines(self, lines):
+        """Resolve part and work order references for all lines with one query each"""
+        from workorders.models import WorkOrder
+
+        part_ids = {line['part'] for line in lines if line.get('part') is not None}
+        part_codes = {line['part_code'] for line in lines if line.get('part') is None}
+        parts = SparePart.objects.filter(
+            models.Q(id__in=part_ids) | models.Q(part_code__in=part_codes)
+        ).values_list('id', 'part_code')
+        known_ids = {part_id for part_id, _ in parts}
+        ids_by_code = {code: part_id for part_id, code in parts}
+
+        work_order_ids = {line['related_work_order'] for line in lines if line.get('related_work_order')}
+        known_work_orders = set(
+            WorkOrder.objects.filter(id__in=work_order_ids).values_list('id', flat=True)
+        )
+
+        errors = []
+        resolved = []
+        for line in lines:
+            line_errors = {}
+            if line.get('part') is not None:
+                part_id = line['part'] if line['part'] in known_ids else None
+                if part_id is None:
+                    line_errors['part'] = f"Part {line['part']} not found"
+            else:
+                part_id = ids_by_code.get(line['part_code'])
+                if part_id is None:
+                    line_errors['part_code'] = f"Part code '{line['part_code']}' not found"
+
+            work_order_id = line.get('related_work_order')
+            if work_order_id and work_order_id not in known_work_orders:
+                line_errors['related_work_order'] = f"Work order {work_order_id} not found"
+
+            errors.append(line_errors)
+            resolved.append({
+                'part_id': part_id,
+                'transaction_type': line['transaction_type'],
+                'quantity': line['quantity'],
+                'unit_cost': line.get('unit_cost'),
+                'reference': line.get('reference', ''),
+                'related_work_order_id': work_order_id,
+                'remark': line.get('remark', ''),
+            })
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return resolved
@@ -0,0 +1,353 @@
+"""
+Stock snapshots for Spare Parts app
+Periodic per-part stock snapshots, historical stock lookups and ledger consistency checks
+"""
+import calendar
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum, Count, Max, Value, Subquery, OuterRef, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SparePart, PartTransaction, PartStockSnapshot, SnapshotPeriod, TransactionType
+
+ZERO = Decimal('0')
+STOCK_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def day_start(day):
+    """Get the aware datetime of local midnight at the start of a date"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_bounds(period, snapshot_date):
+    """
+    Get the first day of a snapshot period and the datetime it ends at
+
+    Args:
+        period: SnapshotPeriod value
+        snapshot_date: Last day of the period
+
+    Returns:
+        tuple: (first day, aware end datetime exclusive)
+    """
+    if period == SnapshotPeriod.MONTHLY:
+        first_day = snapshot_date.replace(day=1)
+    else:
+        first_day = snapshot_date
+    return first_day, day_start(snapshot_date + timedelta(days=1))
+
+
+def _ledger_stock(queryset, at):
+    """
+    Annotate stock_at with each part's stock at a point in time from the ledger
+
+    Uses the last ledger row before the time, then the first row after it,
+    and finally the current stock for parts that have never moved.
+    """
+    ledger = PartTransaction.objects.filter(part=OuterRef('pk'))
+    before = ledger.filter(created_at__lt=at).order_by('-created_at', '-id').values('stock_after')[:1]
+    after = ledger.filter(created_at__gte=at).order_by('created_at', 'id').values('stock_before')[:1]
+    return queryset.annotate(stock_at=Coalesce(
+        Subquery(before, output_field=STOCK_FIELD),
+        Subquery(after, output_field=STOCK_FIELD),
+        F('current_stock'),
+        output_field=STOCK_FIELD
+    ))
+
+
+def _ledger_movements(filters, part_ids=None):
+    """
+    Sum ledger movements per part with one grouped query
+
+    Returns:
+        dict: part ID -> dict of in_quantity, out_quantity, adjust_quantity and transaction_count
+    """
+    ledger = PartTransaction.objects.filter(filters)
+    if part_ids is not None:
+        ledger = ledger.filter(part_id__in=part_ids)
+    zero = Value(ZERO)
+    rows = ledger.order_by().values('part_id').annotate(
+        in_quantity=Coalesce(Sum('quantity', filter=Q(transaction_type=TransactionType.IN)), zero,
+                             output_field=STOCK_FIELD),
+        out_quantity=Coalesce(Sum('quantity', filter=Q(transaction_type=TransactionType.OUT)), zero,
+                              output_field=STOCK_FIELD),
+        adjust_quantity=Coalesce(Sum(F('stock_after') - F('stock_before'),
+                                     filter=Q(transaction_type=TransactionType.ADJUST)), zero,
+                                 output_field=STOCK_FIELD),
+        transaction_count=Count('id'),
+    )
+    return {row.pop('part_id'): row for row in rows}
+
+
+def build_snapshots(period, snapshot_date):
+    """
+    Write the snapshot of every spare part for one period
+
+    Existing snapshots for the period are overwritten, so the job can be
+    re-run safely.
+
+    Args:
+        period: SnapshotPeriod value
+        snapshot_date: Last day of the period
+
+    Returns:
+        int: Number of snapshots written
+    """
+    first_day, end = period_bounds(period, snapshot_date)
+    parts = _ledger_stock(SparePart.objects.filter(created_at__lt=end), end).values_list('id', 'stock_at')
+    movements = _ledger_movements(Q(created_at__gte=day_start(first_day), created_at__lt=end))
+
+    empty = {'in_quantity': ZERO, 'out_quantity': ZERO, 'adjust_quantity': ZERO, 'transaction_count': 0}
+    snapshots = [
+        PartStockSnapshot(
+            part_id=part_id,
+            period=period,
+            snapshot_date=snapshot_date,
+            closing_stock=stock,
+            **movements.get(part_id, empty)
+        )
+        for part_id, stock in parts
+    ]
+    PartStockSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['part', 'period', 'snapshot_date'],
+        update_fields=['closing_stock', 'in_quantity', 'out_quantity', 'adjust_quantity',
+                       'transaction_count', 'created_at'],
+    )
+    return len(snapshots)
+
+
+def build_stock_snapshots(through=None, since=None):
+    """
+    Write daily snapshots up to a date, plus monthly snapshots for completed months
+
+    Continues from the last daily snapshot so missed runs are filled in.
+    Without any existing snapshot only the last day is written unless since
+    is given to backfill history.
+
+    Args:
+        through: Last day to snapshot (defaults to yesterday)
+        since: First day to snapshot when backfilling
+
+    Returns:
+        dict: Number of daily and monthly snapshots written
+    """
+    through = through or timezone.localdate() - timedelta(days=1)
+    if since is None:
+        last = PartStockSnapshot.objects.filter(period=SnapshotPeriod.DAILY).aggregate(
+            last=Max('snapshot_date'))['last']
+        since = last + timedelta(days=1) if last else through
+
+    written = {'daily': 0, 'monthly': 0}
+    day = since
+    while day <= through:
+        written['daily'] += build_snapshots(SnapshotPeriod.DAILY, day)
+        if day.day == calendar.monthrange(day.year, day.month)[1]:
+            written['monthly'] += build_snapshots(SnapshotPeriod.MONTHLY, day)
+        day += timedelta(days=1)
+    return written
+
+
+def stock_as_of(at, part_ids=None):
+    """
+    Get the stock of spare parts at a point in time
+
+    Starts from each part's latest snapshot ending before the time and adds
+    the net ledger movement since then. Parts without a snapshot fall back
+    to the ledger.
+
+    Args:
+        at: Aware datetime
+        part_ids: Optional list of part IDs (defaults to all parts existing at that time)
+
+    Returns:
+        dict: part ID -> stock
+    """
+    parts = SparePart.objects.filter(created_at__lt=at)
+    if part_ids is not None:
+        parts = parts.filter(id__in=part_ids)
+
+    latest = PartStockSnapshot.objects.filter(
+        part=OuterRef('pk'),
+        snapshot_date__lt=timezone.localdate(at)
+    ).order_by('-snapshot_date')
+    rows = parts.annotate(
+        snapshot_date=Subquery(latest.values('snapshot_date')[:1]),
+        snapshot_stock=Subquery(latest.values('closing_stock')[:1]),
+    ).values_list('id', 'snapshot_date', 'snapshot_stock')
+
+    stock = {}
+    by_boundary = defaultdict(list)
+    unsnapshotted = []
+    for part_id, snapshot_date, snapshot_stock in rows:
+        if snapshot_date is None:
+            unsnapshotted.append(part_id)
+        else:
+            stock[part_id] = snapshot_stock
+            by_boundary[snapshot_date].append(part_id)
+
+    # Snapshots are written for all parts at once, so there is usually a single boundary
+    for snapshot_date, ids in by_boundary.items():
+        deltas = PartTransaction.objects.filter(
+            part_id__in=ids,
+            created_at__gte=day_start(snapshot_date + timedelta(days=1)),
+            created_at__lt=at
+        ).order_by().values('part_id').annotate(delta=Sum(F('stock_after') - F('stock_before')))
+        for row in deltas:
+            stock[row['part_id']] += row['delta']
+
+    if unsnapshotted:
+        stock.update(_ledger_stock(SparePart.objects.filter(id__in=unsnapshotted), at).values_list('id', 'stock_at'))
+    return stock
+
+
+def movement_report(start_date, end_date, part_ids=None):
+    """
+    Get opening stock, movements and closing stock per part for a date range
+
+    Days covered by daily snapshots are summed from the snapshots; every
+    other day of the range, including gaps between snapshots, is
+    aggregated from the ledger.
+
+    Args:
+        start_date: First day of the range
+        end_date: Last day of the range (inclusive)
+        part_ids: Optional list of part IDs
+
+    Returns:
+        list: Dicts per part ordered by part code
+    """
+    start = day_start(start_date)
+    end = day_start(end_date + timedelta(days=1))
+    opening = stock_as_of(start, part_ids)
+
+    daily = PartStockSnapshot.objects.filter(
+        period=SnapshotPeriod.DAILY, snapshot_date__gte=start_date, snapshot_date__lte=end_date
+    )
+    covered = set(daily.order_by().values_list('snapshot_date', flat=True).distinct())
+
+    totals = defaultdict(lambda: {'in_quantity': ZERO, 'out_quantity': ZERO, 'adjust_quantity': ZERO,
+                                  'transaction_count': 0})
+    if covered:
+        if part_ids is not None:
+            daily = daily.filter(part_id__in=part_ids)
+        rows = daily.order_by().values('part_id').annotate(
+            in_qty=Sum('in_quantity'),
+            out_qty=Sum('out_quantity'),
+            adjust_qty=Sum('adjust_quantity'),
+            count=Sum('transaction_count'),
+        )
+        for row in rows:
+            totals[row['part_id']].update(
+                in_quantity=row['in_qty'], out_quantity=row['out_qty'],
+                adjust_quantity=row['adjust_qty'], transaction_count=row['count']
+            )
+
+    # Runs of consecutive days without a snapshot
+    ledger_range = Q(pk__in=[])
+    day = start_date
+    while day <= end_date:
+        if day in covered:
+            day += timedelta(days=1)
+            continue
+        first_day = day
+        while day <= end_date and day not in covered:
+            day += timedelta(days=1)
+        ledger_range |= Q(created_at__gte=day_start(first_day), created_at__lt=day_start(day))
+
+    if len(covered) <= (end_date - start_date).days:
+        for part_id, row in _ledger_movements(ledger_range, part_ids).items():
+            for key, value in row.items():
+                totals[part_id][key] += value
+
+    parts = SparePart.objects.filter(created_at__lt=end)
+    if part_ids is not None:
+        parts = parts.filter(id__in=part_ids)
+
+    report = []
+    for part_id, part_code, name, unit in parts.order_by('part_code').values_list('id', 'part_code', 'name', 'unit'):
+        moved = totals[part_id]
+        opening_stock = opening.get(part_id, ZERO)
+        report.append({
+            'part': part_id,
+            'part_code': part_code,
+            'name': name,
+            'unit': unit,
+            'opening_stock': opening_stock,
+            **moved,
+            'closing_stock': (opening_stock + moved['in_quantity'] - moved['out_quantity']
+                              + moved['adjust_quantity']),
+        })
+    return report
+
+
+def check_ledger_consistency(part_ids=None, chunk_size=5000):
+    """
+    Verify the ledger chain and current stock of spare parts in one streaming pass
+
+    For every part the ledger rows must chain (each stock_before equals the
+    previous stock_after), each row's stock_after must follow from its type
+    and quantity, and the last stock_after must equal current_stock.
+
+    Args:
+        part_ids: Optional list of part IDs to check
+        chunk_size: Number of ledger rows fetched per database round-trip
+
+    Returns:
+        list: Dicts describing each inconsistency found
+    """
+    parts = SparePart.objects.all()
+    ledger = PartTransaction.objects.all()
+    if part_ids is not None:
+        parts = parts.filter(id__in=part_ids)
+        ledger = ledger.filter(part_id__in=part_ids)
+    current = {part_id: (code, stock) for part_id, code, stock in parts.values_list('id', 'part_code', 'current_stock')}
+
+    issues = []
+
+    def report(part_id, kind, expected, actual, transaction_id=None):
+        issues.append({
+            'part': part_id,
+            'part_code': current.get(part_id, (None, None))[0],
+            'kind': kind,
+            'transaction': transaction_id,
+            'expected': expected,
+            'actual': actual,
+        })
+
+    def close(part_id, last_after):
+        if part_id in current and current[part_id][1] != last_after:
+            report(part_id, 'current_stock', last_after, current[part_id][1])
+
+    rows = ledger.order_by('part_id', 'created_at', 'id').values_list(
+        'id', 'part_id', 'transaction_type', 'quantity', 'stock_before', 'stock_after'
+    ).iterator(chunk_size=chunk_size)
+
+    current_part = None
+    last_after = None
+    for txn_id, part_id, transaction_type, quantity, stock_before, stock_after in rows:
+        if part_id != current_part:
+            if current_part is not None:
+                close(current_part, last_after)
+            current_part = part_id
+        elif stock_before != last_after:
+            report(part_id, 'chain', last_after, stock_before, txn_id)
+
+        if transaction_type == TransactionType.IN:
+            expected = stock_before + quantity
+        elif transaction_type == TransactionType.OUT:
+            expected = stock_before - quantity
+        else:
+            expected = quantity
+        if stock_after != expected:
+            report(part_id, 'movement', expected, stock_after, txn_id)
+        last_after = stock_after
+
+    if current_part is not None:
+        close(current_part, last_after)
+    return issues
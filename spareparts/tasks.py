@@ -0,0 +1,72 @@
+"""
+Celery tasks for Spare Parts app
+"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .costing import recalculate_average_costs
+from .reorder import draft_reorder_requests
+from .forecasting import update_demand_forecasts
+from .snapshots import build_stock_snapshots, check_ledger_consistency
+
+logger = logging.getLogger('cmms')
+
+
+@shared_task
+def recalculate_average_costs_task(part_ids=None):
+    """Rebuild spare part average costs from the transaction ledger"""
+    updated = recalculate_average_costs(part_ids)
+    logger.info('Recalculated average cost for %s spare parts', updated)
+    return updated
+
+
+@shared_task
+def draft_reorder_requests_task():
+    """Draft purchase requests for parts at or below their reorder point"""
+    if not settings.CMMS_SETTINGS.get('SPAREPART_LOW_STOCK_ALERT'):
+        return 0
+
+    User = get_user_model()
+    username = settings.CMMS_SETTINGS.get('SPAREPART_REORDER_REQUESTER')
+    if username:
+        requester = User.objects.filter(username=username, is_active=True).first()
+    else:
+        requester = User.objects.filter(role='admin', is_active=True).order_by('id').first()
+    if requester is None:
+        logger.warning('No requester available for automatic purchase requests')
+        return 0
+
+    created = draft_reorder_requests(requester)
+    logger.info('Drafted %s purchase requests for low-stock parts', len(created))
+    return len(created)
+
+
+@shared_task
+def update_demand_forecasts_task():
+    """Recompute spare part demand forecasts from the transaction ledger"""
+    updated = update_demand_forecasts()
+    logger.info('Updated demand forecasts for %s spare parts', updated)
+    return updated
+
+
+@shared_task
+def build_stock_snapshots_task():
+    """Write daily and month-end stock snapshots up to yesterday"""
+    written = build_stock_snapshots()
+    logger.info('Wrote %s daily and %s monthly stock snapshots', written['daily'], written['monthly'])
+    return written
+
+
+@shared_task
+def check_ledger_consistency_task():
+    """Verify spare part stock against the transaction ledger and log any mismatch"""
+    issues = check_ledger_consistency()
+    for issue in issues:
+        logger.warning(
+            'Ledger inconsistency for part %s (%s) at transaction %s: expected %s, found %s',
+            issue['part_code'], issue['kind'], issue['transaction'], issue['expected'], issue['actual']
+        )
+    return len(issues)
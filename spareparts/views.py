@@ -1,28 +1,55 @@
 """
 Views for Spare Parts app
 """
+from datetime import timedelta
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, BasePermission
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
 from django.db import models
+from django.utils.dateparse import parse_date
+
+from users.scoping import SiteScopedMixin
+
+from .models import SparePart, PartTransaction, TransactionType
+from .serializers import (SparePartSerializer, PartTransactionSerializer, PurchaseRequestSerializer,
+                          StockMovementBatchSerializer, PartIdsSerializer)
+from .inventory import apply_movements, StockMovementError
+from .costing import inventory_valuation, recalculate_average_costs
+from .reorder import plan_reorders, draft_reorder_requests
+from . import forecasting
+from . import snapshots
+
 
-from .models import SparePart, PartTransaction
-from .serializers import SparePartSerializer, PartTransactionSerializer
+def _parse_day(value):
+    """Parse a YYYY-MM-DD query parameter; None if missing, malformed or not a real date"""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
 
 
-class SparePartViewSet(viewsets.ModelViewSet):
+class IsAdminOrSupervisor(BasePermission):
+    """
+    自定义权限：只有admin和supervisor可以执行
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
+
+
+class SparePartViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     """ViewSet for SparePart model"""
-    queryset = SparePart.objects.all()
+    queryset = SparePart.objects.select_related('demand_forecast').with_stock_metrics()
     serializer_class = SparePartSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'supplier']
     search_fields = ['part_code', 'name', 'description']
-    ordering_fields = ['part_code', 'name', 'current_stock']
+    ordering_fields = ['part_code', 'name', 'current_stock', 'inventory_value', 'stock_level']
     ordering = ['part_code']
+    OVERVIEW_GROUPS = ['category', 'location', 'supplier', 'lifecycle_status']
 
     def get_queryset(self):
         """Filter queryset based on query parameters"""
@@ -32,71 +59,213 @@ class SparePartViewSet(viewsets.ModelViewSet):
         low_stock = self.request.query_params.get('low_stock')
         if low_stock == 'true':
             queryset = queryset.filter(current_stock__lte=models.F('min_stock'))
-        
+
+        stock_status = self.request.query_params.get('stock_status')
+        if stock_status:
+            queryset = queryset.filter(stock_level=stock_status)
+
+        equipment = self.request.query_params.get('equipment')
+        if equipment:
+            queryset = queryset.compatible_with([equipment])
+
         return queryset
 
+    def _reload(self, spare_part):
+        """Fetch a written part again so its stock metric annotations are current"""
+        return super().get_queryset().get(pk=spare_part.pk)
+
     def perform_create(self, serializer):
         """Set created_by on create"""
         serializer.save(created_by=self.request.user)
 
+    def perform_update(self, serializer):
+        """Log the changed fields on update"""
+        from users.audit import log_changes
+        spare_part = serializer.save()
+        log_changes(self.request.user, spare_part)
+        serializer.instance = self._reload(spare_part)
+
     @action(detail=True, methods=['post'])
     def stock_in(self, request, pk=None):
         """Add stock to spare part"""
-        spare_part = self.get_object()
-        quantity = request.data.get('quantity', 0)
-        
-        if quantity <= 0:
-            return Response(
-                {"error": "Quantity must be greater than 0"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update stock
-        spare_part.current_stock += quantity
-        spare_part.save()
-        
-        # Create transaction record
-        PartTransaction.objects.create(
-            part=spare_part,
-            transaction_type='in',
-            quantity=quantity,
-            reference=request.data.get('reference', ''),
-            notes=request.data.get('notes', ''),
-            created_by=request.user
-        )
-        
-        return Response(SparePartSerializer(spare_part).data)
+        return self._move_stock(request, TransactionType.IN)
 
     @action(detail=True, methods=['post'])
     def stock_out(self, request, pk=None):
         """Remove stock from spare part"""
+        return self._move_stock(request, TransactionType.OUT)
+
+    def _move_stock(self, request, transaction_type):
+        """Apply a single stock movement to the current spare part"""
         spare_part = self.get_object()
-        quantity = request.data.get('quantity', 0)
-        
-        if quantity <= 0:
+        # One-line batch, so the line gets the batch's part and work order checks
+        serializer = StockMovementBatchSerializer(data={'lines': [{
+            **request.data,
+            'part': spare_part.id,
+            'transaction_type': transaction_type,
+        }]})
+        if not serializer.is_valid():
+            errors = serializer.errors['lines']
+            return Response(errors[0] if isinstance(errors, list) else errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            apply_movements(serializer.validated_data['lines'], request.user)
+        except StockMovementError as e:
             return Response(
-                {"error": "Quantity must be greater than 0"},
+                {"error": e.errors[0]['error']},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        if spare_part.current_stock < quantity:
+
+        return Response(SparePartSerializer(self._reload(spare_part)).data)
+
+    @action(detail=False, methods=['post'])
+    def batch_movements(self, request):
+        """
+        Apply many stock movements (goods receipt, kitting) in one transaction
+
+        All lines are validated before anything is written; the batch either
+        applies completely or not at all.
+        """
+        serializer = StockMovementBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            transactions = apply_movements(serializer.validated_data['lines'], request.user)
+        except StockMovementError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        parts = {}
+        for txn in transactions:
+            parts[txn.part.id] = {
+                'id': txn.part.id,
+                'part_code': txn.part.part_code,
+                'current_stock': txn.part.current_stock,
+            }
+
+        return Response({
+            "count": len(transactions),
+            "transactions": PartTransactionSerializer(transactions, many=True).data,
+            "parts": list(parts.values()),
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """Get inventory valuation totals for the filtered parts"""
+        return Response(inventory_valuation(self.filter_queryset(self.get_queryset())))
+
+    @action(detail=False, methods=['get'])
+    def stock_overview(self, request):
+        """
+        Get stock counts and inventory value grouped by category or location
+
+        Query params:
+            group_by: category (default), location, supplier or lifecycle_status
+        """
+        group_by = request.query_params.get('group_by', 'category')
+        if group_by not in self.OVERVIEW_GROUPS:
             return Response(
-                {"error": "Insufficient stock"},
+                {"error": f"group_by must be one of: {', '.join(self.OVERVIEW_GROUPS)}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Update stock
-        spare_part.current_stock -= quantity
-        spare_part.save()
-        
-        # Create transaction record
-        PartTransaction.objects.create(
-            part=spare_part,
-            transaction_type='out',
-            quantity=quantity,
-            reference=request.data.get('reference', ''),
-            notes=request.data.get('notes', ''),
-            created_by=request.user
-        )
-        
-        return Response(SparePartSerializer(spare_part).data)
+
+        groups = list(self.filter_queryset(self.get_queryset()).stock_overview(group_by))
+        totals = {
+            key: sum((group[key] or 0) for group in groups)
+            for key in ['part_count', 'total_quantity', 'total_value', 'critical_count', 'warning_count']
+        }
+        return Response({"group_by": group_by, "groups": groups, "totals": totals})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrSupervisor])
+    def recalculate_costs(self, request):
+        """Rebuild average costs from the transaction ledger"""
+        serializer = PartIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        updated = recalculate_average_costs(serializer.validated_data.get('part_ids'))
+        return Response({"message": "Average costs recalculated", "updated": updated})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrSupervisor])
+    def draft_reorders(self, request):
+        """
+        Draft purchase requests for all parts at or below their reorder point
+
+        Pass dry_run=true to preview the quantities without creating anything.
+        """
+        if str(request.data.get('dry_run', '')).lower() == 'true':
+            plans = plan_reorders()
+            return Response({
+                "count": len(plans),
+                "results": [{
+                    'part': plan['part'].id,
+                    'part_code': plan['part'].part_code,
+                    'current_stock': plan['part'].current_stock,
+                    'quantity': plan['quantity'],
+                    'urgency': plan['urgency'],
+                    'daily_rate': plan['daily_rate'],
+                } for plan in plans]
+            })
+
+        created = draft_reorder_requests(request.user)
+        return Response({
+            "count": len(created),
+            "results": PurchaseRequestSerializer(created, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrSupervisor])
+    def apply_forecasts(self, request):
+        """Adopt the proposed safety stock and reorder point as the parts' stock levels"""
+        serializer = PartIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        updated = forecasting.apply_forecasts(serializer.validated_data.get('part_ids'))
+        return Response({"message": "Forecast stock levels applied", "updated": updated})
+
+    @action(detail=False, methods=['get'])
+    def stock_as_of(self, request):
+        """
+        Get the stock of the filtered parts at the end of a past day
+
+        Query params:
+            date: Day in YYYY-MM-DD format
+        """
+        day = _parse_day(request.query_params.get('date', ''))
+        if day is None:
+            return Response({"error": "date is required (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        parts = self.filter_queryset(self.get_queryset()).values_list('id', 'part_code', 'name')
+        stock = snapshots.stock_as_of(snapshots.day_start(day + timedelta(days=1)), [p[0] for p in parts])
+        return Response({
+            "date": day,
+            "results": [
+                {'part': part_id, 'part_code': code, 'name': name, 'stock': stock[part_id]}
+                for part_id, code, name in parts if part_id in stock
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def movement_report(self, request):
+        """
+        Get opening stock, in/out/adjust movements and closing stock per part
+
+        Query params:
+            start: First day in YYYY-MM-DD format
+            end: Last day in YYYY-MM-DD format (inclusive)
+        """
+        start = _parse_day(request.query_params.get('start', ''))
+        end = _parse_day(request.query_params.get('end', ''))
+        if start is None or end is None or start > end:
+            return Response(
+                {"error": "start and end are required (YYYY-MM-DD) and start must not be after end"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        part_ids = list(self.filter_queryset(self.get_queryset()).values_list('id', flat=True))
+        report = snapshots.movement_report(start, end, part_ids)
+        return Response({"start": start, "end": end, "count": len(report), "results": report})
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminOrSupervisor])
+    def ledger_check(self, request):
+        """Verify current stock against the transaction ledger"""
+        issues = snapshots.check_ledger_consistency()
+        return Response({"consistent": not issues, "count": len(issues), "issues": issues})
@@ -217,6 +217,13 @@ class API {
         return this.get(`/assets/${id}/`);
     }
 
+    /**
+     * 获取设备适用的备件（含实时库存）
+     */
+    static async getCompatibleParts(assetId, params = {}) {
+        return this.get(`/assets/${assetId}/compatible_parts/`, params);
+    }
+
     /**
      * 创建设备
      */
@@ -581,6 +588,13 @@ class API {
         return this.delete(`/spareparts/${id}/`);
     }
 
+    /**
+     * 获取库存概览（按分组统计数量、金额和低库存数）
+     */
+    static async getStockOverview(params = {}) {
+        return this.get('/spareparts/stock_overview/', params);
+    }
+
     /**
      * 备件入库
      */
@@ -623,6 +637,31 @@ class API {
     static async getSparePartUsageReport(params = {}) {
         return this.get('/reports/spareparts-usage/', params);
     }
+
+    /**
+     * 申请生成报表（后台生成，完成后下载）
+     */
+    static async requestReport(reportType, parameters = {}, outputFormat = 'xlsx') {
+        return this.post('/reports/runs/', {
+            report_type: reportType,
+            parameters,
+            output_format: outputFormat
+        });
+    }
+
+    /**
+     * 获取报表生成记录
+     */
+    static async getReportRuns(params = {}) {
+        return this.get('/reports/runs/', params);
+    }
+
+    /**
+     * 获取单个报表生成记录
+     */
+    static async getReportRun(runId) {
+        return this.get(`/reports/runs/${runId}/`);
+    }
 }
 
 // 导出
@@ -132,7 +132,7 @@ async function loadDashboard() {
         const [assetsRes, workOrdersRes, partsRes] = await Promise.all([
             API.getAssets({ page_size: 1, status: 'active' }),
             API.getWorkOrders({ page_size: 1 }),
-            API.getSpareParts({ page_size: 100, low_stock: 'true' })
+            API.getStockOverview()
         ]);
 
         // 更新统计卡片
@@ -144,7 +144,7 @@ async function loadDashboard() {
         const pendingWO = workOrdersRes.results?.filter(w => w.status === 'open').length || 0;
         document.getElementById('statPendingWorkOrders').textContent = pendingWO;
 
-        const lowStock = partsRes.results?.filter(p => p.current_stock <= p.min_stock).length || 0;
+        const lowStock = partsRes.totals?.critical_count || 0;
         document.getElementById('statLowStockParts').textContent = lowStock;
 
         // 加载最近工单
@@ -0,0 +1,25 @@
+"""
+Django Admin configuration for Sync app
+"""
+from django.contrib import admin
+from .models import SyncReceipt, SyncTombstone
+
+
+@admin.register(SyncReceipt)
+class SyncReceiptAdmin(admin.ModelAdmin):
+    """Admin interface for SyncReceipt model"""
+    list_display = ['user', 'key', 'device_id', 'operation_type', 'status', 'created_at']
+    list_filter = ['operation_type', 'status', 'created_at']
+    search_fields = ['user__username', 'key', 'device_id']
+    ordering = ['-created_at']
+    readonly_fields = ['user', 'key', 'device_id', 'operation_type', 'status', 'result', 'created_at']
+
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    """Admin interface for SyncTombstone model"""
+    list_display = ['entity', 'object_id', 'deleted_at']
+    list_filter = ['entity', 'deleted_at']
+    search_fields = ['object_id']
+    ordering = ['-deleted_at']
+    readonly_fields = ['entity', 'object_id', 'deleted_at']
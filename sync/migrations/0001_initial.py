@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncReceipt',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(help_text='Client-generated key, unique per user', max_length=64, verbose_name='Idempotency Key')),
+                ('device_id', models.CharField(blank=True, default='', max_length=100, verbose_name='Device ID')),
+                ('operation_type', models.CharField(max_length=50, verbose_name='Operation Type')),
+                ('status', models.CharField(choices=[('applied', 'Applied'), ('conflict', 'Conflict'), ('rejected', 'Rejected')], max_length=20, verbose_name='Status')),
+                ('result', models.JSONField(blank=True, default=dict, help_text='Response returned for the operation', verbose_name='Result')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created At')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_receipts', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Sync Receipt',
+                'verbose_name_plural': 'Sync Receipts',
+                'db_table': 'sync_receipts',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='uniq_sync_receipt_user_key')],
+            },
+        ),
+    ]
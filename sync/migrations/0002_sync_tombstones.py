@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(help_text='Sync entity name, e.g. work_orders', max_length=30, verbose_name='Entity')),
+                ('object_id', models.BigIntegerField(verbose_name='Object ID')),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Deleted At')),
+            ],
+            options={
+                'verbose_name': 'Sync Tombstone',
+                'verbose_name_plural': 'Sync Tombstones',
+                'db_table': 'sync_tombstones',
+                'ordering': ['-deleted_at'],
+            },
+        ),
+    ]
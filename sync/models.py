@@ -0,0 +1,110 @@
+"""
+Sync models for CMMS
+Idempotency receipts for operations pushed by offline clients, and tombstones of deleted records
+"""
+from django.db import models
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class SyncOperationStatus(models.TextChoices):
+    """Outcome of a pushed operation"""
+    APPLIED = 'applied', 'Applied'
+    CONFLICT = 'conflict', 'Conflict'
+    REJECTED = 'rejected', 'Rejected'
+
+
+class SyncReceipt(models.Model):
+    """
+    Sync Receipt - remembers the outcome of each pushed operation
+    A client retrying a push with the same idempotency key gets the stored
+    outcome back instead of the operation being applied twice
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='sync_receipts',
+        verbose_name='User'
+    )
+    key = models.CharField(
+        max_length=64,
+        verbose_name='Idempotency Key',
+        help_text='Client-generated key, unique per user'
+    )
+    device_id = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Device ID'
+    )
+    operation_type = models.CharField(
+        max_length=50,
+        verbose_name='Operation Type'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=SyncOperationStatus.choices,
+        verbose_name='Status'
+    )
+    result = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Result',
+        help_text='Response returned for the operation'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At',
+        db_index=True
+    )
+
+    class Meta:
+        db_table = 'sync_receipts'
+        verbose_name = 'Sync Receipt'
+        verbose_name_plural = 'Sync Receipts'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='uniq_sync_receipt_user_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key} - {self.status}"
+
+
+class SyncTombstone(models.Model):
+    """
+    Sync Tombstone - a record deleted, or moved out of some users' scope
+    (reassigned, moved to another site), that offline clients may still hold
+    Pulls report tombstones written since the previous pull, unless the
+    record is still in the puller's scope, so clients can drop the record;
+    they are purged after SYNC_TOMBSTONE_DAYS
+    """
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(
+        max_length=30,
+        verbose_name='Entity',
+        help_text='Sync entity name, e.g. work_orders'
+    )
+    object_id = models.BigIntegerField(verbose_name='Object ID')
+    deleted_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Deleted At',
+        db_index=True
+    )
+
+    class Meta:
+        db_table = 'sync_tombstones'
+        verbose_name = 'Sync Tombstone'
+        verbose_name_plural = 'Sync Tombstones'
+        ordering = ['-deleted_at']
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id}"
+
+    @classmethod
+    def record(cls, entity, object_ids):
+        """Write tombstones for deleted or moved records of an entity"""
+        cls.objects.bulk_create([cls(entity=entity, object_id=object_id) for object_id in object_ids])
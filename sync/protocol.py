@@ -0,0 +1,358 @@
+"""
+Delta sync protocol for offline clients
+Pull changed records since a change token and push queued operations idempotently
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from assets.models import Asset, AssetStatus
+from inspections.models import InspectionRecord, InspectionRoute, InspectionTemplate
+from users.scoping import scope_queryset, user_sites
+from workorders.models import WorkOrder, WorkOrderStatus
+from workorders.transitions import TransitionError, start_work_order, complete_work_order
+
+from .models import SyncReceipt, SyncOperationStatus, SyncTombstone
+
+TOKEN_SALT = 'cmms.sync'
+
+CLOSED_STATUSES = [WorkOrderStatus.CLOSED, WorkOrderStatus.CANCELED]
+
+
+class InvalidToken(Exception):
+    """Raised when a change token cannot be used by the caller"""
+
+
+def _work_orders(user, initial):
+    queryset = scope_queryset(WorkOrder.objects.all(), user)
+    if not user.is_supervisor:
+        queryset = queryset.filter(Q(assignee=user) | Q(requested_by=user))
+    if initial:
+        queryset = queryset.exclude(status__in=CLOSED_STATUSES)
+    return queryset
+
+
+def _routes(user, initial):
+    queryset = InspectionRoute.objects.all()
+    if not user.is_supervisor:
+        queryset = queryset.filter(Q(inspector=user) | Q(inspector__isnull=True))
+    if initial:
+        queryset = queryset.filter(is_active=True)
+    return queryset
+
+
+def _templates(user, initial):
+    queryset = InspectionTemplate.objects.all()
+    if initial:
+        queryset = queryset.filter(is_active=True)
+    return queryset
+
+
+def _assets(user, initial):
+    queryset = scope_queryset(Asset.objects.all(), user)
+    if initial:
+        queryset = queryset.exclude(status=AssetStatus.RETIRED)
+    return queryset
+
+
+# Entity name -> (scoped queryset, fields sent to clients)
+ENTITIES = {
+    'work_orders': (_work_orders, [
+        'id', 'wo_code', 'equipment_id', 'wo_type', 'status', 'summary', 'description', 'priority',
+        'assignee_id', 'planned_start', 'planned_end', 'actual_start', 'actual_end', 'checklist',
+        'actions_taken', 'root_cause', 'downtime_minutes', 'labor_hours', 'notes', 'updated_at',
+    ]),
+    'routes': (_routes, [
+        'id', 'code', 'name', 'description', 'route_items', 'estimated_duration_minutes',
+        'inspector_id', 'is_active', 'updated_at',
+    ]),
+    'templates': (_templates, [
+        'id', 'code', 'name', 'items_template', 'equipment_type', 'frequency_days', 'is_active', 'updated_at',
+    ]),
+    'assets': (_assets, [
+        'id', 'code', 'name', 'parent_id', 'location_path', 'factory', 'workshop', 'line', 'station',
+        'status', 'criticality', 'meter_unit', 'updated_at',
+    ]),
+}
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _scope_key(user):
+    """What decides the records a user syncs: role and sites"""
+    sites = user_sites(user)
+    return [user.role, [list(site) for site in sites] if sites is not None else None]
+
+
+def make_token(user, cursors, removed_since, initial=()):
+    """Sign the per-entity cursors, the tombstone high-water mark and the entities still in their first sync"""
+    return signing.dumps({
+        'u': user.id, 's': _scope_key(user), 'c': cursors, 'd': removed_since.isoformat(), 'i': sorted(initial),
+    }, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(user, token):
+    """
+    Get the per-entity cursors, tombstone high-water mark and entities still in their first sync from a change token
+
+    A token issued before the user's role or sites changed, or older than
+    the tombstone retention, cannot tell the client what to drop; the
+    client has to start over with a full sync.
+
+    Raises:
+        InvalidToken: If the token is tampered with, belongs to another
+            user or can no longer be used
+    """
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid change token; start a full sync')
+    if data.get('u') != user.id:
+        raise InvalidToken('Change token belongs to another user; start a full sync')
+    if data.get('s') != _scope_key(user):
+        raise InvalidToken('Your role or sites changed; start a full sync')
+    removed_since = parse_datetime(data.get('d') or '')
+    retention = timedelta(days=_setting('SYNC_TOMBSTONE_DAYS', 30))
+    if removed_since is None or removed_since < timezone.now() - retention:
+        raise InvalidToken('Change token expired; start a full sync')
+    return data.get('c', {}), removed_since, set(data.get('i', []))
+
+
+def pull(user, token=None):
+    """
+    Get records changed or removed since a change token
+
+    Each entity is paged over the user's scope with a keyset cursor on
+    (updated_at, id), so no change is skipped or sent twice. Rows changed
+    in the last few seconds are left for the next pull, giving in-flight
+    transactions time to commit before the cursor moves past them. Until
+    an entity's first sync has sent its last page only active records
+    are sent.
+
+    Records deleted or moved out of someone's scope (reassigned, moved to
+    another site) since the previous pull are listed as removed, unless
+    they are in the user's scope. Clients drop removed IDs they hold and
+    ignore the others.
+
+    Args:
+        user: User pulling
+        token: Change token from the previous pull
+
+    Returns:
+        dict: Changed rows and removed IDs per entity, the next token and has_more
+
+    Raises:
+        InvalidToken: If the token cannot be used
+    """
+    cursors, removed_since, initial = read_token(user, token) if token else ({}, None, set(ENTITIES))
+    page_size = _setting('SYNC_PAGE_SIZE', 500)
+    settled = timezone.now() - timedelta(seconds=_setting('SYNC_SETTLE_SECONDS', 5))
+
+    tombstones = {name: set() for name in ENTITIES}
+    if removed_since is not None:
+        for entity, object_id in SyncTombstone.objects.filter(
+            deleted_at__gt=removed_since, deleted_at__lte=settled, entity__in=list(ENTITIES)
+        ).values_list('entity', 'object_id'):
+            tombstones[entity].add(object_id)
+
+    changes = {}
+    removed = {}
+    has_more = False
+    for name, (scope, fields) in ENTITIES.items():
+        page = scope(user, name in initial).filter(updated_at__lte=settled)
+        cursor = cursors.get(name)
+        if cursor:
+            since = parse_datetime(cursor[0])
+            page = page.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=cursor[1]))
+        rows = list(page.order_by('updated_at', 'id').values(*fields)[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            has_more = True
+        else:
+            initial.discard(name)
+        if rows:
+            cursors[name] = [rows[-1]['updated_at'].isoformat(), rows[-1]['id']]
+        changes[name] = rows
+
+        gone = tombstones[name]
+        if gone:
+            gone -= set(scope(user, False).filter(id__in=gone).values_list('id', flat=True))
+        removed[name] = sorted(gone)
+
+    return {
+        'changes': changes,
+        'removed': removed,
+        'token': make_token(user, cursors, settled, initial),
+        'has_more': has_more,
+    }
+
+
+def _jsonable(value):
+    """Round-trip a result through JSON so the stored receipt matches the response"""
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def _work_order_state(work_order):
+    return {
+        'id': work_order.id,
+        'status': work_order.status,
+        'assignee_id': work_order.assignee_id,
+        'updated_at': work_order.updated_at,
+    }
+
+
+def _occurred_at(payload):
+    """When a queued operation happened on the device; None if missing, naive or in the future"""
+    try:
+        at = parse_datetime(payload['occurred_at']) if payload.get('occurred_at') else None
+    except (TypeError, ValueError):
+        return None
+    if at is None or timezone.is_naive(at) or at > timezone.now():
+        return None
+    return at
+
+
+def _apply_transition(operation, work_orders, user):
+    """Apply one work order transition; returns (status, result)"""
+    payload = operation['payload']
+    work_order = work_orders.get(payload.get('work_order'))
+    if work_order is None:
+        return SyncOperationStatus.REJECTED, {'errors': {'work_order': 'Work order not found'}}
+    if not user.is_supervisor and work_order.assignee_id != user.id:
+        return SyncOperationStatus.REJECTED, {'errors': {'work_order': 'Work order is not assigned to you'}}
+
+    at = _occurred_at(payload)
+    try:
+        with transaction.atomic():
+            if operation['type'] == 'work_order_start':
+                start_work_order(work_order, user, at)
+            else:
+                complete_work_order(work_order, user, payload.get('fields') or {}, at)
+    except TransitionError as e:
+        work_order.refresh_from_db()
+        return SyncOperationStatus.CONFLICT, {'error': str(e), 'server': _work_order_state(work_order)}
+    return SyncOperationStatus.APPLIED, {'work_order': _work_order_state(work_order)}
+
+
+def _apply_inspections(operations, user):
+    """Validate and bulk-insert pushed inspections; returns {key: (status, result)}"""
+    from inspections.rounds import save_inspections
+    from inspections.serializers import InspectionRecordSerializer
+
+    outcomes = {}
+    pending = []
+    for operation in operations:
+        serializer = InspectionRecordSerializer(data=operation['payload'])
+        if serializer.is_valid():
+            record = InspectionRecord(inspector=user, **serializer.validated_data)
+            pending.append((operation['key'], record, _occurred_at(operation['payload'])))
+        else:
+            outcomes[operation['key']] = (SyncOperationStatus.REJECTED, {'errors': serializer.errors})
+
+    if pending:
+        records = save_inspections([record for _, record, _ in pending], user, [at for _, _, at in pending])
+        for (key, _, _), record in zip(pending, records):
+            outcomes[key] = (SyncOperationStatus.APPLIED, {
+                'id': record.id,
+                'result': record.result,
+                'triggered_work_order': record.triggered_work_order_id,
+            })
+    return outcomes
+
+
+def push(user, operations, device_id=''):
+    """
+    Apply operations queued by an offline client
+
+    Operations whose key was seen before return the stored outcome and are
+    not applied again. Inspections are inserted in bulk; work order
+    transitions are applied in order, and a transition the work order can no
+    longer make is reported as a conflict with the server's current state.
+    Pushes of the same user are serialised so a retry racing the original
+    cannot apply twice.
+
+    Args:
+        user: User pushing
+        operations: Validated dicts with key, type and payload
+        device_id: Optional client device identifier
+
+    Returns:
+        list: Outcome per operation in input order
+    """
+    User = get_user_model()
+    keys = [operation['key'] for operation in operations]
+
+    with transaction.atomic():
+        User.objects.select_for_update().filter(pk=user.pk).first()
+        receipts = {
+            receipt.key: receipt
+            for receipt in SyncReceipt.objects.filter(user=user, key__in=keys)
+        }
+
+        fresh = []
+        seen = set(receipts)
+        for operation in operations:
+            if operation['key'] not in seen:
+                fresh.append(operation)
+                seen.add(operation['key'])
+
+        outcomes = _apply_inspections([op for op in fresh if op['type'] == 'inspection'], user)
+
+        transitions = [op for op in fresh if op['type'] != 'inspection']
+        work_order_ids = {op['payload'].get('work_order') for op in transitions}
+        work_orders = WorkOrder.objects.select_for_update().in_bulk(
+            [wo_id for wo_id in work_order_ids if isinstance(wo_id, int)]
+        )
+        for operation in transitions:
+            outcomes[operation['key']] = _apply_transition(operation, work_orders, user)
+
+        new_receipts = [
+            SyncReceipt(
+                user=user,
+                key=operation['key'],
+                device_id=device_id,
+                operation_type=operation['type'],
+                status=outcomes[operation['key']][0],
+                result=_jsonable(outcomes[operation['key']][1]),
+            )
+            for operation in fresh
+        ]
+        SyncReceipt.objects.bulk_create(new_receipts)
+
+    stored = {receipt.key: receipt for receipt in new_receipts}
+    results = []
+    returned = set()
+    for operation in operations:
+        key = operation['key']
+        if key in receipts or key in returned:
+            receipt = receipts.get(key) or stored[key]
+            results.append({'key': key, 'status': receipt.status, 'duplicate': True, **receipt.result})
+        else:
+            receipt = stored[key]
+            results.append({'key': key, 'status': receipt.status, **receipt.result})
+            returned.add(key)
+    return results
+
+
+def purge_tombstones(now=None):
+    """
+    Delete tombstones older than SYNC_TOMBSTONE_DAYS
+
+    Change tokens that old are refused, so no client still needs them.
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=_setting('SYNC_TOMBSTONE_DAYS', 30))
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
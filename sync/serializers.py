@@ -0,0 +1,25 @@
+"""
+Serializers for Sync app
+"""
+from rest_framework import serializers
+
+
+class SyncOperationSerializer(serializers.Serializer):
+    """Serializer for one operation queued by an offline client"""
+    TYPES = ['inspection', 'work_order_start', 'work_order_complete']
+
+    key = serializers.CharField(max_length=64)
+    type = serializers.ChoiceField(choices=TYPES)
+    payload = serializers.DictField()
+
+    def validate(self, attrs):
+        """Require the work order ID on transitions"""
+        if attrs['type'] != 'inspection' and not isinstance(attrs['payload'].get('work_order'), int):
+            raise serializers.ValidationError({"payload": "work_order (integer ID) is required"})
+        return attrs
+
+
+class SyncPushSerializer(serializers.Serializer):
+    """Serializer for a batch of queued operations"""
+    device_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    operations = SyncOperationSerializer(many=True, allow_empty=False, max_length=200)
@@ -0,0 +1,12 @@
+"""
+Celery tasks for Sync app
+"""
+from celery import shared_task
+
+from .protocol import purge_tombstones
+
+
+@shared_task
+def purge_sync_tombstones_task():
+    """Delete tombstones no change token can still ask for"""
+    return purge_tombstones()
@@ -0,0 +1,45 @@
+"""
+Views for Sync app
+"""
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from .protocol import pull, push, InvalidToken
+from .serializers import SyncPushSerializer
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync for offline handheld clients
+
+    pull: GET ?token=<change token>; omit the token for a full sync
+    push: POST {device_id, operations: [{key, type, payload}]}
+    """
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    def pull(self, request):
+        """Get records changed since the client's change token"""
+        try:
+            data = pull(request.user, request.query_params.get('token') or None)
+        except InvalidToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def push(self, request):
+        """Apply operations queued while offline"""
+        serializer = SyncPushSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = push(
+            request.user,
+            serializer.validated_data['operations'],
+            serializer.validated_data['device_id']
+        )
+        summary = {
+            outcome: sum(1 for result in results if result['status'] == outcome and not result.get('duplicate'))
+            for outcome in ['applied', 'conflict', 'rejected']
+        }
+        return Response({'results': results, **summary})
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+字段变更追踪性能基准
+
+Compares loading and saving work orders with TrackedFieldsMixin active
+and with it switched off, on a throwaway test database.
+
+    python tests/benchmarks/bench_field_tracking.py [rows] [repeat]
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cmms_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from assets.models import Asset  # noqa: E402
+from users.models import User  # noqa: E402
+from users.tracking import TrackedFieldsMixin  # noqa: E402
+from workorders.models import WorkOrder  # noqa: E402
+
+
+@contextmanager
+def untracked():
+    """Turn the mixin into a no-op to measure the baseline"""
+    snapshot, changes = TrackedFieldsMixin._take_snapshot, TrackedFieldsMixin.tracked_changes
+    TrackedFieldsMixin._take_snapshot = lambda self, names=None: None
+    TrackedFieldsMixin.tracked_changes = lambda self: {}
+    try:
+        yield
+    finally:
+        TrackedFieldsMixin._take_snapshot, TrackedFieldsMixin.tracked_changes = snapshot, changes
+
+
+def seed(rows):
+    user = User.objects.create_user(username='bench', password='bench', role='admin')
+    asset = Asset.objects.create(code='BENCH-001', name='Bench', factory='F', workshop='W', line='L',
+                                 created_by=user)
+    codes = WorkOrder.generate_codes(rows)
+    WorkOrder.objects.bulk_create([
+        WorkOrder(wo_code=code, equipment=asset, summary='Bench', requested_by=user) for code in codes
+    ])
+
+
+def load():
+    return list(WorkOrder.objects.all())
+
+
+def save_all():
+    with transaction.atomic():
+        for work_order in WorkOrder.objects.all():
+            work_order.labor_hours = (work_order.labor_hours or Decimal('0')) + 1
+            work_order.save(update_fields=['labor_hours'])
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(rows=2000, repeat=5):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(rows)
+        print(f'{rows} work orders, best of {repeat}')
+        print(f'{"case":<16}{"untracked ms":>14}{"tracked ms":>12}{"overhead":>10}')
+        for name, func in [('load', load), ('save one by one', save_all)]:
+            with untracked():
+                baseline = best_of(func, repeat)
+            tracked = best_of(func, repeat)
+            print(f'{name:<16}{baseline * 1000:>14.1f}{tracked * 1000:>12.1f}'
+                  f'{(tracked / baseline - 1) * 100:>9.1f}%')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -91,3 +91,49 @@ def work_order(db, asset, admin_user):
         priority='medium',
         requested_by=admin_user
     )
+
+
+@pytest.fixture
+def spare_part(db, admin_user):
+    """Create test spare part fixture"""
+    from spareparts.models import SparePart
+    return SparePart.objects.create(
+        part_code='SP-001',
+        name='Bearing 6204',
+        category='Bearings',
+        unit='pcs',
+        current_stock=10,
+        min_stock=2,
+        safety_stock=4,
+        unit_cost=25,
+        location='WH-A',
+        created_by=admin_user
+    )
+
+
+@pytest.fixture
+def inspection_template(db):
+    """Create test inspection template fixture"""
+    from inspections.models import InspectionTemplate
+    return InspectionTemplate.objects.create(
+        code='IT-001',
+        name='Motor check',
+        items_template=[
+            {'item': 'Temperature', 'unit': 'C', 'threshold': 80, 'min': 0, 'max': 100},
+            {'item': 'Vibration', 'unit': 'mm/s', 'threshold': 4.5, 'max': 7.1},
+            {'item': 'Noise'},
+        ],
+        frequency_days=7
+    )
+
+
+@pytest.fixture
+def inspection_route(db, asset, inspection_template, technician_user):
+    """Create test inspection route fixture"""
+    from inspections.models import InspectionRoute
+    return InspectionRoute.objects.create(
+        code='RT-001',
+        name='Line 1 round',
+        route_items=[{'sequence': 1, 'equipment_id': asset.id, 'template_id': inspection_template.id}],
+        inspector=technician_user
+    )
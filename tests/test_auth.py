@@ -109,3 +109,323 @@ class TestUserManagement:
         response = authenticated_client.patch(url, data, format='json')
         # Should fail because technician is not admin
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAuditPipeline:
+    """Test buffered audit logging"""
+
+    def _inserts(self, queries):
+        return [q for q in queries if q['sql'].startswith('INSERT INTO "audit_logs"')]
+
+    def test_buffer_writes_one_batch(self, admin_user):
+        """Test that entries of a buffer are written with one insert"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from users.audit import audit_buffer
+        from users.models import AuditLog
+
+        with CaptureQueriesContext(connection) as captured:
+            with audit_buffer():
+                for entity_id in range(3):
+                    AuditLog.log(admin_user, 'update', 'Asset', entity_id)
+                assert AuditLog.objects.count() == 0
+        assert AuditLog.objects.count() == 3
+        assert len(self._inserts(captured.captured_queries)) == 1
+
+    def test_rolled_back_entries_dropped(self, admin_user):
+        """Test that entries of a rolled back transaction are not written"""
+        from django.db import transaction
+        from users.audit import audit_buffer
+        from users.models import AuditLog
+
+        with audit_buffer():
+            AuditLog.log(admin_user, 'create', 'Asset', 1)
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    AuditLog.log(admin_user, 'delete', 'Asset', 1)
+                    raise RuntimeError
+        assert list(AuditLog.objects.values_list('action', flat=True)) == ['create']
+
+    def test_request_is_audited(self, api_client):
+        """Test that registration is logged through the request buffer"""
+        from users.models import AuditLog
+        data = {'username': 'newuser', 'password': 'testpass123', 'password_confirm': 'testpass123',
+                'email': 'new@test.com', 'full_name': 'New User'}
+        response = api_client.post('/api/auth/users/register/', data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        entry = AuditLog.objects.get(entity_type='User')
+        assert entry.actor.username == 'newuser'
+
+    def test_queue_mode(self, admin_user, settings, monkeypatch):
+        """Test that batches go to the worker, and are written inline if it cannot be reached"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from users.audit import audit_buffer
+        from users.models import AuditLog
+        from users.tasks import write_audit_entries_task
+
+        settings.CMMS_SETTINGS = {**settings.CMMS_SETTINGS, 'AUDIT_LOG_ASYNC': True}
+        queued = []
+        monkeypatch.setattr(write_audit_entries_task, 'delay', queued.append)
+        with audit_buffer():
+            entry = AuditLog.log(admin_user, 'assign', 'WorkOrder', 7)
+        assert AuditLog.objects.count() == 0
+        write_audit_entries_task(queued[0])
+        written = AuditLog.objects.get()
+        assert abs(written.created_at - entry['created_at']) < timedelta(milliseconds=1)
+        assert written.created_at < timezone.now()
+
+        def unreachable(payload):
+            raise ConnectionError('broker down')
+        monkeypatch.setattr(write_audit_entries_task, 'delay', unreachable)
+        with audit_buffer():
+            AuditLog.log(admin_user, 'close', 'WorkOrder', 7)
+        assert AuditLog.objects.count() == 2
+
+
+@pytest.mark.django_db
+class TestFieldTracking:
+    """Test field change tracking feeding the audit log"""
+
+    def test_changes_since_load(self, work_order, technician_user, django_assert_num_queries):
+        """Test that saves report the tracked fields that changed"""
+        from workorders.models import WorkOrder
+        with django_assert_num_queries(1):
+            loaded = WorkOrder.objects.get(pk=work_order.pk)
+        loaded.priority = 'high'
+        loaded.assignee = technician_user
+        loaded.notes = 'not tracked'
+        loaded.save()
+        assert loaded.last_changes == {'priority': ['medium', 'high'], 'assignee': [None, technician_user.id]}
+
+        loaded.labor_hours = 2
+        loaded.save(update_fields=['labor_hours'])
+        assert loaded.last_changes == {'labor_hours': ['0.00', 2]}
+        loaded.save()
+        assert loaded.last_changes == {}
+
+    def test_deferred_fields_untracked(self, work_order):
+        """Test that fields not loaded are not tracked"""
+        from workorders.models import WorkOrder
+        loaded = WorkOrder.objects.only('id', 'status').get(pk=work_order.pk)
+        loaded.summary = 'Changed'
+        loaded.status = 'assigned'
+        loaded.save(update_fields=['summary', 'status'])
+        assert loaded.last_changes == {'status': ['open', 'assigned']}
+
+    def test_update_is_audited(self, authenticated_client, asset, django_capture_on_commit_callbacks):
+        """Test that an API update logs its diff"""
+        from users.models import AuditLog
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.patch(f'/api/assets/{asset.id}/', {'cost_center': 'CC-9'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        entry = AuditLog.objects.get(entity_type='Asset')
+        assert (entry.action, entry.diff) == ('update', {'cost_center': [None, 'CC-9']})
+
+
+@pytest.mark.django_db
+class TestAuditArchive:
+    """Test audit log archival and history across live and archived entries"""
+
+    @pytest.fixture
+    def archive_dir(self, settings, tmp_path):
+        settings.CMMS_SETTINGS = {**settings.CMMS_SETTINGS, 'AUDIT_ARCHIVE_DIR': str(tmp_path)}
+        return tmp_path
+
+    @pytest.fixture
+    def entries(self, admin_user, technician_user):
+        from datetime import timedelta
+        from django.utils import timezone
+        from users.models import AuditLog
+        now = timezone.now()
+        old = [
+            AuditLog.objects.create(actor=admin_user, action='create', entity_type='WorkOrder', entity_id=1,
+                                    diff={'status': [None, 'open']}, created_at=now - timedelta(days=400)),
+            AuditLog.objects.create(actor=technician_user, action='update', entity_type='WorkOrder', entity_id=1,
+                                    created_at=now - timedelta(days=399)),
+            AuditLog.objects.create(actor=admin_user, action='create', entity_type='Asset', entity_id=1,
+                                    created_at=now - timedelta(days=300)),
+        ]
+        recent = AuditLog.objects.create(actor=admin_user, action='close', entity_type='WorkOrder', entity_id=1)
+        return old, recent
+
+    def test_archive_old_months(self, archive_dir, entries):
+        """Test that months past retention move to compressed archive files"""
+        import gzip
+        import json
+        from users.archive import archive_audit_logs
+        from users.models import AuditLog, AuditArchiveEntity
+
+        archives = archive_audit_logs()
+        assert sum(archive.entries for archive in archives) == 3
+        assert list(AuditLog.objects.values_list('action', flat=True)) == ['close']
+        assert AuditArchiveEntity.objects.filter(entity_type='WorkOrder', entity_id=1).count() >= 1
+        with gzip.open(archive_dir / archives[0].file_path, 'rt', encoding='utf-8') as handle:
+            first = json.loads(handle.readline())
+        assert (first['action'], first['diff'], first['actor_username']) == ('create', {'status': [None, 'open']},
+                                                                           'admin')
+        assert archive_audit_logs() == []
+
+    def test_history_spans_archives(self, authenticated_client, archive_dir, entries):
+        """Test that an entity's history merges live and archived entries, newest first"""
+        from users.archive import archive_audit_logs
+        archive_audit_logs()
+        url = '/api/auth/audit-logs/history/'
+        response = authenticated_client.get(url, {'entity_type': 'WorkOrder', 'entity_id': 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert [entry['action'] for entry in response.data] == ['close', 'update', 'create']
+
+        response = authenticated_client.get(url, {'entity_type': 'WorkOrder'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_uses_cursor(self, authenticated_client, entries):
+        """Test that the live list is cursor paginated"""
+        response = authenticated_client.get('/api/auth/audit-logs/', {'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+        assert 'count' not in response.data
+        assert response.data['next']
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Test JWT authentication served from the user cache"""
+
+    @pytest.fixture
+    def token_client(self, api_client, technician_user):
+        from django.core.cache import cache
+        from rest_framework_simplejwt.tokens import RefreshToken
+        cache.clear()
+        token = RefreshToken.for_user(technician_user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return api_client
+
+    def _user_queries(self, client, method='get', url='/api/auth/users/me/'):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(client, method)(url)
+        return response, [q for q in captured.captured_queries if 'FROM "users"' in q['sql']]
+
+    def test_reads_skip_user_query(self, token_client, technician_user):
+        """Test that only the first read loads the user"""
+        response, queries = self._user_queries(token_client)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1
+        response, queries = self._user_queries(token_client)
+        assert response.data['email'] == technician_user.email
+        assert queries == []
+
+    def test_role_change_invalidates(self, token_client, technician_user, django_capture_on_commit_callbacks):
+        """Test that a saved role change is seen by the next request"""
+        self._user_queries(token_client)
+        with django_capture_on_commit_callbacks(execute=True):
+            technician_user.role = 'supervisor'
+            technician_user.save()
+        response, queries = self._user_queries(token_client)
+        assert response.data['role'] == 'supervisor'
+        assert len(queries) == 1
+
+    def test_inactive_user_rejected(self, token_client, technician_user, django_capture_on_commit_callbacks):
+        """Test that a deactivated user can no longer read"""
+        with django_capture_on_commit_callbacks(execute=True):
+            technician_user.is_active = False
+            technician_user.save()
+        response, _ = self._user_queries(token_client)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_writes_load_user(self, token_client):
+        """Test that writes authenticate against the database"""
+        self._user_queries(token_client)
+        response, queries = self._user_queries(token_client, 'post', '/api/assets/')
+        assert response.status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_403_FORBIDDEN)
+        assert len(queries) >= 1
+
+
+@pytest.mark.django_db
+class TestDataScoping:
+    """Test limiting users to the sites of their department"""
+
+    @pytest.fixture
+    def scoped_client(self, settings, authenticated_client, technician_user, asset, work_order, admin_user):
+        from assets.models import Asset
+        from workorders.models import WorkOrder
+        settings.CMMS_SETTINGS = {**settings.CMMS_SETTINGS, 'DATA_SCOPING_ENABLED': True}
+        other = Asset.objects.create(code='AST-002', name='Other Equipment', factory='Factory B',
+                                     workshop='Workshop 1', line='Line 1', created_by=admin_user)
+        WorkOrder.objects.create(wo_code='WO-2024-0002', equipment=other, summary='Other site',
+                                 requested_by=admin_user)
+        technician_user.department = 'Factory A'
+        technician_user.save()
+        authenticated_client.force_authenticate(user=technician_user)
+        return authenticated_client
+
+    def _codes(self, client, url, field):
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return {row[field] for row in response.data.get('results', response.data)}
+
+    def test_lists_scoped(self, scoped_client):
+        """Test that assets and work orders of other sites are hidden"""
+        assert self._codes(scoped_client, '/api/assets/', 'code') == {'AST-001'}
+        assert self._codes(scoped_client, '/api/workorders/', 'wo_code') == {'WO-2024-0001'}
+
+    def test_other_site_detail_not_found(self, scoped_client):
+        """Test that another site's asset cannot be fetched by ID"""
+        from assets.models import Asset
+        other = Asset.objects.get(code='AST-002')
+        response = scoped_client.get(f'/api/assets/{other.id}/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_workshop_site(self, scoped_client, technician_user):
+        """Test sites narrowed to a workshop and listed together"""
+        technician_user.department = 'Factory A/Workshop 2, Factory B/Workshop 1'
+        technician_user.save()
+        assert self._codes(scoped_client, '/api/assets/', 'code') == {'AST-002'}
+
+    def test_parts_scoped(self, scoped_client, admin_user):
+        """Test that parts only compatible with other sites are hidden"""
+        from spareparts.models import SparePart
+        for code, equipment in [('SP-A', ['AST-001']), ('SP-B', ['AST-002']), ('SP-ANY', [])]:
+            SparePart.objects.create(part_code=code, name=code, unit='pcs', compatible_equipment=equipment,
+                                     created_by=admin_user)
+        assert self._codes(scoped_client, '/api/spareparts/', 'part_code') == {'SP-A', 'SP-ANY'}
+
+    def test_admin_unscoped(self, scoped_client, admin_user):
+        """Test that admins see every site"""
+        admin_user.department = 'Factory A'
+        admin_user.save()
+        scoped_client.force_authenticate(user=admin_user)
+        assert self._codes(scoped_client, '/api/assets/', 'code') == {'AST-001', 'AST-002'}
+
+    def test_trend_scoped(self, scoped_client, inspection_template, admin_user):
+        """Test that readings of another site's asset are not returned"""
+        from assets.models import Asset
+        from inspections.models import InspectionRecord
+        assets = list(Asset.objects.order_by('code'))
+        for equipment in assets:
+            InspectionRecord.objects.create(equipment=equipment, template=inspection_template, inspector=admin_user,
+                                            items=[{'item': 'Vibration', 'value': 2.0}])
+        response = scoped_client.get('/api/inspections/trend/', {
+            'equipment': ','.join(str(equipment.id) for equipment in assets), 'item': 'Vibration', 'bucket': 'raw'
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert [series['equipment_code'] for series in response.data['series']] == ['AST-001']
+
+    def test_reports_scoped(self, scoped_client, asset, admin_user):
+        """Test that analytics, children and report runs stay within the sites"""
+        from assets.models import Asset
+        from reports.models import ReportRun
+        Asset.objects.filter(code='AST-002').update(parent=asset)
+        response = scoped_client.get('/api/reports/kpi/', {'level': 'factory'})
+        assert [row['factory'] for row in response.data['results']] == ['Factory A']
+        assert scoped_client.get(f'/api/assets/{asset.id}/children/').data == []
+
+        ReportRun.objects.create(report_type='workorder_summary', parameters={}, output_format='csv',
+                                 requested_by=admin_user)
+        response = scoped_client.post('/api/reports/runs/', {
+            'report_type': 'workorder_summary', 'parameters': {'sites': []}, 'output_format': 'csv'
+        }, format='json')
+        assert response.data['parameters']['sites'] == [['Factory A', None]]
+        assert self._codes(scoped_client, '/api/reports/runs/', 'id') == {response.data['id']}
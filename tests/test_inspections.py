@@ -0,0 +1,212 @@
+"""
+Tests for Inspections functionality
+"""
+import pytest
+from rest_framework import status
+from assets.models import Asset
+from inspections.models import InspectionRecord
+
+
+def readings(temperature, vibration, noise_ok=True):
+    """Build the items of one inspection"""
+    return [
+        {'item': 'Temperature', 'value': temperature},
+        {'item': 'Vibration', 'value': vibration},
+        {'item': 'Noise', 'value': 'normal', 'ok': noise_ok},
+    ]
+
+
+@pytest.mark.django_db
+class TestInspectionAPI:
+    """Test inspection record API endpoints"""
+
+    def test_create_record_against_template(self, authenticated_client, asset, inspection_template):
+        """Test that a single record is evaluated against its template"""
+        data = {'equipment': asset.id, 'template': inspection_template.id, 'items': readings(75, 7.5)}
+        response = authenticated_client.post('/api/inspections/', data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['result'] == 'fail'
+        vibration = response.data['items'][1]
+        assert vibration['ok'] is False
+        assert vibration['unit'] == 'mm/s'
+
+    def test_failed_record_rolled_back_without_work_order(self, authenticated_client, asset, inspection_template,
+                                                         monkeypatch):
+        """Test that a failing record is not kept when its CM work order cannot be raised"""
+        def fail(records, requested_by):
+            raise RuntimeError('work order generation failed')
+        monkeypatch.setattr('inspections.views.create_corrective_work_orders', fail)
+
+        data = {'equipment': asset.id, 'template': inspection_template.id, 'items': readings(75, 7.5)}
+        with pytest.raises(RuntimeError):
+            authenticated_client.post('/api/inspections/', data, format='json')
+        assert not InspectionRecord.objects.exists()
+
+    def test_create_record_missing_item(self, authenticated_client, asset, inspection_template):
+        """Test that template items are required"""
+        data = {'equipment': asset.id, 'template': inspection_template.id, 'items': readings(75, 2)[:2]}
+        response = authenticated_client.post('/api/inspections/', data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestRouteSubmission:
+    """Test submitting a whole route round"""
+
+    def test_submit_round(self, api_client, technician_user, asset, inspection_template, inspection_route, admin_user):
+        """Test that every entry of a round is stored in one request"""
+        pump = Asset.objects.create(code='AST-002', name='Pump', status='active', created_by=admin_user)
+        inspection_route.route_items.append(
+            {'sequence': 2, 'equipment_id': pump.id, 'template_id': inspection_template.id}
+        )
+        inspection_route.save()
+
+        api_client.force_authenticate(user=technician_user)
+        url = f'/api/inspections/routes/{inspection_route.id}/submit/'
+        data = {'entries': [
+            {'equipment': asset.id, 'items': readings(60, 2.0)},
+            {'equipment': pump.id, 'items': readings('101', 2.0), 'notes': 'Hot casing'},
+        ]}
+        response = api_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['count'] == 2
+        assert response.data['failed'] == 1
+
+        records = InspectionRecord.objects.order_by('id')
+        assert [r.result for r in records] == ['pass', 'fail']
+        assert all(r.route == 'RT-001' and r.inspector == technician_user for r in records)
+
+    def test_submit_round_rejects_invalid_entries(self, authenticated_client, asset, inspection_route, admin_user):
+        """Test that one invalid entry rejects the whole round"""
+        stranger = Asset.objects.create(code='AST-009', name='Off route', status='active', created_by=admin_user)
+        url = f'/api/inspections/routes/{inspection_route.id}/submit/'
+        data = {'entries': [
+            {'equipment': asset.id, 'items': readings(60, 2.0)},
+            {'equipment': stranger.id, 'items': readings(60, 2.0)},
+            {'equipment': asset.id, 'items': [{'item': 'Temperature', 'value': 'hot'}]},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = response.data['entries']
+        assert errors[0] == {}
+        assert 'equipment' in errors[1]
+        assert 'equipment' in errors[2]
+        assert not InspectionRecord.objects.exists()
+
+
+@pytest.mark.django_db
+class TestRuleEngine:
+    """Test server-side evaluation and automatic CM work orders"""
+
+    def test_warning_and_fail_levels(self, asset, inspection_template, admin_user):
+        """Test that thresholds warn and min/max limits fail"""
+        from inspections.rules import evaluate_records
+
+        records = [
+            InspectionRecord(equipment=asset, template=inspection_template, inspector=admin_user,
+                             items=readings(temperature, 2.0, noise_ok=noise_ok))
+            for temperature, noise_ok in [(60, True), (85, True), (-5, True), (60, False)]
+        ]
+        evaluate_records(records)
+        assert [r.result for r in records] == ['pass', 'warning', 'fail', 'fail']
+        assert records[1].items[0]['status'] == 'warning'
+        assert records[1].items[0]['ok'] is True
+
+    def test_failures_raise_deduplicated_work_orders(self, authenticated_client, asset, inspection_route,
+                                                     django_capture_on_commit_callbacks):
+        """Test that a failing round raises one CM order and repeats link to it"""
+        from users.models import AuditLog
+        from workorders.models import WorkOrder
+
+        url = f'/api/inspections/routes/{inspection_route.id}/submit/'
+        data = {'entries': [{'equipment': asset.id, 'items': readings(120, 2.0)}]}
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['work_orders'] == 1
+
+        work_order = WorkOrder.objects.get()
+        assert AuditLog.objects.filter(action='create', entity_type='WorkOrder', entity_id=work_order.id).exists()
+        assert work_order.wo_type == 'CM'
+        assert work_order.equipment == asset
+        assert 'Temperature' in work_order.description
+
+        response = authenticated_client.post(url, data, format='json')
+        assert WorkOrder.objects.count() == 1
+        assert InspectionRecord.objects.filter(triggered_work_order=work_order).count() == 2
+
+
+@pytest.mark.django_db
+class TestMeasurements:
+    """Test the normalised measurement table and trend endpoint"""
+
+    def test_measurements_extracted_on_write(self, authenticated_client, asset, inspection_route):
+        """Test that numeric readings are extracted for submitted rounds"""
+        from inspections.models import InspectionMeasurement
+
+        url = f'/api/inspections/routes/{inspection_route.id}/submit/'
+        authenticated_client.post(url, {'entries': [{'equipment': asset.id, 'items': readings(60, 2.5)}]},
+                                  format='json')
+        rows = InspectionMeasurement.objects.order_by('item_key')
+        # Noise has no numeric value and is not extracted
+        assert [(m.item_key, m.value, m.unit) for m in rows] == [('Temperature', 60.0, 'C'), ('Vibration', 2.5, 'mm/s')]
+
+        record = InspectionRecord.objects.get()
+        record.items = readings(70, 3.0)
+        record.save()
+        assert sorted(InspectionMeasurement.objects.values_list('value', flat=True)) == [3.0, 70.0]
+
+    def test_trend(self, authenticated_client, asset, inspection_template, admin_user):
+        """Test raw and downsampled trend series"""
+        for vibration in (2.0, 4.0):
+            InspectionRecord.objects.create(equipment=asset, template=inspection_template, inspector=admin_user,
+                                            items=readings(60, vibration))
+
+        url = '/api/inspections/trend/'
+        response = authenticated_client.get(url, {'equipment': str(asset.id), 'item': 'Vibration', 'bucket': 'raw'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [p['value'] for p in response.data['series'][0]['points']] == [2.0, 4.0]
+
+        response = authenticated_client.get(url, {'equipment': str(asset.id), 'item': 'Vibration'})
+        assert response.data['bucket'] == 'day'
+        point = response.data['series'][0]['points'][0]
+        assert point['avg'] == 3.0
+        assert point['count'] == 2
+
+        response = authenticated_client.get(url, {'item': 'Vibration'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        for bad in ('2024-13-45', 'yesterday'):
+            response = authenticated_client.get(url, {'equipment': str(asset.id), 'item': 'Vibration', 'start': bad})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDueList:
+    """Test the inspection due list"""
+
+    def test_due_list(self, authenticated_client, asset, inspection_template, inspection_route, admin_user):
+        """Test that never-inspected equipment is overdue and an inspection moves it out"""
+        from django.core.cache import cache
+        cache.clear()
+
+        url = '/api/inspections/routes/due/'
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+        entry = response.data['results'][0]
+        assert entry['status'] == 'overdue'
+        assert entry['last_inspected_at'] is None
+
+        # The cached list is patched when the record is committed
+        InspectionRecord.objects.create(equipment=asset, template=inspection_template, inspector=admin_user,
+                                        items=readings(60, 2.0))
+        assert authenticated_client.get(url).data['count'] == 0
+
+        response = authenticated_client.get(url, {'horizon': 10})
+        entry = response.data['results'][0]
+        assert entry['status'] == 'upcoming'
+        assert entry['last_inspected_at'] is not None
+
+        assert authenticated_client.get(url, {'route': 'abc'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert authenticated_client.get(url, {'horizon': 10, 'route': inspection_route.id}).data['count'] == 1
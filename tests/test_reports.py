@@ -0,0 +1,492 @@
+"""
+Tests for the report engine
+"""
+import csv
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework import status
+
+from reports.engine import REPORTS, create_run, run_report, schedule_due_reports
+from reports.facts import refresh_facts, refresh_work_order_facts
+from reports.kpi import compute_kpis
+from reports.models import (ScheduledReport, ReportRun, WorkOrderDailyFact, PartUsageDailyFact,
+                            InspectionDailyFact)
+from assets.models import Asset
+from inspections.models import InspectionRecord
+from workorders.models import WorkOrder, WorkOrderStatus, WorkOrderType
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def completed_work_order(work_order, admin_user):
+    """A work order repaired yesterday with two hours of downtime"""
+    end = timezone.now() - timedelta(days=1)
+    work_order.status = WorkOrderStatus.COMPLETED
+    work_order.actual_start = end - timedelta(hours=2)
+    work_order.actual_end = end
+    work_order.completed_at = end
+    work_order.completed_by = admin_user
+    work_order.downtime_minutes = 120
+    work_order.labor_hours = 2
+    work_order.actions_taken = 'Replaced bearing'
+    work_order.save()
+    return work_order
+
+
+@pytest.mark.django_db
+class TestReportEngine:
+    """Test scheduling and running reports"""
+
+    def test_schedule_due_reports(self, admin_user):
+        """Test that due active reports get one run and move to their next period"""
+        active = ScheduledReport.objects.create(
+            name='Weekly downtime', report_type='downtime_analysis', frequency='weekly', created_by=admin_user
+        )
+        ScheduledReport.objects.create(
+            name='Paused', report_type='cost_analysis', frequency='daily', status='paused', created_by=admin_user
+        )
+        runs = schedule_due_reports()
+        assert [run.scheduled_report_id for run in runs] == [active.id]
+
+        active.refresh_from_db()
+        assert active.next_run_at > timezone.now()
+        assert timezone.localtime(active.next_run_at).weekday() == 0
+        assert schedule_due_reports() == []
+
+    def test_run_writes_csv(self, media_root, completed_work_order):
+        """Test that a run streams its rows to a CSV file and records timings"""
+        run = create_run('downtime_analysis', {}, 'csv')
+        run = run_report(run.id)
+        assert run.status == 'completed'
+        assert run.duration_seconds >= 0
+        with open(media_root / run.output_file, encoding='utf-8-sig') as handle:
+            rows = list(csv.reader(handle))
+        assert rows[1][:3] == ['AST-001', 'Test Equipment', '1']
+        assert run_report(run.id) is None
+
+    def test_run_writes_xlsx(self, media_root, completed_work_order):
+        """Test that Excel output is readable"""
+        run = run_report(create_run('equipment_availability', {'start_date': '2024-01-01'}, 'xlsx').id)
+        sheet = load_workbook(media_root / run.output_file).active
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[1][0] == 'AST-001'
+        assert rows[1][2] == 120
+        assert rows[1][5] is not None
+
+    @pytest.mark.parametrize('report_type', sorted(REPORTS))
+    def test_every_report_type_runs(self, media_root, completed_work_order, report_type):
+        """Test that every report type's query executes"""
+        run = run_report(create_run(report_type, {}, 'csv').id)
+        assert run.status == 'completed', run.error_message
+
+    def test_failed_run_records_error(self, media_root):
+        """Test that an unknown report type fails the run instead of raising"""
+        run = ReportRun.objects.create(report_type='unknown', output_format='csv')
+        run = run_report(run.id)
+        assert run.status == 'failed'
+        assert 'unknown' in run.error_message
+
+
+@pytest.mark.django_db
+class TestReportAPI:
+    """Test report API endpoints"""
+
+    def test_request_ad_hoc_report(self, authenticated_client, media_root):
+        """Test that an ad-hoc request creates a pending run"""
+        data = {'report_type': 'workorder_summary', 'output_format': 'csv', 'parameters': {'start_date': '2024-01-01'}}
+        response = authenticated_client.post('/api/reports/runs/', data, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['status'] == 'pending'
+        assert response.data['parameters']['end_date'] == timezone.localdate().isoformat()
+
+        response = authenticated_client.get(f"/api/reports/runs/{response.data['id']}/download/")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_download_completed_report(self, authenticated_client, media_root):
+        """Test downloading a finished report"""
+        run = run_report(create_run('workorder_summary', {}, 'csv').id)
+        response = authenticated_client.get(f'/api/reports/runs/{run.id}/download/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Disposition'].startswith('attachment')
+
+    def test_rejects_bad_parameters(self, authenticated_client):
+        """Test that parameters are validated"""
+        data = {'report_type': 'workorder_summary', 'parameters': {'start_date': 'yesterday'}}
+        response = authenticated_client.post('/api/reports/runs/', data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestReportReuse:
+    """Test report fingerprinting, reuse and eviction"""
+
+    REQUEST = {'report_type': 'workorder_summary', 'output_format': 'csv',
+               'parameters': {'start_date': '2024-01-01', 'equipment': [3, 1]}}
+
+    def test_identical_requests_coalesce(self, authenticated_client, media_root):
+        """Test that an identical request joins the queued run"""
+        first = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        reordered = {**self.REQUEST, 'parameters': {'equipment': [1, 3], 'start_date': '2024-01-01'}}
+        second = authenticated_client.post('/api/reports/runs/', reordered, format='json')
+        assert second.status_code == status.HTTP_202_ACCEPTED
+        assert second.data['id'] == first.data['id']
+        assert ReportRun.objects.count() == 1
+
+    def test_completed_output_reused_until_data_changes(self, authenticated_client, media_root, asset, admin_user):
+        """Test that a completed run is served again while its data is unchanged"""
+        first = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        run_report(first.data['id'])
+        response = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == first.data['id']
+        assert response.data['output_size'] > 0
+
+        WorkOrder.objects.create(equipment=asset, summary='Leak', requested_by=admin_user)
+        response = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['id'] != first.data['id']
+
+    def test_deletion_changes_version(self, work_order):
+        """Test that deleting a source row retires shared runs"""
+        from reports.engine import data_version
+        version = data_version()
+        work_order.delete()
+        assert data_version() != version
+
+    def test_stale_run_released(self, authenticated_client, media_root):
+        """Test that a run stuck in running does not hold its fingerprint"""
+        first = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        ReportRun.objects.filter(pk=first.data['id']).update(
+            status='running', started_at=timezone.now() - timedelta(hours=2)
+        )
+        response = authenticated_client.post('/api/reports/runs/', self.REQUEST, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['id'] != first.data['id']
+        assert ReportRun.objects.get(pk=first.data['id']).status == 'failed'
+
+    def test_eviction(self, media_root, settings):
+        """Test that old outputs and outputs beyond the size budget are evicted"""
+        from reports.engine import evict_report_outputs
+        old, recent, newest = [run_report(create_run(kind, {}, 'csv').id) for kind in
+                               ['workorder_summary', 'downtime_analysis', 'spareparts_usage']]
+        ReportRun.objects.filter(pk=old.pk).update(completed_at=timezone.now() - timedelta(days=40))
+        ReportRun.objects.filter(pk=recent.pk).update(completed_at=timezone.now() - timedelta(days=1))
+        settings.CMMS_SETTINGS = {**settings.CMMS_SETTINGS, 'REPORT_OUTPUT_MAX_MB': newest.output_size / 1024 / 1024}
+
+        assert evict_report_outputs() == 2
+        assert not (media_root / old.output_file).exists()
+        assert not (media_root / recent.output_file).exists()
+        assert (media_root / newest.output_file).exists()
+        assert set(ReportRun.objects.values_list('status', flat=True)) == {'expired', 'completed'}
+
+
+@pytest.mark.django_db
+class TestKPI:
+    """Test daily facts and reliability KPIs"""
+
+    def test_asset_kpis(self, completed_work_order):
+        """Test MTBF, MTTR and availability for one failure on one day"""
+        refresh_work_order_facts()
+        day = timezone.localdate(completed_work_order.actual_end)
+        row = compute_kpis(day, day)[0]
+        assert row['code'] == 'AST-001'
+        assert row['failures'] == 1
+        assert row['mttr_hours'] == 2.0
+        assert row['mtbf_hours'] == 22.0
+        assert row['availability'] == pytest.approx(91.67)
+
+    def test_grouped_kpis(self, completed_work_order, admin_user):
+        """Test that higher levels add up their assets"""
+        Asset.objects.create(code='AST-002', name='Second', factory='Factory A', workshop='Workshop 1',
+                             line='Line 1', status='active', created_by=admin_user)
+        refresh_work_order_facts()
+        day = timezone.localdate(completed_work_order.actual_end)
+        [line] = compute_kpis(day, day, 'line')
+        assert (line['line'], line['assets'], line['downtime_minutes']) == ('Line 1', 2, 120)
+        assert line['availability'] == pytest.approx(95.83)
+        [plant] = compute_kpis(day, day, 'plant')
+        assert plant['assets'] == 2
+
+    def test_incremental_refresh(self, completed_work_order, admin_user):
+        """Test that only changed work orders are folded in after the first run"""
+        refresh_work_order_facts()
+        end = completed_work_order.actual_end - timedelta(days=3)
+        WorkOrder.objects.create(
+            equipment=completed_work_order.equipment, wo_type=WorkOrderType.PM, status=WorkOrderStatus.COMPLETED,
+            summary='PM', requested_by=admin_user, actual_start=end - timedelta(hours=1), actual_end=end,
+            downtime_minutes=60
+        )
+        refresh_work_order_facts()
+        fact = WorkOrderDailyFact.objects.get(day=timezone.localdate(end), wo_type=WorkOrderType.PM)
+        assert (fact.ended, fact.downtime_minutes, fact.repair_minutes) == (1, 60, 60)
+        day = timezone.localdate(completed_work_order.actual_end)
+        assert compute_kpis(day - timedelta(days=3), day)[0]['planned_downtime_minutes'] == 60
+
+    def test_kpi_api(self, authenticated_client, completed_work_order):
+        """Test the KPI endpoint"""
+        refresh_work_order_facts()
+        response = authenticated_client.get('/api/reports/kpi/', {'level': 'factory'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['factory'] == 'Factory A'
+        assert response.data['results'][0]['failures'] == 1
+
+        response = authenticated_client.get('/api/reports/kpi/', {'level': 'country'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestDailyFacts:
+    """Test the daily fact ETL"""
+
+    def test_work_order_roles(self, completed_work_order):
+        """Test that each measure lands on the day of its own event"""
+        refresh_facts()
+        opened = WorkOrderDailyFact.objects.get(day=timezone.localdate(completed_work_order.created_at))
+        ended = WorkOrderDailyFact.objects.get(day=timezone.localdate(completed_work_order.actual_end))
+        assert (opened.opened, opened.completed) == (1, 0)
+        assert (ended.completed, ended.ended, ended.downtime_minutes) == (1, 1, 120)
+        assert ended.labor_hours == 2
+
+    def test_part_usage_and_inspections(self, spare_part, work_order, admin_user, asset, inspection_template):
+        """Test ledger and inspection facts"""
+        from spareparts.inventory import apply_movements
+        apply_movements([{
+            'part_id': spare_part.id, 'transaction_type': 'out', 'quantity': 3,
+            'related_work_order_id': work_order.id,
+        }], admin_user)
+        InspectionRecord.objects.create(
+            equipment=asset, template=inspection_template, inspector=admin_user,
+            items=[{'item': 'Temperature', 'value': 95}, {'item': 'Vibration', 'value': 2},
+                   {'item': 'Noise', 'value': 'normal', 'ok': True}]
+        )
+        written = refresh_facts()
+        assert written['part_usage_daily'] == 1
+        usage = PartUsageDailyFact.objects.get()
+        assert (usage.equipment_id, usage.out_quantity, usage.out_count) == (asset.id, 3, 1)
+        inspections = InspectionDailyFact.objects.get()
+        assert (inspections.inspections, inspections.warnings) == (1, 1)
+
+        # Nothing changed, so only the overlap is re-read
+        assert refresh_facts()['part_usage_daily'] == 1
+        assert PartUsageDailyFact.objects.count() == 1
+
+    def test_reports_read_facts(self, media_root, spare_part, work_order, admin_user):
+        """Test that a fact-backed report reflects changes made since the last ETL run"""
+        from spareparts.inventory import apply_movements
+        refresh_facts()
+        apply_movements([{'part_id': spare_part.id, 'transaction_type': 'out', 'quantity': 2}], admin_user)
+        run = run_report(create_run('spareparts_usage', {}, 'csv').id)
+        with open(media_root / run.output_file, encoding='utf-8-sig') as handle:
+            rows = list(csv.reader(handle))
+        assert rows[1][0] == 'SP-001'
+        assert float(rows[1][3]) == 2
+
+
+@pytest.fixture
+def pm_plan(asset, admin_user):
+    """Create a monthly time-based maintenance plan"""
+    from django.core.cache import cache
+    from maintenance.models import MaintenancePlan
+    cache.clear()
+    return MaintenancePlan.objects.create(
+        code='PM-001', equipment=asset, title='Monthly lubrication', trigger_type='time',
+        frequency_value=1, frequency_unit='month', created_by=admin_user
+    )
+
+
+def _pm_order(plan, user, due, done=None, status=WorkOrderStatus.COMPLETED):
+    return WorkOrder.objects.create(
+        equipment=plan.equipment, maintenance_plan=plan, wo_type=WorkOrderType.PM, status=status,
+        summary=plan.title, requested_by=user, planned_end=due, actual_end=done
+    )
+
+
+@pytest.mark.django_db
+class TestPMCompliance:
+    """Test PM compliance"""
+
+    def test_on_time_late_missed(self, pm_plan, admin_user):
+        """Test that PM work orders are classified against their due date plus grace"""
+        from reports.compliance import pm_compliance
+        now = timezone.now()
+        _pm_order(pm_plan, admin_user, now - timedelta(days=20), done=now - timedelta(days=15))
+        _pm_order(pm_plan, admin_user, now - timedelta(days=25), done=now - timedelta(days=10))
+        _pm_order(pm_plan, admin_user, now - timedelta(days=12), status=WorkOrderStatus.OPEN)
+        _pm_order(pm_plan, admin_user, now - timedelta(days=2), status=WorkOrderStatus.OPEN)
+
+        [row] = pm_compliance(timezone.localdate() - timedelta(days=29), timezone.localdate())
+        assert row['plan_code'] == 'PM-001'
+        assert (row['scheduled'], row['on_time'], row['late'], row['missed'], row['pending']) == (4, 1, 1, 1, 1)
+        assert row['on_time_rate'] == pytest.approx(33.3)
+
+    def test_not_generated(self, pm_plan):
+        """Test that an overdue plan without a work order counts as missed"""
+        from reports.compliance import pm_compliance
+        pm_plan.last_generated_date = timezone.localdate() - timedelta(days=50)
+        pm_plan.save()
+
+        [row] = pm_compliance(timezone.localdate() - timedelta(days=29), timezone.localdate(), 'asset')
+        assert row['equipment_code'] == 'AST-001'
+        assert (row['scheduled'], row['not_generated'], row['missed']) == (1, 1, 1)
+
+    def test_every_missed_period_counts(self, pm_plan, admin_user):
+        """Test that each overdue period counts, and plans that never generated count from creation"""
+        from maintenance.models import MaintenancePlan
+        from reports.compliance import pm_compliance
+        today = timezone.localdate()
+        pm_plan.last_generated_date = today - timedelta(days=100)
+        pm_plan.save()
+        never = MaintenancePlan.objects.create(
+            code='PM-002', equipment=pm_plan.equipment, title='Weekly check', trigger_type='time',
+            frequency_value=2, frequency_unit='week', created_by=admin_user
+        )
+        MaintenancePlan.objects.filter(pk=never.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+        rows = {row['plan_code']: row for row in pm_compliance(today - timedelta(days=119), today)}
+        # Monthly: due about 70, 40 and 10 days ago; every two weeks: 40, 26 and 12 days ago
+        assert rows['PM-001']['not_generated'] == 3
+        assert rows['PM-002']['not_generated'] == 3
+
+    def test_cache_invalidated(self, pm_plan, admin_user, django_capture_on_commit_callbacks):
+        """Test that completing a PM work order refreshes the cached result"""
+        from reports.compliance import pm_compliance
+        now = timezone.now()
+        start, end = timezone.localdate() - timedelta(days=29), timezone.localdate()
+        with django_capture_on_commit_callbacks(execute=True):
+            order = _pm_order(pm_plan, admin_user, now - timedelta(days=2), status=WorkOrderStatus.OPEN)
+        assert pm_compliance(start, end)[0]['pending'] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            order.status = WorkOrderStatus.COMPLETED
+            order.actual_end = now
+            order.save()
+        assert pm_compliance(start, end)[0]['on_time'] == 1
+
+    def test_compliance_api(self, authenticated_client, pm_plan, admin_user):
+        """Test the PM compliance endpoint"""
+        _pm_order(pm_plan, admin_user, timezone.now() - timedelta(days=3), done=timezone.now())
+        response = authenticated_client.get('/api/reports/pm-compliance/', {'level': 'factory'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['factory'] == 'Factory A'
+        assert response.data['results'][0]['on_time_rate'] == 100.0
+
+        response = authenticated_client.get('/api/reports/pm-compliance/', {'equipment': 'x'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _repair(equipment, assignee, user, completed, wo_type=WorkOrderType.CM, hours=2):
+    assigned = completed - timedelta(hours=hours + 1)
+    order = WorkOrder.objects.create(
+        equipment=equipment, wo_type=wo_type, status=WorkOrderStatus.COMPLETED, summary='Repair',
+        requested_by=user, assignee=assignee, assigned_at=assigned,
+        actual_start=completed - timedelta(hours=hours), actual_end=completed, completed_at=completed,
+        labor_hours=hours
+    )
+    WorkOrder.objects.filter(pk=order.pk).update(created_at=assigned)
+    return order
+
+
+@pytest.mark.django_db
+class TestTechnicianPerformance:
+    """Test technician performance"""
+
+    def test_metrics(self, asset, admin_user, technician_user):
+        """Test medians, labor and first-time-fix rate per assignee"""
+        from reports.technicians import technician_performance
+        now = timezone.now()
+        _repair(asset, technician_user, admin_user, now - timedelta(days=10), hours=1)
+        _repair(asset, technician_user, admin_user, now - timedelta(days=5), hours=3)
+        # Raised two days after the first repair, so that repair did not hold
+        repeat = _repair(asset, technician_user, admin_user, now - timedelta(days=4), hours=2)
+        WorkOrder.objects.filter(pk=repeat.pk).update(created_at=now - timedelta(days=8))
+        _repair(asset, admin_user, admin_user, now - timedelta(days=1), wo_type=WorkOrderType.PM)
+
+        rows = technician_performance(timezone.localdate() - timedelta(days=29), timezone.localdate())
+        assert [row['username'] for row in rows] == [technician_user.username, admin_user.username]
+        technician = rows[0]
+        assert technician['completed'] == 3
+        assert technician['median_response_hours'] == 1.0
+        assert technician['median_repair_hours'] == 2.0
+        assert technician['labor_hours'] == 6.0
+        assert technician['first_time_fix_rate'] == pytest.approx(66.7)
+        assert rows[1]['first_time_fix_rate'] is None
+
+    def test_paginated_api(self, authenticated_client, asset, admin_user, technician_user):
+        """Test the paginated technician endpoint"""
+        _repair(asset, technician_user, admin_user, timezone.now() - timedelta(days=1))
+        response = authenticated_client.get('/api/reports/technicians/', {'page_size': 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['first_time_fix_rate'] == 100.0
+
+
+@pytest.mark.django_db
+class TestCostCube:
+    """Test the cost cube"""
+
+    @pytest.fixture
+    def costed(self, asset, admin_user):
+        """Costs on a line asset and its child, in two cost centers"""
+        from django.core.cache import cache
+        cache.clear()
+        asset.cost_center = 'CC-100'
+        asset.criticality = 'critical'
+        asset.save()
+        child = Asset.objects.create(code='AST-001-01', name='Gearbox', factory='Factory A', workshop='Workshop 1',
+                                     line='Line 1', parent=asset, cost_center='CC-200', created_by=admin_user)
+        done = timezone.now() - timedelta(minutes=5)
+        for equipment, wo_type, parts in [(asset, WorkOrderType.CM, 100), (asset, WorkOrderType.PM, 40),
+                                          (child, WorkOrderType.CM, 60)]:
+            WorkOrder.objects.create(
+                equipment=equipment, wo_type=wo_type, status=WorkOrderStatus.COMPLETED, summary='Repair',
+                requested_by=admin_user, completed_at=done, labor_hours=1, parts_cost=parts
+            )
+        refresh_work_order_facts()
+        return child
+
+    def test_group_by_and_drill_down(self, costed):
+        """Test slicing by cost center and drilling into one"""
+        from reports.costs import cost_cube
+        month = timezone.localdate()
+        rows = cost_cube(month, month, ['cost_center'])
+        assert [(row['cost_center'], row['work_orders'], row['total_cost']) for row in rows] == [
+            ('CC-100', 2, 140.0), ('CC-200', 1, 60.0)
+        ]
+        rows = cost_cube(month, month, ['wo_type', 'month'], {'cost_center': 'CC-100', 'criticality': 'critical'})
+        assert [(row['wo_type'], row['month'], row['parts_cost']) for row in rows] == [
+            ('CM', month.strftime('%Y-%m'), 100.0), ('PM', month.strftime('%Y-%m'), 40.0)
+        ]
+        [total] = cost_cube(month, month)
+        assert total['parts_cost'] == 200.0
+
+    def test_tree_rollup(self, costed, asset):
+        """Test that parents carry the cost of their children"""
+        from reports.costs import cost_tree
+        month = timezone.localdate()
+        rows = {row['code']: row for row in cost_tree(month, month)}
+        assert rows['AST-001']['total_cost'] == 140.0
+        assert rows['AST-001']['subtree_total_cost'] == 200.0
+        assert rows['AST-001-01']['parent'] == asset.id
+        assert rows['AST-001-01']['subtree_work_orders'] == 1
+
+    def test_cube_api(self, authenticated_client, costed):
+        """Test the cost cube endpoint"""
+        response = authenticated_client.get('/api/reports/cost-cube/', {'group_by': 'factory,wo_type'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['wo_type'] for row in response.data['results']] == ['CM', 'PM']
+
+        response = authenticated_client.get('/api/reports/cost-cube/', {'group_by': 'colour'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        for month in ['2024-13', 'last']:
+            response = authenticated_client.get('/api/reports/cost-cube/', {'end': month})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = authenticated_client.get('/api/reports/cost-cube/', {'rollup': 'tree'})
+        assert response.data['results'][0]['subtree_total_cost'] == 200.0
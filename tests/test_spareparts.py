@@ -0,0 +1,422 @@
+"""
+Tests for Spare Parts functionality
+"""
+from decimal import Decimal
+
+import pytest
+from rest_framework import status
+from spareparts.models import SparePart, PartTransaction
+
+
+@pytest.mark.django_db
+class TestStockMovementAPI:
+    """Test stock movement API endpoints"""
+
+    def test_stock_in(self, authenticated_client, spare_part):
+        """Test adding stock to a spare part"""
+        url = f'/api/spareparts/{spare_part.id}/stock_in/'
+        response = authenticated_client.post(url, {'quantity': 5, 'reference': 'PO-1'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        spare_part.refresh_from_db()
+        assert spare_part.current_stock == Decimal('15')
+        txn = PartTransaction.objects.get(part=spare_part)
+        assert txn.stock_before == Decimal('10')
+        assert txn.stock_after == Decimal('15')
+
+        response = authenticated_client.post(url, {'quantity': 5, 'related_work_order': 999999}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'related_work_order' in response.data
+
+    def test_stock_out_insufficient(self, authenticated_client, spare_part):
+        """Test removing more stock than available"""
+        url = f'/api/spareparts/{spare_part.id}/stock_out/'
+        response = authenticated_client.post(url, {'quantity': 50}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        spare_part.refresh_from_db()
+        assert spare_part.current_stock == Decimal('10')
+
+    def test_batch_movements(self, authenticated_client, spare_part, admin_user):
+        """Test applying several movements in one request"""
+        other = SparePart.objects.create(
+            part_code='SP-002', name='Seal', unit='pcs', current_stock=3, created_by=admin_user
+        )
+        url = '/api/spareparts/batch_movements/'
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '4', 'reference': 'GR-1'},
+            {'part_code': 'SP-002', 'transaction_type': 'out', 'quantity': '2'},
+            {'part': spare_part.id, 'transaction_type': 'out', 'quantity': '12'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['count'] == 3
+        spare_part.refresh_from_db()
+        other.refresh_from_db()
+        assert spare_part.current_stock == Decimal('2')
+        assert other.current_stock == Decimal('1')
+        assert PartTransaction.objects.count() == 3
+
+    def test_batch_movements_all_or_nothing(self, authenticated_client, spare_part):
+        """Test that one failing line rejects the whole batch"""
+        url = '/api/spareparts/batch_movements/'
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '4'},
+            {'part': spare_part.id, 'transaction_type': 'out', 'quantity': '100'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['errors'][0]['line'] == 1
+        spare_part.refresh_from_db()
+        assert spare_part.current_stock == Decimal('10')
+        assert not PartTransaction.objects.exists()
+
+    def test_batch_movements_unknown_part(self, authenticated_client, spare_part):
+        """Test that unknown part codes are reported per line"""
+        url = '/api/spareparts/batch_movements/'
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '1'},
+            {'part_code': 'NOPE', 'transaction_type': 'in', 'quantity': '1'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'part_code' in response.data['lines'][1]
+
+
+@pytest.mark.django_db
+class TestMovingAverageCost:
+    """Test moving average costing"""
+
+    def test_receipts_update_average_cost(self, authenticated_client, spare_part):
+        """Test that receipts maintain the weighted average cost"""
+        url = '/api/spareparts/batch_movements/'
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '10', 'unit_cost': '35'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        spare_part.refresh_from_db()
+        # Opening stock had no average cost, so the first receipt sets it
+        assert spare_part.average_cost == Decimal('35.00')
+
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '20', 'unit_cost': '50'},
+        ]}
+        authenticated_client.post(url, data, format='json')
+        spare_part.refresh_from_db()
+        assert spare_part.average_cost == Decimal('42.50')
+
+    def test_recalculate_matches_incremental(self, authenticated_client, spare_part):
+        """Test that replaying the ledger reproduces the incremental cost"""
+        from spareparts.costing import recalculate_average_costs
+
+        url = '/api/spareparts/batch_movements/'
+        data = {'lines': [
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '3', 'unit_cost': '10'},
+            {'part': spare_part.id, 'transaction_type': 'out', 'quantity': '5'},
+            {'part': spare_part.id, 'transaction_type': 'in', 'quantity': '7', 'unit_cost': '13.33'},
+        ]}
+        authenticated_client.post(url, data, format='json')
+        spare_part.refresh_from_db()
+        expected = spare_part.average_cost
+
+        SparePart.objects.filter(id=spare_part.id).update(average_cost=None)
+        assert recalculate_average_costs() == 1
+        spare_part.refresh_from_db()
+        assert spare_part.average_cost == expected
+
+    def test_recalculate_keeps_cost_without_costed_receipts(self, authenticated_client, spare_part):
+        """Test that receipts without a unit cost do not clear the average cost"""
+        from spareparts.costing import recalculate_average_costs
+
+        from django.db import connection
+
+        url = f'/api/spareparts/{spare_part.id}/stock_in/'
+        authenticated_client.post(url, {'quantity': 5}, format='json')
+        # Receipts from before unit_cost was recorded
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE part_transactions SET unit_cost = NULL')
+        SparePart.objects.filter(id=spare_part.id).update(average_cost=Decimal('24.00'))
+        assert recalculate_average_costs() == 0
+        spare_part.refresh_from_db()
+        assert spare_part.average_cost == Decimal('24.00')
+
+        url = '/api/spareparts/recalculate_costs/'
+        response = authenticated_client.post(url, {'part_ids': 'abc'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = authenticated_client.post(url, {'part_ids': [spare_part.id]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_valuation(self, authenticated_client, spare_part):
+        """Test inventory valuation totals"""
+        response = authenticated_client.get('/api/spareparts/valuation/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['part_count'] == 1
+        assert response.data['total_value'] == Decimal('250.00')
+
+
+@pytest.mark.django_db
+class TestStockMetrics:
+    """Test stock metrics computed in SQL"""
+
+    def test_annotations_match_properties(self, spare_part):
+        """Test that annotated metrics agree with the Python properties"""
+        annotated = SparePart.objects.with_stock_metrics().get(id=spare_part.id)
+        assert annotated.stock_level == 'ok'
+        assert annotated.inventory_value == spare_part.total_value
+
+    def test_filter_by_stock_status(self, authenticated_client, spare_part, admin_user):
+        """Test filtering parts by computed stock status"""
+        SparePart.objects.create(
+            part_code='SP-LOW', name='Low part', unit='pcs', current_stock=1, min_stock=2, created_by=admin_user
+        )
+        response = authenticated_client.get('/api/spareparts/', {'stock_status': 'critical'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [p['part_code'] for p in response.data['results']] == ['SP-LOW']
+        assert response.data['results'][0]['stock_status'] == 'critical'
+
+    def test_write_responses_are_current(self, authenticated_client, spare_part):
+        """Test that movement and update responses show the metrics after the write"""
+        response = authenticated_client.post(f'/api/spareparts/{spare_part.id}/stock_out/', {'quantity': 9},
+                                             format='json')
+        assert response.data['stock_status'] == 'critical'
+        assert response.data['is_below_min_stock'] is True
+        assert Decimal(str(response.data['total_value'])) == Decimal('25')
+
+        response = authenticated_client.patch(f'/api/spareparts/{spare_part.id}/', {'current_stock': 50},
+                                              format='json')
+        assert response.data['stock_status'] == 'ok'
+        assert Decimal(str(response.data['total_value'])) == Decimal('1250')
+
+    def test_zero_average_cost(self, spare_part):
+        """Test that a zero average cost values stock at zero in SQL and Python alike"""
+        SparePart.objects.filter(id=spare_part.id).update(average_cost=0)
+        spare_part.refresh_from_db()
+        annotated = SparePart.objects.with_stock_metrics().get(id=spare_part.id)
+        assert annotated.inventory_value == spare_part.total_value == 0
+
+    def test_stock_overview(self, authenticated_client, spare_part, admin_user):
+        """Test grouped stock overview"""
+        SparePart.objects.create(
+            part_code='SP-LOW', name='Low part', category='Bearings', unit='pcs',
+            current_stock=1, min_stock=2, unit_cost=10, created_by=admin_user
+        )
+        response = authenticated_client.get('/api/spareparts/stock_overview/')
+        assert response.status_code == status.HTTP_200_OK
+        group = response.data['groups'][0]
+        assert group['category'] == 'Bearings'
+        assert group['part_count'] == 2
+        assert group['critical_count'] == 1
+        assert group['total_value'] == Decimal('260.00')
+        assert response.data['totals']['critical_count'] == 1
+
+
+@pytest.mark.django_db
+class TestReorderEngine:
+    """Test automatic reorder drafting"""
+
+    def test_draft_reorders(self, authenticated_client, spare_part, admin_user):
+        """Test drafting purchase requests for low-stock parts"""
+        from spareparts.inventory import apply_movements
+        from django.utils import timezone
+        from spareparts.models import PurchaseRequest
+
+        spare_part.min_stock = 5
+        spare_part.max_stock = 20
+        spare_part.lead_time_days = 10
+        spare_part.save()
+        # Consume 9 units over the 90 day window -> 0.1 per day, 1 unit over the lead time
+        apply_movements([{'part_id': spare_part.id, 'transaction_type': 'out', 'quantity': Decimal('9')}], admin_user)
+
+        # Codes continue after the highest of the day, even with gaps left by deletions
+        prefix = f"PR-{timezone.localdate().strftime('%Y%m%d')}-"
+        other = SparePart.objects.create(part_code='SP-002', name='Seal', created_by=admin_user)
+        PurchaseRequest.objects.create(pr_code=f'{prefix}002', part=other, quantity=1, requested_by=admin_user)
+
+        url = '/api/spareparts/draft_reorders/'
+        response = authenticated_client.post(url, {}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['count'] == 1
+        pr = PurchaseRequest.objects.get(part=spare_part)
+        assert pr.pr_code == f'{prefix}003'
+        assert pr.status == 'draft'
+        assert pr.quantity == Decimal('20')
+        assert pr.urgency == 'high'
+
+        # An open request already covers the part
+        response = authenticated_client.post(url, {}, format='json')
+        assert response.data['count'] == 0
+
+    def test_parts_above_reorder_point_are_skipped(self, authenticated_client, spare_part):
+        """Test that healthy parts are not reordered"""
+        response = authenticated_client.post('/api/spareparts/draft_reorders/', {'dry_run': 'true'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0
+
+
+@pytest.mark.django_db
+class TestDemandForecasting:
+    """Test consumption-rate forecasting"""
+
+    def test_update_demand_forecasts(self, authenticated_client, spare_part, admin_user):
+        """Test forecasts are computed from out-movements and served with the part"""
+        from spareparts.forecasting import update_demand_forecasts
+        from spareparts.models import PartDemandForecast
+
+        spare_part.lead_time_days = 5
+        spare_part.save()
+        PartTransaction.objects.create(
+            part=spare_part, transaction_type='out', quantity=9,
+            stock_before=10, stock_after=1, operator=admin_user
+        )
+
+        assert update_demand_forecasts() == 1
+        forecast = PartDemandForecast.objects.get(part=spare_part)
+        assert forecast.daily_demand > 0
+        assert forecast.proposed_reorder_point >= forecast.lead_time_demand
+        assert forecast.proposed_safety_stock > 0
+
+        response = authenticated_client.get(f'/api/spareparts/{spare_part.id}/')
+        assert response.data['proposed_reorder_point'] == str(forecast.proposed_reorder_point)
+
+        url = '/api/spareparts/apply_forecasts/'
+        for part_ids in ['abc', ['x'], {'id': 1}]:
+            response = authenticated_client.post(url, {'part_ids': part_ids}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = authenticated_client.post(url, {}, format='json')
+        assert response.data['updated'] == 1
+        spare_part.refresh_from_db()
+        assert spare_part.min_stock == forecast.proposed_reorder_point
+
+
+@pytest.mark.django_db
+class TestStockSnapshots:
+    """Test stock snapshots and the append-only ledger"""
+
+    def _post(self, part, transaction_type, quantity, created_at, operator):
+        """Post a ledger row at a given time"""
+        from django.db import connection
+        from spareparts.inventory import apply_movements
+
+        txn = apply_movements([{
+            'part_id': part.id, 'transaction_type': transaction_type, 'quantity': Decimal(quantity)
+        }], operator)[0]
+        # created_at is auto_now_add; backdate it outside the append-only guard
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE part_transactions SET created_at = %s WHERE id = %s', [created_at, txn.id])
+
+    def test_snapshot_stock_and_movements(self, authenticated_client, spare_part, admin_user):
+        """Test that snapshots plus ledger deltas reproduce historical stock"""
+        from datetime import date, timedelta
+        from spareparts.snapshots import build_stock_snapshots, stock_as_of, movement_report, day_start
+
+        SparePart.objects.filter(id=spare_part.id).update(created_at=day_start(date(2026, 1, 1)))
+        self._post(spare_part, 'in', '5', day_start(date(2026, 1, 30)) + timedelta(hours=9), admin_user)
+        self._post(spare_part, 'out', '3', day_start(date(2026, 1, 31)) + timedelta(hours=9), admin_user)
+        self._post(spare_part, 'out', '4', day_start(date(2026, 2, 2)) + timedelta(hours=9), admin_user)
+
+        written = build_stock_snapshots(through=date(2026, 2, 1), since=date(2026, 1, 29))
+        assert written == {'daily': 4, 'monthly': 1}
+        january = spare_part.stock_snapshots.get(period='monthly', snapshot_date=date(2026, 1, 31))
+        assert january.closing_stock == Decimal('12')
+        assert january.in_quantity == Decimal('5')
+        assert january.opening_stock == Decimal('10')
+
+        assert stock_as_of(day_start(date(2026, 1, 30)))[spare_part.id] == Decimal('10')
+        assert stock_as_of(day_start(date(2026, 2, 3)))[spare_part.id] == Decimal('8')
+
+        report = movement_report(date(2026, 1, 30), date(2026, 2, 2))
+        assert report[0]['opening_stock'] == Decimal('10')
+        assert report[0]['in_quantity'] == Decimal('5')
+        assert report[0]['out_quantity'] == Decimal('7')
+        assert report[0]['closing_stock'] == Decimal('8')
+
+        response = authenticated_client.get('/api/spareparts/stock_as_of/', {'date': '2026-01-30'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['stock'] == Decimal('15')
+
+        response = authenticated_client.get('/api/spareparts/stock_as_of/', {'date': '2024-13-45'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = authenticated_client.get('/api/spareparts/movement_report/', {'start': '2024-02-30', 'end': '2024-03-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_movements_across_snapshot_gap(self, spare_part, admin_user):
+        """Test that a day missing between two snapshots is read from the ledger"""
+        from datetime import date, timedelta
+        from spareparts.models import SnapshotPeriod
+        from spareparts.snapshots import build_snapshots, movement_report, day_start
+
+        SparePart.objects.filter(id=spare_part.id).update(created_at=day_start(date(2026, 1, 1)))
+        self._post(spare_part, 'in', '5', day_start(date(2026, 1, 30)) + timedelta(hours=9), admin_user)
+        self._post(spare_part, 'out', '3', day_start(date(2026, 1, 31)) + timedelta(hours=9), admin_user)
+        self._post(spare_part, 'out', '4', day_start(date(2026, 2, 1)) + timedelta(hours=9), admin_user)
+        build_snapshots(SnapshotPeriod.DAILY, date(2026, 1, 30))
+        build_snapshots(SnapshotPeriod.DAILY, date(2026, 2, 1))
+
+        [row] = movement_report(date(2026, 1, 30), date(2026, 2, 1))
+        assert (row['in_quantity'], row['out_quantity']) == (Decimal('5'), Decimal('7'))
+        assert row['transaction_count'] == 3
+        assert row['closing_stock'] == Decimal('8')
+
+    def test_ledger_is_append_only(self, spare_part, admin_user):
+        """Test that ledger rows cannot be changed or deleted"""
+        from spareparts.inventory import apply_movements
+        from spareparts.models import LedgerImmutableError
+
+        txn = apply_movements([{'part_id': spare_part.id, 'transaction_type': 'in', 'quantity': Decimal('1')}],
+                              admin_user)[0]
+        with pytest.raises(LedgerImmutableError):
+            txn.save()
+        with pytest.raises(LedgerImmutableError):
+            txn.delete()
+        with pytest.raises(LedgerImmutableError):
+            PartTransaction.objects.filter(id=txn.id).update(quantity=2)
+
+    def test_ledger_check(self, authenticated_client, spare_part, admin_user):
+        """Test that stock edited outside the ledger is reported"""
+        from spareparts.inventory import apply_movements
+
+        apply_movements([{'part_id': spare_part.id, 'transaction_type': 'out', 'quantity': Decimal('4')}], admin_user)
+        response = authenticated_client.get('/api/spareparts/ledger_check/')
+        assert response.data['consistent'] is True
+
+        SparePart.objects.filter(id=spare_part.id).update(current_stock=9)
+        response = authenticated_client.get('/api/spareparts/ledger_check/')
+        assert response.data['count'] == 1
+        assert response.data['issues'][0]['kind'] == 'current_stock'
+        assert response.data['issues'][0]['expected'] == Decimal('6')
+
+
+@pytest.mark.django_db
+class TestPartCompatibility:
+    """Test the compatible equipment and alternative part indexes"""
+
+    def test_indexes_follow_json_fields(self, spare_part):
+        """Test that saving a part rewrites its index rows"""
+        spare_part.compatible_equipment = ['AST-001', ' AST-002 ', 'AST-001', '']
+        spare_part.alternative_parts = ['SP-009']
+        spare_part.save()
+        assert sorted(spare_part.compatibility.values_list('equipment_code', flat=True)) == ['AST-001', 'AST-002']
+        assert list(spare_part.alternatives.values_list('alternative_code', flat=True)) == ['SP-009']
+
+        spare_part.compatible_equipment = ['AST-002']
+        spare_part.save(update_fields=['compatible_equipment'])
+        assert list(spare_part.compatibility.values_list('equipment_code', flat=True)) == ['AST-002']
+
+    def test_asset_compatible_parts(self, authenticated_client, asset, spare_part, admin_user):
+        """Test listing the parts that fit an asset with live stock"""
+        spare_part.compatible_equipment = [asset.code]
+        spare_part.alternative_parts = ['SP-002']
+        spare_part.save()
+        SparePart.objects.create(
+            part_code='SP-002', name='Seal', unit='pcs', current_stock=0, created_by=admin_user
+        )
+
+        url = f'/api/assets/{asset.id}/compatible_parts/'
+        response = authenticated_client.get(url, {'alternatives': 'true'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [p['part_code'] for p in response.data] == ['SP-001']
+        assert response.data[0]['stock_status'] == 'ok'
+        assert response.data[0]['alternatives'][0]['part_code'] == 'SP-002'
+
+        response = authenticated_client.get('/api/spareparts/', {'equipment': asset.code})
+        assert [p['part_code'] for p in response.data['results']] == ['SP-001']
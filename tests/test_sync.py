@@ -0,0 +1,180 @@
+"""
+Tests for offline sync functionality
+"""
+import pytest
+from rest_framework import status
+from inspections.models import InspectionRecord
+from sync.models import SyncReceipt
+from workorders.models import WorkOrder, WorkOrderStatus
+
+
+@pytest.fixture
+def no_settle(settings):
+    """Send rows as soon as they are written"""
+    settings.CMMS_SETTINGS = {**settings.CMMS_SETTINGS, 'SYNC_SETTLE_SECONDS': 0, 'SYNC_PAGE_SIZE': 2}
+
+
+@pytest.fixture
+def technician_client(api_client, technician_user):
+    api_client.force_authenticate(user=technician_user)
+    return api_client
+
+
+@pytest.mark.django_db
+class TestSyncPull:
+    """Test pulling changes with a change token"""
+
+    def test_initial_pull_is_scoped(self, technician_client, technician_user, work_order, inspection_route, no_settle):
+        """Test that technicians only get their own work orders and routes"""
+        response = technician_client.get('/api/sync/pull/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['changes']['work_orders'] == []
+        assert [row['id'] for row in response.data['changes']['routes']] == [inspection_route.id]
+
+        work_order.assignee = technician_user
+        work_order.save()
+        response = technician_client.get('/api/sync/pull/', {'token': response.data['token']})
+        assert [row['id'] for row in response.data['changes']['work_orders']] == [work_order.id]
+        assert response.data['changes']['routes'] == []
+
+    def test_pull_pages_without_gaps(self, authenticated_client, work_order, no_settle):
+        """Test that paging by cursor returns every change exactly once"""
+        for _ in range(2):
+            WorkOrder.objects.create(
+                equipment=work_order.equipment, summary='Extra', requested_by=work_order.requested_by
+            )
+        response = authenticated_client.get('/api/sync/pull/')
+        assert response.data['has_more'] is True
+        seen = [row['id'] for row in response.data['changes']['work_orders']]
+
+        response = authenticated_client.get('/api/sync/pull/', {'token': response.data['token']})
+        seen += [row['id'] for row in response.data['changes']['work_orders']]
+        assert sorted(seen) == sorted(WorkOrder.objects.values_list('id', flat=True))
+        assert len(seen) == 3
+
+    def test_pull_reports_removed(self, technician_client, technician_user, admin_user, work_order, no_settle):
+        """Test that reassigned and deleted work orders are reported as removed"""
+        work_order.assignee = technician_user
+        work_order.save()
+        other = WorkOrder.objects.create(equipment=work_order.equipment, summary='Other', requested_by=admin_user,
+                                         assignee=technician_user)
+        token = technician_client.get('/api/sync/pull/').data['token']
+
+        work_order.assignee = admin_user
+        work_order.save()
+        other_id = other.id
+        other.delete()
+        response = technician_client.get('/api/sync/pull/', {'token': token})
+        assert response.data['changes']['work_orders'] == []
+        assert sorted(response.data['removed']['work_orders']) == sorted([work_order.id, other_id])
+
+        response = technician_client.get('/api/sync/pull/', {'token': response.data['token']})
+        assert response.data['removed']['work_orders'] == []
+
+    def test_pull_skips_rows_outside_scope(self, technician_client, technician_user, admin_user, work_order,
+                                           no_settle):
+        """Test that changes outside the user's scope are neither sent nor listed as removed"""
+        token = technician_client.get('/api/sync/pull/').data['token']
+        work_order.summary = 'Changed elsewhere'
+        work_order.save()
+        response = technician_client.get('/api/sync/pull/', {'token': token})
+        assert response.data['changes']['work_orders'] == []
+        assert response.data['removed']['work_orders'] == []
+
+    def test_initial_sync_pages_skip_closed(self, authenticated_client, work_order, no_settle):
+        """Test that later pages of the first sync still leave out closed work orders"""
+        for status_value in [WorkOrderStatus.OPEN, WorkOrderStatus.CLOSED, WorkOrderStatus.OPEN]:
+            WorkOrder.objects.create(equipment=work_order.equipment, summary='Extra', status=status_value,
+                                     requested_by=work_order.requested_by)
+        response = authenticated_client.get('/api/sync/pull/')
+        seen = [row['id'] for row in response.data['changes']['work_orders']]
+        while response.data['has_more']:
+            response = authenticated_client.get('/api/sync/pull/', {'token': response.data['token']})
+            seen += [row['id'] for row in response.data['changes']['work_orders']]
+        active = WorkOrder.objects.exclude(status=WorkOrderStatus.CLOSED).values_list('id', flat=True)
+        assert sorted(seen) == sorted(active)
+
+    def test_scope_change_needs_full_sync(self, technician_client, technician_user, no_settle):
+        """Test that a token issued before a role change is refused"""
+        token = technician_client.get('/api/sync/pull/').data['token']
+        technician_user.role = 'supervisor'
+        technician_user.save()
+        response = technician_client.get('/api/sync/pull/', {'token': token})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rejects_foreign_token(self, authenticated_client, technician_client, no_settle):
+        """Test that a token only works for the user it was issued to"""
+        token = authenticated_client.get('/api/sync/pull/').data['token']
+        response = technician_client.get('/api/sync/pull/', {'token': token})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSyncPush:
+    """Test pushing queued operations"""
+
+    def test_push_is_idempotent(self, technician_client, asset, inspection_template):
+        """Test that a retried push does not apply operations twice"""
+        operation = {
+            'key': 'op-1',
+            'type': 'inspection',
+            'payload': {
+                'equipment': asset.id,
+                'template': inspection_template.id,
+                'route': 'RT-001',
+                'items': [
+                    {'item': 'Temperature', 'value': 60},
+                    {'item': 'Vibration', 'value': 2},
+                    {'item': 'Noise', 'value': 'normal', 'ok': True},
+                ],
+            },
+        }
+        data = {'device_id': 'pda-7', 'operations': [operation]}
+        response = technician_client.post('/api/sync/push/', data, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['applied'] == 1
+        assert response.data['results'][0]['result'] == 'pass'
+
+        response = technician_client.post('/api/sync/push/', data, format='json')
+        assert response.data['results'][0]['duplicate'] is True
+        assert response.data['applied'] == 0
+        assert InspectionRecord.objects.count() == 1
+        assert SyncReceipt.objects.get().device_id == 'pda-7'
+
+    def test_inspection_keeps_recording_time(self, technician_client, asset):
+        """Test that an inspection made offline is stamped with when it was recorded"""
+        from datetime import timedelta
+        from django.utils import timezone
+        recorded = timezone.now() - timedelta(days=2)
+        payload = {'equipment': asset.id, 'items': [{'item': 'Vibration', 'value': 2, 'ok': True}],
+                   'occurred_at': recorded.isoformat()}
+        data = {'operations': [
+            {'key': 'op-4', 'type': 'inspection', 'payload': payload},
+            {'key': 'op-5', 'type': 'inspection',
+             'payload': {**payload, 'occurred_at': (timezone.now() + timedelta(days=1)).isoformat()}},
+        ]}
+        technician_client.post('/api/sync/push/', data, format='json')
+        backdated, future = InspectionRecord.objects.order_by('id')
+        assert backdated.created_at == recorded
+        assert backdated.measurements.get().measured_at == recorded
+        assert future.created_at > recorded + timedelta(days=1, hours=23)
+
+    def test_transition_conflict(self, technician_client, technician_user, work_order):
+        """Test that a transition the work order can no longer make is a conflict"""
+        work_order.assignee = technician_user
+        work_order.status = WorkOrderStatus.COMPLETED
+        work_order.actions_taken = 'Done on site'
+        work_order.save()
+        data = {'operations': [{'key': 'op-2', 'type': 'work_order_start', 'payload': {'work_order': work_order.id}}]}
+        response = technician_client.post('/api/sync/push/', data, format='json')
+        result = response.data['results'][0]
+        assert result['status'] == 'conflict'
+        assert result['server']['status'] == WorkOrderStatus.COMPLETED
+
+    def test_transition_requires_assignee(self, technician_client, work_order):
+        """Test that technicians cannot move work orders assigned to others"""
+        data = {'operations': [{'key': 'op-3', 'type': 'work_order_start', 'payload': {'work_order': work_order.id}}]}
+        response = technician_client.post('/api/sync/push/', data, format='json')
+        assert response.data['results'][0]['status'] == 'rejected'
+        work_order.refresh_from_db()
+        assert work_order.status == WorkOrderStatus.OPEN
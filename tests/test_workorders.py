@@ -155,3 +155,72 @@ class TestWorkOrderWorkflow:
         assert response.status_code == status.HTTP_200_OK
         work_order.refresh_from_db()
         assert work_order.status == WorkOrderStatus.CLOSED
+
+
+@pytest.mark.django_db
+class TestWorkOrderParts:
+    """Test issuing spare parts to work orders"""
+
+    def test_issue_parts(self, authenticated_client, work_order, spare_part):
+        """Test issuing parts decrements stock and rolls up cost"""
+        from decimal import Decimal
+        from spareparts.models import PartTransaction
+
+        url = f'/api/workorders/{work_order.id}/issue_parts/'
+        data = {'lines': [
+            {'part_code': 'SP-001', 'quantity': '2'},
+            {'part_code': 'SP-001', 'quantity': '1', 'remark': 'spare'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data['parts']) == 2
+
+        spare_part.refresh_from_db()
+        work_order.refresh_from_db()
+        assert spare_part.current_stock == Decimal('7')
+        assert work_order.parts_cost == Decimal('75.00')
+        assert work_order.total_cost == Decimal('75.00')
+        assert PartTransaction.objects.filter(related_work_order=work_order).count() == 2
+        assert work_order.parts_used.filter(transaction__isnull=False).count() == 2
+
+        # The issued lines own parts_cost; neither an update nor completing can overwrite it
+        response = authenticated_client.patch(f'/api/workorders/{work_order.id}/', {'parts_cost': '1.00'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        work_order.refresh_from_db()
+        assert (work_order.parts_cost, work_order.total_cost) == (Decimal('75.00'), Decimal('75.00'))
+
+        authenticated_client.post(f'/api/workorders/{work_order.id}/start/')
+        url = f'/api/workorders/{work_order.id}/complete/'
+        response = authenticated_client.post(url, {'actions_taken': 'Replaced', 'parts_cost': '10'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = authenticated_client.post(url, {'actions_taken': 'Replaced'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert Decimal(response.data['parts_cost']) == Decimal('75.00')
+
+    def test_issue_parts_at_zero_average_cost(self, authenticated_client, work_order, spare_part):
+        """Test that a zero average cost is used rather than the list price"""
+        from decimal import Decimal
+        from spareparts.models import SparePart
+
+        SparePart.objects.filter(id=spare_part.id).update(average_cost=Decimal('0'))
+        url = f'/api/workorders/{work_order.id}/issue_parts/'
+        response = authenticated_client.post(url, {'lines': [{'part_code': 'SP-001', 'quantity': '2'}]}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Decimal(response.data['parts_cost']) == Decimal('0')
+
+    def test_issue_parts_insufficient_stock(self, authenticated_client, work_order, spare_part):
+        """Test that a failed issue leaves stock and cost untouched"""
+        from decimal import Decimal
+
+        url = f'/api/workorders/{work_order.id}/issue_parts/'
+        data = {'lines': [
+            {'part_code': 'SP-001', 'quantity': '2'},
+            {'part_code': 'SP-001', 'quantity': '20'},
+        ]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        spare_part.refresh_from_db()
+        work_order.refresh_from_db()
+        assert spare_part.current_stock == Decimal('10')
+        assert work_order.parts_cost == 0
+        assert not work_order.parts_used.exists()
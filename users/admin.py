@@ -3,7 +3,7 @@ Django Admin configuration for Users app
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, AuditLog
+from .models import User, AuditLog, AuditArchive
 
 
 @admin.register(User)
@@ -44,3 +44,17 @@ class AuditLogAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
+
+
+@admin.register(AuditArchive)
+class AuditArchiveAdmin(admin.ModelAdmin):
+    """Admin interface for AuditArchive model"""
+    list_display = ['month', 'entries', 'first_entry_id', 'last_entry_id', 'size_bytes', 'file_path', 'created_at']
+    ordering = ['-month', '-first_entry_id']
+    readonly_fields = ['month', 'file_path', 'entries', 'first_entry_id', 'last_entry_id', 'size_bytes', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,166 @@
+"""
+Audit archival for Users app
+Moves audit log months past retention into compressed NDJSON files and reads them back per entity
+"""
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog, AuditArchive, AuditArchiveEntity
+
+logger = logging.getLogger('cmms')
+
+# Entry fields written to archives, in the shape the audit log API returns
+FIELDS = ['id', 'actor', 'actor__username', 'actor__full_name', 'action', 'entity_type', 'entity_id',
+          'entity_repr', 'diff', 'ip_address', 'user_agent', 'created_at']
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def archive_root():
+    """Directory holding the audit archive files"""
+    return _setting('AUDIT_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive', 'audit'))
+
+
+def _entry(row):
+    """Shape a values() row like an AuditLogSerializer entry"""
+    entry = {field: row[field] for field in FIELDS if '__' not in field}
+    entry['actor_username'] = row['actor__username']
+    entry['actor_name'] = row['actor__full_name']
+    return entry
+
+
+def _month_start(day):
+    return timezone.make_aware(datetime.combine(day.replace(day=1), time.min))
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def archive_month(month):
+    """
+    Move the audit log entries of one month into an archive file
+
+    Entries are streamed in ID order into a gzip NDJSON file written
+    beside its final name and renamed, so a crash never leaves a partial
+    archive. The archive row, its entity index and the deletion of the
+    moved entries then commit together.
+
+    Args:
+        month: Any date in the month
+
+    Returns:
+        AuditArchive: The new archive, or None if the month had no entries
+    """
+    start, end = _month_start(month), _month_start(_next_month(month))
+    entries = AuditLog.objects.filter(created_at__gte=start, created_at__lt=end)
+    first = entries.aggregate(first=Min('id'))['first']
+    if first is None:
+        return None
+
+    relative = os.path.join(start.strftime('%Y'), f"audit-{start.strftime('%Y-%m')}-{first}.ndjson.gz")
+    path = os.path.join(archive_root(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    count, last, entities = 0, first, Counter()
+    partial = f'{path}.partial'
+    with gzip.open(partial, 'wt', encoding='utf-8') as handle:
+        for row in entries.order_by('id').values(*FIELDS).iterator(chunk_size=2000):
+            handle.write(json.dumps(_entry(row), cls=DjangoJSONEncoder, ensure_ascii=False))
+            handle.write('\n')
+            count += 1
+            last = row['id']
+            entities[(row['entity_type'], row['entity_id'])] += 1
+    os.replace(partial, path)
+
+    with transaction.atomic():
+        archive = AuditArchive.objects.create(
+            month=start.date(), file_path=relative, entries=count, first_entry_id=first, last_entry_id=last,
+            size_bytes=os.path.getsize(path),
+        )
+        AuditArchiveEntity.objects.bulk_create([
+            AuditArchiveEntity(archive=archive, entity_type=entity_type, entity_id=entity_id, entries=n)
+            for (entity_type, entity_id), n in entities.items()
+        ], batch_size=1000)
+        # Only what was written; entries flushed into the month meanwhile wait for the next run
+        entries.filter(id__lte=last).delete()
+    logger.info('Archived %s audit log entries of %s to %s', count, start.strftime('%Y-%m'), relative)
+    return archive
+
+
+def archive_audit_logs(now=None):
+    """
+    Archive every whole month older than AUDIT_LOG_RETENTION_DAYS
+
+    Returns:
+        list: Created AuditArchive objects
+    """
+    now = now or timezone.now()
+    cutoff = timezone.localdate(now - timedelta(days=_setting('AUDIT_LOG_RETENTION_DAYS', 180)))
+    oldest = AuditLog.objects.aggregate(oldest=Min('created_at'))['oldest']
+    archives = []
+    if oldest is None:
+        return archives
+    month = timezone.localdate(oldest).replace(day=1)
+    # A month goes once it has fully passed the cutoff
+    while _next_month(month) <= cutoff:
+        archive = archive_month(month)
+        if archive:
+            archives.append(archive)
+        month = _next_month(month)
+    return archives
+
+
+def read_archive(archive):
+    """Iterate over the entries of an archive file"""
+    with gzip.open(os.path.join(archive_root(), archive.file_path), 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            yield json.loads(line)
+
+
+def entity_history(entity_type, entity_id, actor=None):
+    """
+    Get the audit history of an entity across the live table and archives
+
+    Only the archives indexed as mentioning the entity are read.
+
+    Args:
+        entity_type: Type of entity (e.g. WorkOrder)
+        entity_id: ID of the entity
+        actor: Optional user to limit the history to
+
+    Returns:
+        list: Entries as dicts, newest first
+    """
+    live = AuditLog.objects.filter(entity_type=entity_type, entity_id=entity_id)
+    if actor is not None:
+        live = live.filter(actor=actor)
+    history = [_entry(row) for row in live.values(*FIELDS)]
+
+    archives = AuditArchive.objects.filter(
+        entities__entity_type=entity_type, entities__entity_id=entity_id
+    ).distinct()
+    for archive in archives:
+        for entry in read_archive(archive):
+            if entry['entity_type'] != entity_type or entry['entity_id'] != entity_id:
+                continue
+            if actor is not None and entry['actor'] != actor.pk:
+                continue
+            entry['created_at'] = parse_datetime(entry['created_at'])
+            history.append(entry)
+
+    history.sort(key=lambda entry: (entry['created_at'], entry['id']), reverse=True)
+    return history
@@ -0,0 +1,149 @@
+"""
+Audit pipeline for Users app
+Buffers audit entries and writes them in one batch after the surrounding transactions commit
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('cmms')
+
+# Entries whose transaction has committed, waiting for the end of the request or task
+_buffer = ContextVar('audit_buffer', default=None)
+
+FIELDS = ['actor_id', 'action', 'entity_type', 'entity_id', 'entity_repr', 'diff', 'ip_address', 'user_agent']
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def record(actor, action, entity_type, entity_id, entity_repr='', diff=None, **kwargs):
+    """
+    Record an audit entry
+
+    The entry is kept only if the current transaction commits (nothing is
+    written for a rolled back change). Inside an audit buffer it waits to
+    be flushed with the others at the end; outside one it is written on
+    commit.
+
+    Args:
+        actor: User who performed the action
+        action: Action performed
+        entity_type: Type of entity affected
+        entity_id: ID of the entity
+        entity_repr: String representation of the entity
+        diff: Dictionary of changes made
+        **kwargs: Additional fields (ip_address, user_agent)
+
+    Returns:
+        dict: The entry as it will be written
+    """
+    entry = {
+        'actor_id': actor.pk,
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'entity_repr': entity_repr,
+        'diff': diff or {},
+        'ip_address': kwargs.get('ip_address'),
+        'user_agent': kwargs.get('user_agent', ''),
+        'created_at': timezone.now(),
+    }
+    transaction.on_commit(partial(_committed, entry))
+    return entry
+
+
+def log_changes(actor, instance, action='update', **kwargs):
+    """
+    Record the tracked field changes of the last save of a model instance
+
+    Nothing is recorded when no tracked field changed.
+
+    Returns:
+        dict: The entry, or None
+    """
+    if not instance.last_changes:
+        return None
+    return record(actor, action, instance._meta.object_name, instance.pk, str(instance), instance.last_changes,
+                  **kwargs)
+
+
+def _committed(entry):
+    entries = _buffer.get()
+    if entries is None:
+        flush([entry])
+    else:
+        entries.append(entry)
+
+
+@contextmanager
+def audit_buffer():
+    """
+    Collect the audit entries of a block and write them in one batch
+
+    Entries recorded in the block are flushed when it exits, including
+    when it raises, as long as their transaction committed. Nested
+    buffers share the outermost one.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    entries = []
+    token = _buffer.set(entries)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        flush(entries)
+
+
+def flush(entries):
+    """
+    Write committed audit entries
+
+    With AUDIT_LOG_ASYNC the batch goes to a Celery worker; if it cannot
+    be queued it is written here instead, so entries are never dropped.
+    """
+    if not entries:
+        return
+    if _setting('AUDIT_LOG_ASYNC', False):
+        from .tasks import write_audit_entries_task
+        payload = [{**entry, 'created_at': entry['created_at'].isoformat()} for entry in entries]
+        try:
+            write_audit_entries_task.delay(payload)
+            return
+        except Exception:
+            logger.warning('Could not queue %s audit entries, writing them synchronously', len(entries),
+                           exc_info=True)
+    write_entries(entries)
+
+
+def write_entries(entries):
+    """Insert audit entries with one bulk_create"""
+    from .models import AuditLog
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            created_at=parse_datetime(entry['created_at']) if isinstance(entry['created_at'], str)
+            else entry['created_at'],
+            **{field: entry[field] for field in FIELDS}
+        )
+        for entry in entries
+    ], batch_size=500)
+
+
+class AuditBufferMiddleware:
+    """Write the audit entries of a request in one batch when it finishes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_buffer():
+            return self.get_response(request)
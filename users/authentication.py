@@ -0,0 +1,86 @@
+"""
+Authentication for Users app
+JWT authentication that serves read requests from a short-lived user cache
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+CACHE_PREFIX = 'auth:user'
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def _cache_key(user_id):
+    return f'{CACHE_PREFIX}:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the authentication cache (after a role or status change)"""
+    cache.delete(_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a user query on read requests
+
+    For GET, HEAD and OPTIONS the user is built from a cached copy of its
+    row (every field but the password, which stays deferred), loaded once
+    per JWT_USER_CACHE_SECONDS. Role and active status therefore come
+    from the cache, not from the token claims, which can be hours old.
+    User.save drops the cached copy; other processes see the change
+    within the TTL. Writes still load the user from the database.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        # Revocation compares the password hash, which is not cached
+        if request.method in SAFE_METHODS and not api_settings.CHECK_REVOKE_TOKEN:
+            return self.get_cached_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_cached_user(self, validated_token):
+        """
+        Get the token's user from the cache, loading its row on a miss
+
+        Raises:
+            InvalidToken: If the token has no user ID
+            AuthenticationFailed: If the user is missing or inactive
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        fields = [field.attname for field in self.user_model._meta.concrete_fields if field.attname != 'password']
+        key = _cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*fields).first()
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, values, _setting('JWT_USER_CACHE_SECONDS', 60))
+
+        # An instance with the password deferred: saving it never touches the password
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, fields, values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
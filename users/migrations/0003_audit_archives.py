@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_audit_log_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchive',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField(help_text='First day of the archived month', verbose_name='Month')),
+                ('file_path', models.CharField(help_text='Archive file, relative to the audit archive directory', max_length=255, verbose_name='File Path')),
+                ('entries', models.PositiveIntegerField(verbose_name='Entries')),
+                ('first_entry_id', models.BigIntegerField(verbose_name='First Entry ID')),
+                ('last_entry_id', models.BigIntegerField(verbose_name='Last Entry ID')),
+                ('size_bytes', models.BigIntegerField(verbose_name='Size (bytes)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Audit Archive',
+                'verbose_name_plural': 'Audit Archives',
+                'db_table': 'audit_archives',
+                'ordering': ['-month', '-first_entry_id'],
+                'indexes': [models.Index(fields=['month'], name='audit_archi_month_b7539c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditArchiveEntity',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity_type', models.CharField(max_length=50, verbose_name='Entity Type')),
+                ('entity_id', models.PositiveIntegerField(verbose_name='Entity ID')),
+                ('entries', models.PositiveIntegerField(verbose_name='Entries')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities', to='users.auditarchive', verbose_name='Archive')),
+            ],
+            options={
+                'verbose_name': 'Audit Archive Entity',
+                'verbose_name_plural': 'Audit Archive Entities',
+                'db_table': 'audit_archive_entities',
+                'indexes': [models.Index(fields=['entity_type', 'entity_id'], name='audit_archi_entity__490dbf_idx')],
+                'constraints': [models.UniqueConstraint(fields=('archive', 'entity_type', 'entity_id'), name='uniq_audit_archive_entity')],
+            },
+        ),
+    ]
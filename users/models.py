@@ -3,6 +3,7 @@ User models for CMMS - RBAC implementation
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.core.validators import RegexValidator
 
 
@@ -77,6 +78,22 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.full_name or self.username} ({self.get_role_display()})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Read requests authenticate from a cached copy of the user
+        from django.db import transaction
+        from .authentication import invalidate_cached_user
+        user_id = self.pk
+        transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+    def delete(self, *args, **kwargs):
+        from django.db import transaction
+        from .authentication import invalidate_cached_user
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: invalidate_cached_user(user_id))
+        return result
+
     @property
     def is_admin(self):
         """Check if user is admin"""
@@ -157,8 +174,9 @@ class AuditLog(models.Model):
         blank=True,
         verbose_name='User Agent'
     )
+    # Set when the action happens; entries are written later in batches
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='Created At',
         db_index=True
     )
@@ -180,7 +198,10 @@ class AuditLog(models.Model):
     @classmethod
     def log(cls, actor, action, entity_type, entity_id, entity_repr='', diff=None, **kwargs):
         """
-        Create an audit log entry
+        Record an audit log entry
+
+        The entry is written once the current transaction commits, batched
+        with the other entries of the request (see users.audit).
 
         Args:
             actor: User who performed the action
@@ -191,12 +212,88 @@ class AuditLog(models.Model):
             diff: Dictionary of changes made
             **kwargs: Additional fields (ip_address, user_agent)
         """
-        return cls.objects.create(
-            actor=actor,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            entity_repr=entity_repr,
-            diff=diff or {},
-            **kwargs
-        )
+        from .audit import record
+        return record(actor, action, entity_type, entity_id, entity_repr, diff, **kwargs)
+
+
+class AuditArchive(models.Model):
+    """
+    Audit Archive - a gzip-compressed NDJSON file of audit log entries
+    moved out of audit_logs by the retention job, one or more per month
+    """
+    id = models.BigAutoField(primary_key=True)
+    month = models.DateField(
+        verbose_name='Month',
+        help_text='First day of the archived month'
+    )
+    file_path = models.CharField(
+        max_length=255,
+        verbose_name='File Path',
+        help_text='Archive file, relative to the audit archive directory'
+    )
+    entries = models.PositiveIntegerField(
+        verbose_name='Entries'
+    )
+    first_entry_id = models.BigIntegerField(
+        verbose_name='First Entry ID'
+    )
+    last_entry_id = models.BigIntegerField(
+        verbose_name='Last Entry ID'
+    )
+    size_bytes = models.BigIntegerField(
+        verbose_name='Size (bytes)'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created At'
+    )
+
+    class Meta:
+        db_table = 'audit_archives'
+        verbose_name = 'Audit Archive'
+        verbose_name_plural = 'Audit Archives'
+        ordering = ['-month', '-first_entry_id']
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.month.strftime('%Y-%m')} - {self.entries} entries"
+
+
+class AuditArchiveEntity(models.Model):
+    """
+    Audit Archive Entity - the entities with entries in an archive file,
+    so an entity's history only opens the files that mention it
+    """
+    id = models.BigAutoField(primary_key=True)
+    archive = models.ForeignKey(
+        AuditArchive,
+        on_delete=models.CASCADE,
+        related_name='entities',
+        verbose_name='Archive'
+    )
+    entity_type = models.CharField(
+        max_length=50,
+        verbose_name='Entity Type'
+    )
+    entity_id = models.PositiveIntegerField(
+        verbose_name='Entity ID'
+    )
+    entries = models.PositiveIntegerField(
+        verbose_name='Entries'
+    )
+
+    class Meta:
+        db_table = 'audit_archive_entities'
+        verbose_name = 'Audit Archive Entity'
+        verbose_name_plural = 'Audit Archive Entities'
+        indexes = [
+            models.Index(fields=['entity_type', 'entity_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['archive', 'entity_type', 'entity_id'], name='uniq_audit_archive_entity'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.entity_id} in {self.archive}"
@@ -0,0 +1,124 @@
+"""
+Data scoping for Users app
+Limits querysets to the sites (factory, or factory/workshop) of a user's department
+"""
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+# Model -> lookup path from the model to its asset
+SITE_PATHS = {
+    'assets.Asset': '',
+    'workorders.WorkOrder': 'equipment__',
+    'workorders.WorkOrderComment': 'work_order__equipment__',
+    'workorders.WorkOrderPart': 'work_order__equipment__',
+    'maintenance.MaintenancePlan': 'equipment__',
+    'inspections.InspectionRecord': 'equipment__',
+}
+
+
+def _setting(name, default):
+    return settings.CMMS_SETTINGS.get(name, default)
+
+
+def user_sites(user):
+    """
+    Get the sites a user is limited to
+
+    User.department names the sites, separated by commas, each as
+    "Factory" or "Factory/Workshop". Admins, users without a department
+    and every user while DATA_SCOPING_ENABLED is off are not limited.
+
+    Returns:
+        list: (factory, workshop or None) pairs, or None when unscoped
+    """
+    if not _setting('DATA_SCOPING_ENABLED', False) or user.is_superuser or user.is_admin:
+        return None
+    if not user.department:
+        return None
+    sites = []
+    for site in user.department.split(','):
+        factory, _, workshop = (part.strip() for part in site.partition('/'))
+        if factory:
+            sites.append((factory, workshop or None))
+    return sites or None
+
+
+def sites_filter(sites, prefix=''):
+    """
+    Get the filter matching assets of a list of sites
+
+    Args:
+        sites: (factory, workshop or None) pairs as user_sites returns
+            them, or None
+        prefix: Lookup path to the asset (e.g. 'equipment__')
+
+    Returns:
+        Q: The filter, or None when sites is None
+    """
+    if sites is None:
+        return None
+    condition = Q(pk__in=[])
+    for factory, workshop in sites:
+        site = Q(**{f'{prefix}factory': factory})
+        if workshop:
+            site &= Q(**{f'{prefix}workshop': workshop})
+        condition |= site
+    return condition
+
+
+def site_filter(user, prefix=''):
+    """
+    Get the filter matching assets of a user's sites
+
+    Args:
+        user: Requesting user
+        prefix: Lookup path to the asset (e.g. 'equipment__')
+
+    Returns:
+        Q: The filter, or None when the user is unscoped
+    """
+    return sites_filter(user_sites(user), prefix)
+
+
+def scope_queryset(queryset, user):
+    """
+    Limit a queryset to the rows of a user's sites
+
+    Rows are matched through their asset's factory and workshop, so the
+    filter runs in SQL on the (factory, workshop, line) asset index.
+    Spare parts are visible when compatible with an asset of the sites,
+    or when not tied to any equipment.
+
+    Args:
+        queryset: Queryset of a model in SITE_PATHS, or of spare parts
+        user: Requesting user
+
+    Returns:
+        QuerySet: The scoped queryset
+    """
+    label = queryset.model._meta.label
+    if label == 'spareparts.SparePart':
+        return _scope_parts(queryset, user)
+    condition = site_filter(user, SITE_PATHS[label])
+    return queryset if condition is None else queryset.filter(condition)
+
+
+def _scope_parts(queryset, user):
+    from assets.models import Asset
+    from spareparts.models import PartCompatibility
+
+    condition = site_filter(user)
+    if condition is None:
+        return queryset
+    compatibility = PartCompatibility.objects.filter(part=OuterRef('pk'))
+    site_codes = Asset.objects.filter(condition).values('code')
+    return queryset.filter(
+        Exists(compatibility.filter(equipment_code__in=site_codes)) | ~Exists(compatibility)
+    )
+
+
+class SiteScopedMixin:
+    """ViewSet mixin limiting the queryset to the requesting user's sites"""
+
+    def get_queryset(self):
+        return scope_queryset(super().get_queryset(), self.request.user)
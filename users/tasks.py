@@ -0,0 +1,20 @@
+"""
+Celery tasks for Users app
+"""
+from celery import shared_task
+
+from .archive import archive_audit_logs
+from .audit import write_entries
+
+
+@shared_task
+def write_audit_entries_task(entries):
+    """Write a batch of audit entries queued by the audit pipeline"""
+    write_entries(entries)
+    return len(entries)
+
+
+@shared_task
+def archive_audit_logs_task():
+    """Move audit log months past retention into archive files"""
+    return len(archive_audit_logs())
@@ -0,0 +1,85 @@
+"""
+Field change tracking for CMMS
+Snapshots tracked fields as rows are loaded so saves can report what changed
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+
+_encoder = DjangoJSONEncoder()
+
+# Model class -> [(field name, attname)] of its tracked fields
+_tracked = {}
+
+
+def _jsonable(value):
+    """Make a field value storable in a JSON diff (dates, decimals and UUIDs as strings)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return _encoder.default(value)
+
+
+class TrackedFieldsMixin:
+    """
+    Model mixin that records changes to the fields in tracked_fields
+
+    Values are copied from the row as Django loads it, so tracking costs
+    no queries; deferred fields are simply not tracked. After each save,
+    last_changes holds {field: [old, new]} for the fields that changed
+    (foreign keys by ID), ready to be used as an audit log diff.
+    """
+    tracked_fields = ()
+    last_changes = {}
+
+    @classmethod
+    def _tracked_attnames(cls):
+        names = _tracked.get(cls)
+        if names is None:
+            names = _tracked[cls] = [(name, cls._meta.get_field(name).attname) for name in cls.tracked_fields]
+        return names
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self, names=None):
+        loaded = self.__dict__
+        snapshot = {
+            attname: loaded[attname] for name, attname in self._tracked_attnames()
+            if attname in loaded and (names is None or name in names)
+        }
+        if names is None:
+            self._loaded_values = snapshot
+        else:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **snapshot}
+
+    def tracked_changes(self):
+        """
+        Get the tracked fields changed since the row was loaded or last saved
+
+        Returns:
+            dict: Field name -> [old value, new value]
+        """
+        snapshot = getattr(self, '_loaded_values', None)
+        if not snapshot:
+            return {}
+        current = self.__dict__
+        changes = {}
+        for name, attname in self._tracked_attnames():
+            if attname in snapshot and current.get(attname) != snapshot[attname]:
+                changes[name] = [snapshot[attname], current.get(attname)]
+        return changes
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Extra arguments (from_queryset on Django 5.1+) are passed through as given
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._take_snapshot(fields)
+
+    def save(self, *args, **kwargs):
+        changes = self.tracked_changes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            changes = {name: change for name, change in changes.items() if name in update_fields}
+        super().save(*args, **kwargs)
+        self.last_changes = {name: [_jsonable(old), _jsonable(new)] for name, (old, new) in changes.items()}
+        self._take_snapshot(update_fields)
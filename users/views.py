@@ -3,6 +3,7 @@ Views for Users app
 """
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
@@ -75,11 +76,25 @@ class UserViewSet(viewsets.ModelViewSet):
         return ip
 
 
+class AuditLogPagination(CursorPagination):
+    """游标分页，避免在大表上统计总数和深度偏移"""
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for AuditLog model (read-only)"""
+    """
+    ViewSet for AuditLog model (read-only)
+
+    Lists recent entries of the live table; entries past retention are
+    archived monthly and reachable per entity through the history action.
+    """
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AuditLogPagination
 
     def get_queryset(self):
         """Filter audit logs based on user role"""
@@ -91,3 +106,18 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(actor=user)
 
         return qs.select_related('actor').order_by('-created_at')
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """Get the full history of one entity, live and archived (entity_type, entity_id)"""
+        from .archive import entity_history
+        entity_type = request.query_params.get('entity_type')
+        try:
+            entity_id = int(request.query_params.get('entity_id', ''))
+        except ValueError:
+            entity_id = None
+        if not entity_type or entity_id is None:
+            return Response({"error": "entity_type and entity_id are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        actor = None if request.user.is_admin else request.user
+        return Response(entity_history(entity_type, entity_id, actor))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spareparts', '0004_partdemandforecast'),
+        ('workorders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workorderpart',
+            name='part',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='work_order_lines', to='spareparts.sparepart', verbose_name='Spare Part'),
+        ),
+        migrations.AddField(
+            model_name='workorderpart',
+            name='transaction',
+            field=models.OneToOneField(blank=True, help_text='Stock-out transaction that issued this part', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='work_order_line', to='spareparts.parttransaction', verbose_name='Part Transaction'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_initial'),
+        ('maintenance', '0002_initial'),
+        ('workorders', '0002_workorderpart_inventory_link'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['equipment', 'created_at'], name='work_orders_equipme_3289e9_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ PM, CM, and Inspection work orders
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
+from users.tracking import TrackedFieldsMixin
 from assets.models import Asset
 from maintenance.models import MaintenancePlan
 
@@ -36,11 +37,16 @@ class Priority(models.TextChoices):
     CRITICAL = 'critical', 'Critical'
 
 
-class WorkOrder(models.Model):
+class WorkOrder(TrackedFieldsMixin, models.Model):
     """
     Work Order - main entity for maintenance work
     Supports PM (Preventive Maintenance), CM (Corrective Maintenance), and Inspections
     """
+    tracked_fields = (
+        'equipment', 'wo_type', 'status', 'summary', 'priority', 'assignee', 'planned_start', 'planned_end',
+        'actual_start', 'actual_end', 'failure_code', 'downtime_minutes', 'labor_hours', 'parts_cost', 'total_cost',
+    )
+
     id = models.BigAutoField(primary_key=True)
     wo_code = models.CharField(
         max_length=50,
@@ -236,7 +242,8 @@ class WorkOrder(models.Model):
     )
     updated_at = models.DateTimeField(
         auto_now=True,
-        verbose_name='Updated At'
+        verbose_name='Updated At',
+        db_index=True
     )
 
     class Meta:
@@ -247,6 +254,7 @@ class WorkOrder(models.Model):
         indexes = [
             models.Index(fields=['wo_code']),
             models.Index(fields=['equipment', 'status']),
+            models.Index(fields=['equipment', 'created_at']),
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['wo_type', 'status']),
             models.Index(fields=['assignee', 'status']),
@@ -256,32 +264,67 @@ class WorkOrder(models.Model):
     def __str__(self):
         return f"{self.wo_code} - {self.summary}"
 
+    @classmethod
+    def generate_codes(cls, count):
+        """
+        Generate consecutive work order codes for today
+
+        Args:
+            count: Number of codes needed (e.g. for a bulk insert)
+
+        Returns:
+            list: Codes in the form WO-YYYYMMDD-NNN
+        """
+        from django.utils import timezone
+        today = timezone.now().strftime('%Y%m%d')
+        # Get the last work order for today
+        last_wo = cls.objects.filter(
+            wo_code__startswith=f'WO-{today}-'
+        ).order_by('-wo_code').first()
+
+        if last_wo:
+            # Extract sequence number and increment
+            try:
+                seq = int(last_wo.wo_code.split('-')[-1]) + 1
+            except (ValueError, IndexError):
+                seq = 1
+        else:
+            seq = 1
+
+        return [f'WO-{today}-{seq + offset:03d}' for offset in range(count)]
+
     def save(self, *args, **kwargs):
         # Auto-generate work order code if not provided
         if not self.wo_code:
-            from django.utils import timezone
-            today = timezone.now().strftime('%Y%m%d')
-            # Get the last work order for today
-            last_wo = WorkOrder.objects.filter(
-                wo_code__startswith=f'WO-{today}-'
-            ).order_by('-wo_code').first()
-            
-            if last_wo:
-                # Extract sequence number and increment
-                try:
-                    last_seq = int(last_wo.wo_code.split('-')[-1])
-                    seq = last_seq + 1
-                except (ValueError, IndexError):
-                    seq = 1
-            else:
-                seq = 1
-            
-            self.wo_code = f'WO-{today}-{seq:03d}'
+            self.wo_code = WorkOrder.generate_codes(1)[0]
         
         # Auto-calculate total cost
         self.total_cost = self.parts_cost
         super().save(*args, **kwargs)
 
+        # Offline clients that lose the work order by reassignment or a move drop it on their next pull
+        if {'assignee', 'equipment'} & set(self.last_changes):
+            from sync.models import SyncTombstone
+            SyncTombstone.record('work_orders', [self.pk])
+
+        # Generated PM work orders feed PM compliance
+        if self.wo_type == WorkOrderType.PM and self.maintenance_plan_id:
+            from django.db import transaction
+            from reports.compliance import invalidate_compliance_cache
+            transaction.on_commit(invalidate_compliance_cache)
+
+    def delete(self, *args, **kwargs):
+        # Offline clients drop the work order on their next pull
+        from django.db import transaction
+        from reports.engine import note_source_deletion
+        from sync.models import SyncTombstone
+        work_order_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            SyncTombstone.record('work_orders', [work_order_id])
+            note_source_deletion()
+        return result
+
     @property
     def is_overdue(self):
         """Check if work order is overdue"""
@@ -361,6 +404,24 @@ class WorkOrderPart(models.Model):
         related_name='parts_used',
         verbose_name='Work Order'
     )
+    # Inventory link for parts issued from stock
+    part = models.ForeignKey(
+        'spareparts.SparePart',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='work_order_lines',
+        verbose_name='Spare Part'
+    )
+    transaction = models.OneToOneField(
+        'spareparts.PartTransaction',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='work_order_line',
+        verbose_name='Part Transaction',
+        help_text='Stock-out transaction that issued this part'
+    )
     part_code = models.CharField(
         max_length=50,
         verbose_name='Part Code'
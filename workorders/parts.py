@@ -0,0 +1,101 @@
+"""
+Parts consumption for Work Orders app
+Issues spare parts from inventory to work orders and keeps the cost rollup current
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from spareparts.models import SparePart, TransactionType
+from spareparts.inventory import apply_movements, StockMovementError
+
+from .models import WorkOrder, WorkOrderPart
+
+
+def adjust_parts_cost(work_order, delta):
+    """
+    Add delta to a work order's parts and total cost without re-summing its lines
+
+    The update is done with F() expressions so concurrent issues to the same
+    work order cannot lose each other's amounts.
+    """
+    if not delta:
+        return
+    WorkOrder.objects.filter(pk=work_order.pk).update(
+        parts_cost=F('parts_cost') + delta,
+        total_cost=F('total_cost') + delta,
+        updated_at=timezone.now(),
+    )
+    work_order.refresh_from_db(fields=['parts_cost', 'total_cost', 'updated_at'])
+
+
+def issue_parts(work_order, lines, operator):
+    """
+    Issue spare parts to a work order in one transaction
+
+    Parts are resolved by code, stock is decremented through the inventory
+    service (which writes the ledger rows), one WorkOrderPart is created per
+    line at the part's valuation cost, and the work order's cost rollup is
+    increased by the issued value.
+
+    Args:
+        work_order: WorkOrder receiving the parts
+        lines: List of dicts with part_code, quantity and optional remark
+        operator: User issuing the parts
+
+    Returns:
+        list: Created WorkOrderPart objects
+
+    Raises:
+        StockMovementError: If a part code is unknown or stock is insufficient
+    """
+    codes = {line['part_code'] for line in lines}
+    part_ids = dict(SparePart.objects.filter(part_code__in=codes).values_list('part_code', 'id'))
+
+    errors = [
+        {'line': index, 'error': f"Part code '{line['part_code']}' not found"}
+        for index, line in enumerate(lines)
+        if line['part_code'] not in part_ids
+    ]
+    if errors:
+        raise StockMovementError(errors)
+
+    with transaction.atomic():
+        transactions = apply_movements([
+            {
+                'part_id': part_ids[line['part_code']],
+                'transaction_type': TransactionType.OUT,
+                'quantity': line['quantity'],
+                'reference': work_order.wo_code,
+                'related_work_order_id': work_order.id,
+                'remark': line.get('remark', ''),
+            }
+            for line in lines
+        ], operator)
+
+        issued = []
+        for txn in transactions:
+            part = txn.part
+            # A zero average cost is a real cost, not a missing one
+            if part.average_cost is not None:
+                unit_cost = part.average_cost
+            else:
+                unit_cost = part.unit_cost or Decimal('0')
+            issued.append(WorkOrderPart(
+                work_order=work_order,
+                part=part,
+                transaction=txn,
+                part_code=part.part_code,
+                part_name=part.name,
+                quantity=txn.quantity,
+                unit=part.unit,
+                unit_cost=unit_cost,
+                total_cost=(txn.quantity * unit_cost).quantize(Decimal('0.01')),
+            ))
+        WorkOrderPart.objects.bulk_create(issued)
+
+        adjust_parts_cost(work_order, sum((line.total_cost for line in issued), Decimal('0')))
+
+    return issued
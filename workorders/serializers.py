@@ -1,6 +1,7 @@
 """
 Serializers for Work Orders app
 """
+from decimal import Decimal
 from rest_framework import serializers
 from .models import WorkOrder, WorkOrderComment, WorkOrderPart, WorkOrderType, WorkOrderStatus, Priority
 
@@ -30,7 +31,9 @@ class WorkOrderSerializer(serializers.ModelSerializer):
                   'completed_by', 'completed_at', 'closed_by', 'closed_at',
                   'attachments', 'notes', 'created_at', 'updated_at',
                   'is_overdue', 'duration_hours']
-        read_only_fields = ['id', 'wo_code', 'requested_by', 'created_at', 'updated_at', 'is_overdue', 'duration_hours']
+        # Costs are rolled up from the part lines, or set when completing an order without lines
+        read_only_fields = ['id', 'wo_code', 'requested_by', 'parts_cost', 'total_cost', 'created_at', 'updated_at',
+                            'is_overdue', 'duration_hours']
 
 
 class WorkOrderListSerializer(serializers.ModelSerializer):
@@ -65,8 +68,21 @@ class WorkOrderPartSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = WorkOrderPart
-        fields = ['id', 'work_order', 'part_code', 'part_name', 'quantity', 'unit', 'unit_cost', 'total_cost']
-        read_only_fields = ['id', 'total_cost']
+        fields = ['id', 'work_order', 'part', 'transaction', 'part_code', 'part_name',
+                  'quantity', 'unit', 'unit_cost', 'total_cost']
+        read_only_fields = ['id', 'part', 'transaction', 'total_cost']
+
+
+class PartIssueLineSerializer(serializers.Serializer):
+    """Serializer for a single part issued to a work order"""
+    part_code = serializers.CharField(max_length=50)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    remark = serializers.CharField(required=False, allow_blank=True)
+
+
+class PartIssueSerializer(serializers.Serializer):
+    """Serializer for issuing several parts to a work order at once"""
+    lines = PartIssueLineSerializer(many=True, allow_empty=False, max_length=200)
 
 
 class WorkOrderAssignSerializer(serializers.Serializer):
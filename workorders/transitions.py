@@ -0,0 +1,104 @@
+"""
+Status transitions for Work Orders app
+Shared by the work order API and offline sync
+"""
+from django.utils import timezone
+
+from .models import WorkOrderStatus
+
+
+class TransitionError(Exception):
+    """Raised when a work order cannot make the requested transition"""
+
+
+def _log(user, action, work_order):
+    from users.models import AuditLog
+    AuditLog.log(
+        actor=user,
+        action=action,
+        entity_type='WorkOrder',
+        entity_id=work_order.id,
+        entity_repr=str(work_order),
+        diff=work_order.last_changes
+    )
+
+
+def start_work_order(work_order, user, at=None):
+    """
+    Start work on a work order
+
+    Args:
+        work_order: WorkOrder to start
+        user: User starting the work
+        at: When work started (defaults to now)
+
+    Raises:
+        TransitionError: If the work order cannot be started
+    """
+    if not work_order.can_be_started():
+        raise TransitionError(f"Work order cannot be started in current status: {work_order.status}")
+
+    work_order.status = WorkOrderStatus.IN_PROGRESS
+    work_order.actual_start = at or timezone.now()
+    work_order.save()
+    _log(user, 'update', work_order)
+
+
+def complete_work_order(work_order, user, data, at=None):
+    """
+    Complete a work order with its completion report
+
+    Args:
+        work_order: WorkOrder to complete
+        user: User completing the work
+        data: Mapping with optional actions_taken, root_cause, downtime_minutes,
+              labor_hours, parts_cost and notes
+        at: When work ended (defaults to now)
+
+    Raises:
+        TransitionError: If the work order cannot be completed, or parts_cost
+            is given for a work order whose part lines maintain it
+    """
+    if not work_order.can_be_completed():
+        raise TransitionError(f"Work order cannot be completed in current status: {work_order.status}")
+    # Part lines maintain parts_cost themselves
+    if 'parts_cost' in data and work_order.parts_used.exists():
+        raise TransitionError("parts_cost is computed from the work order's parts and cannot be set")
+
+    # Update work order with completion data if provided
+    if data.get('actions_taken'):
+        work_order.actions_taken = data['actions_taken']
+    for field in ['root_cause', 'downtime_minutes', 'labor_hours', 'notes']:
+        if field in data:
+            setattr(work_order, field, data[field])
+    if 'parts_cost' in data:
+        work_order.parts_cost = data['parts_cost']
+
+    # Validate required fields
+    if not work_order.actions_taken:
+        raise TransitionError("actions_taken is required to complete a work order")
+
+    now = timezone.now()
+    work_order.status = WorkOrderStatus.COMPLETED
+    work_order.actual_end = at or now
+    work_order.completed_by = user
+    work_order.completed_at = now
+    work_order.save()
+    _log(user, 'complete', work_order)
+
+
+def close_work_order(work_order, user):
+    """
+    Close a completed work order
+
+    Raises:
+        TransitionError: If the work order cannot be closed
+    """
+    if not work_order.can_be_closed():
+        raise TransitionError(f"Work order cannot be closed in current status: {work_order.status}")
+
+    work_order.status = WorkOrderStatus.CLOSED
+    work_order.closed_by = user
+    work_order.closed_at = timezone.now()
+    work_order.save()
+    _log(user, 'close', work_order)
@@ -15,10 +15,15 @@ from django.http import HttpResponse
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
+from spareparts.inventory import StockMovementError
+from users.scoping import SiteScopedMixin
+
 from .models import WorkOrder, WorkOrderComment, WorkOrderPart, WorkOrderStatus, WorkOrderType
 from .serializers import (WorkOrderSerializer, WorkOrderListSerializer,
                           WorkOrderCommentSerializer, WorkOrderPartSerializer,
-                          WorkOrderAssignSerializer)
+                          WorkOrderAssignSerializer, PartIssueSerializer)
+from .parts import issue_parts, adjust_parts_cost
+from .transitions import TransitionError, start_work_order, complete_work_order, close_work_order
 
 User = get_user_model()
 
@@ -35,7 +40,7 @@ class IsAdminOrSupervisorOrReadOnly(BasePermission):
         return request.user.is_authenticated and request.user.role in ['admin', 'supervisor']
 
 
-class WorkOrderViewSet(viewsets.ModelViewSet):
+class WorkOrderViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     """ViewSet for WorkOrder model"""
     queryset = WorkOrder.objects.select_related(
         'equipment', 'requested_by', 'assignee', 'assigned_by',
@@ -54,6 +59,11 @@ class WorkOrderViewSet(viewsets.ModelViewSet):
         print(f"创建工单，用户: {self.request.user}, 数据: {serializer.validated_data}")
         serializer.save(requested_by=self.request.user)
 
+    def perform_update(self, serializer):
+        """Log the changed fields on update"""
+        from users.audit import log_changes
+        log_changes(self.request.user, serializer.save())
+
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
         if self.action == 'list':
@@ -97,7 +107,8 @@ class WorkOrderViewSet(viewsets.ModelViewSet):
                 action='assign',
                 entity_type='WorkOrder',
                 entity_id=work_order.id,
-                entity_repr=str(work_order)
+                entity_repr=str(work_order),
+                diff=work_order.last_changes
             )
 
             return Response(WorkOrderSerializer(work_order).data)
@@ -108,110 +119,57 @@ class WorkOrderViewSet(viewsets.ModelViewSet):
     def start(self, request, pk=None):
         """Start work on a work order"""
         work_order = self.get_object()
-
-        if not work_order.can_be_started():
-            return Response(
-                {"error": f"Work order cannot be started in current status: {work_order.status}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        work_order.status = WorkOrderStatus.IN_PROGRESS
-        work_order.actual_start = timezone.now()
-        work_order.save()
-
-        # Log audit
-        from users.models import AuditLog
-        AuditLog.log(
-            actor=request.user,
-            action='update',
-            entity_type='WorkOrder',
-            entity_id=work_order.id,
-            entity_repr=str(work_order),
-            diff={'status': WorkOrderStatus.IN_PROGRESS}
-        )
-
+        try:
+            start_work_order(work_order, request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(WorkOrderSerializer(work_order).data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def complete(self, request, pk=None):
         """Complete a work order"""
         work_order = self.get_object()
-
-        if not work_order.can_be_completed():
-            return Response(
-                {"error": f"Work order cannot be completed in current status: {work_order.status}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Update work order with completion data if provided
-        actions_taken = request.data.get('actions_taken')
-        if actions_taken:
-            work_order.actions_taken = actions_taken
-        
-        # Update other completion fields if provided
-        if 'root_cause' in request.data:
-            work_order.root_cause = request.data['root_cause']
-        if 'downtime_minutes' in request.data:
-            work_order.downtime_minutes = request.data['downtime_minutes']
-        if 'labor_hours' in request.data:
-            work_order.labor_hours = request.data['labor_hours']
-        if 'parts_cost' in request.data:
-            work_order.parts_cost = request.data['parts_cost']
-        if 'notes' in request.data:
-            work_order.notes = request.data['notes']
-
-        # Validate required fields
-        if not work_order.actions_taken:
-            return Response(
-                {"error": "actions_taken is required to complete a work order"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        work_order.status = WorkOrderStatus.COMPLETED
-        work_order.actual_end = timezone.now()
-        work_order.completed_by = request.user
-        work_order.completed_at = timezone.now()
-        work_order.save()
-
-        # Log audit
-        from users.models import AuditLog
-        AuditLog.log(
-            actor=request.user,
-            action='complete',
-            entity_type='WorkOrder',
-            entity_id=work_order.id,
-            entity_repr=str(work_order)
-        )
-
+        try:
+            complete_work_order(work_order, request.user, request.data)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(WorkOrderSerializer(work_order).data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def close(self, request, pk=None):
         """Close a work order"""
         work_order = self.get_object()
+        try:
+            close_work_order(work_order, request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(WorkOrderSerializer(work_order).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def issue_parts(self, request, pk=None):
+        """Issue spare parts from stock to a work order"""
+        work_order = self.get_object()
 
-        if not work_order.can_be_closed():
+        if work_order.status in [WorkOrderStatus.COMPLETED, WorkOrderStatus.CLOSED, WorkOrderStatus.CANCELED]:
             return Response(
-                {"error": f"Work order cannot be closed in current status: {work_order.status}"},
+                {"error": f"Parts cannot be issued in current status: {work_order.status}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        work_order.status = WorkOrderStatus.CLOSED
-        work_order.closed_by = request.user
-        work_order.closed_at = timezone.now()
-        work_order.save()
-
-        # Log audit
-        from users.models import AuditLog
-        AuditLog.log(
-            actor=request.user,
-            action='close',
-            entity_type='WorkOrder',
-            entity_id=work_order.id,
-            entity_repr=str(work_order)
-        )
+        serializer = PartIssueSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(WorkOrderSerializer(work_order).data)
+        try:
+            issued = issue_parts(work_order, serializer.validated_data['lines'], request.user)
+        except StockMovementError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "parts": WorkOrderPartSerializer(issued, many=True).data,
+            "parts_cost": work_order.parts_cost,
+            "total_cost": work_order.total_cost,
+        }, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
@@ -548,7 +506,7 @@ class WorkOrderViewSet(viewsets.ModelViewSet):
         return response
 
 
-class WorkOrderCommentViewSet(viewsets.ModelViewSet):
+class WorkOrderCommentViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     """ViewSet for WorkOrderComment model"""
     queryset = WorkOrderComment.objects.select_related('author', 'work_order').all()
     serializer_class = WorkOrderCommentSerializer
@@ -561,10 +519,54 @@ class WorkOrderCommentViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
 
-class WorkOrderPartViewSet(viewsets.ModelViewSet):
-    """ViewSet for WorkOrderPart model"""
+class WorkOrderPartViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for WorkOrderPart model
+
+    Lines issued from stock are read-only here; free-text lines adjust the
+    work order's cost rollup by their own delta.
+    """
     queryset = WorkOrderPart.objects.select_related('work_order').all()
     serializer_class = WorkOrderPartSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['work_order']
+
+    def perform_create(self, serializer):
+        """Add the new line's cost to the work order"""
+        line = serializer.save()
+        adjust_parts_cost(line.work_order, line.total_cost)
+
+    def perform_update(self, serializer):
+        """Apply the change in line cost to the work order"""
+        old_cost = serializer.instance.total_cost
+        old_work_order = serializer.instance.work_order
+        line = serializer.save()
+        if line.work_order.pk != old_work_order.pk:
+            adjust_parts_cost(old_work_order, -old_cost)
+            adjust_parts_cost(line.work_order, line.total_cost)
+        else:
+            adjust_parts_cost(line.work_order, line.total_cost - old_cost)
+
+    def perform_destroy(self, instance):
+        """Remove the line's cost from the work order"""
+        work_order = instance.work_order
+        cost = instance.total_cost
+        instance.delete()
+        adjust_parts_cost(work_order, -cost)
+
+    def update(self, request, *args, **kwargs):
+        if self.get_object().transaction_id:
+            return Response(
+                {"error": "Parts issued from stock cannot be edited"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        if self.get_object().transaction_id:
+            return Response(
+                {"error": "Parts issued from stock cannot be deleted"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().destroy(request, *args, **kwargs)